@@ -0,0 +1,62 @@
+"""
+Удаление и изменение многих записей одной транзакцией.
+
+TableWidget.delete_row и bulk_edit передают сюда id выделенных строк.
+Запрос готовится один раз и выполняется для всех id через execBatch()
+внутри одной транзакции: при ошибке откатывается вся пачка. Результат
+содержит число строк и скорость — её показывает окно и пишет benchmark.py.
+"""
+import time
+
+from PyQt6.QtSql import QSqlDatabase
+
+from query_builder import statement
+
+
+class BatchResult:
+    """Сколько строк обработано, за сколько секунд и текст ошибки (если была)."""
+    def __init__(self, rows, seconds, error=""):
+        self.rows = rows
+        self.seconds = seconds
+        self.error = error
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+    def summary(self, action):
+        return f"{action}: {self.rows} за {self.seconds:.2f} с ({self.rows_per_second:.0f} строк/с)"
+
+
+def run_batch(sql, columns):
+    """
+    Выполняет подготовленный запрос sql для каждого набора значений
+    (columns — списки значений по параметрам) одной транзакцией.
+    """
+    database = QSqlDatabase.database()
+    rows = len(columns[0]) if columns else 0
+    started = time.perf_counter()
+    if not database.transaction():
+        return BatchResult(0, 0.0, database.lastError().text())
+    q = statement(sql, database)
+    for values in columns:
+        q.addBindValue(list(values))
+    if not q.execBatch():
+        error = q.lastError().text()
+        database.rollback()
+        return BatchResult(0, time.perf_counter() - started, error)
+    q.finish()
+    if not database.commit():
+        error = database.lastError().text()
+        database.rollback()
+        return BatchResult(0, time.perf_counter() - started, error)
+    return BatchResult(rows, time.perf_counter() - started)
+
+
+def delete_rows(table, ids):
+    return run_batch(f"DELETE FROM [{table}] WHERE id = ?", [ids])
+
+
+def update_rows(table, ids, field, value):
+    """Ставит field = value у записей ids."""
+    return run_batch(f"UPDATE [{table}] SET [{field}] = ? WHERE id = ?", [[value] * len(ids), ids])
@@ -0,0 +1,338 @@
+"""
+Замеры производительности без окна (платформа Qt offscreen).
+
+Для каждой вкладки замеряются открытие, поиск, окно и применение фильтров,
+сортировка, вызовы data() колонки «Стоимость» (с кэшем текстов и с
+форматированием при каждом вызове), добавление, редактирование, удаление,
+изменение и удаление BULK_ROWS выделенных строк одной транзакцией и все
+отчёты вкладки.
+Модальные окна не показываются: диалоги «принимаются» со значениями по
+умолчанию, отчёты пишутся во временный каталог. Результат — JSON, который
+можно сравнить с прошлым прогоном.
+
+    python generate_data.py bench.db --rows 100000
+    python benchmark.py bench.db --out new.json --compare old.json
+    python benchmark.py bench.db --skip report
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QT_VERSION_STR, QDate, QItemSelection, QItemSelectionModel, Qt
+from PyQt6.QtWidgets import QApplication, QComboBox, QDateEdit, QFileDialog, QMessageBox
+
+import db
+from migrations import apply_migrations
+
+TABLES = ["ОБОРУДОВАНИЕ", "РАБОЧЕЕ_МЕСТО", "СОТРУДНИК", "ВЫДАЧА_ТЕХНИКИ", "ОБСЛУЖИВАНИЕ"]
+SEARCH_TEXTS = ["ив", "иванов", "ремонт"]
+# пакетные операции: сколько строк выделяется и какое поле им ставится
+BULK_ROWS = 500
+BULK_UPDATES = {
+    "ОБОРУДОВАНИЕ": ("статус", "Списано"),
+    "РАБОЧЕЕ_МЕСТО": ("статус", "Не используется"),
+    "СОТРУДНИК": ("отдел", "ИТ"),
+    "ВЫДАЧА_ТЕХНИКИ": ("состояние_при_возврате", "Исправно"),
+    "ОБСЛУЖИВАНИЕ": ("тип_работы", "Профилактика"),
+}
+
+# вызовы data() колонки «Стоимость»: строк (в пределах кэша страниц) и проходов
+DISPLAY_ROWS = 10000
+DISPLAY_PASSES = 20
+
+# отчёты вкладок: (название, модуль, класс)
+REPORTS = {
+    "ОБОРУДОВАНИЕ": [("report", "equipment_report", "EquipmentReportGenerator")],
+    "РАБОЧЕЕ_МЕСТО": [("report", "workplace_report", "WorkplaceReportGenerator")],
+    "СОТРУДНИК": [("report", "report_generator", "ReportGenerator")],
+    "ВЫДАЧА_ТЕХНИКИ": [("report", "equipment_issuance_report", "EquipmentIssuanceReportGenerator")],
+    "ОБСЛУЖИВАНИЕ": [
+        ("report", "service_report", "ServiceReportGenerator"),
+        ("summary_report", "technicians_summary_report", "TechniciansSummaryReport"),
+    ],
+}
+
+
+class Bench:
+    def __init__(self, app, skip=()):
+        self.app = app
+        self.skip = set(skip)
+        self.results = []
+
+    def enabled(self, step):
+        return not any(step.startswith(s) for s in self.skip)
+
+    @contextmanager
+    def measure(self, table, step, **extra):
+        entry = {"table": table, "step": step}
+        started = time.perf_counter()
+        try:
+            yield entry
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+        entry["seconds"] = round(time.perf_counter() - started, 4)
+        entry.update(extra)
+        self.results.append(entry)
+        print(f"{table:15} {step:15} {entry['seconds']:9.3f} s"
+              + (f"  ОШИБКА {entry['error']}" if "error" in entry else ""))
+
+    def wait_search(self, widget):
+        while (widget.search_timer.isActive() or widget._scan is not None
+               or (widget._search_worker is not None and not widget._search_worker.isFinished())):
+            self.app.processEvents()
+        self.app.processEvents()
+
+    def wait_reports(self):
+        from report_worker import running_reports
+        while running_reports():
+            self.app.processEvents()
+            time.sleep(0.01)
+        self.app.processEvents()
+
+
+@contextmanager
+def headless_dialogs(report_dir):
+    """Модальные окна на время замеров сразу возвращают «Да»/«ОК»."""
+    import widgets
+    patched = [
+        (QMessageBox, "information", staticmethod(lambda *a, **k: QMessageBox.StandardButton.Ok)),
+        (QMessageBox, "warning", staticmethod(lambda *a, **k: QMessageBox.StandardButton.Ok)),
+        (QMessageBox, "critical", staticmethod(lambda *a, **k: QMessageBox.StandardButton.Ok)),
+        (QMessageBox, "question", staticmethod(lambda *a, **k: QMessageBox.StandardButton.Yes)),
+        (QFileDialog, "getSaveFileName",
+         staticmethod(lambda *a, **k: (os.path.join(report_dir, "report.pdf"), ""))),
+        (widgets.AddRowDialog, "exec", lambda self: 1),
+        (widgets.EditRowDialog, "exec", lambda self: 1),
+        (widgets.FilterDialog, "exec", _accept_first_filter),
+    ]
+    saved = [(owner, name, owner.__dict__.get(name)) for owner, name, _ in patched]
+    for owner, name, value in patched:
+        setattr(owner, name, value)
+    try:
+        yield
+    finally:
+        for owner, name, value in saved:
+            if value is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, value)
+
+
+def _accept_first_filter(dialog):
+    # выбираем первое значение в первом списке, где оно есть
+    for inp in dialog.inputs:
+        if isinstance(inp, QComboBox) and inp.count() > 1:
+            inp.setCurrentIndex(1)
+            break
+    return 1
+
+
+def select_rows(widget, count):
+    """Выделяет первые count строк вида."""
+    last = min(count, widget.proxy.rowCount()) - 1
+    if last < 0:
+        return
+    selection = QItemSelection(widget.proxy.index(0, 0), widget.proxy.index(last, 0))
+    widget.table_view.selectionModel().select(
+        selection, QItemSelectionModel.SelectionFlag.ClearAndSelect | QItemSelectionModel.SelectionFlag.Rows)
+
+
+def bench_table(bench, table):
+    from column_sizing import forget_widths
+    from widgets import TableWidget
+    from paged_model import SORT_ROLE, PagedQueryModel
+
+    if not bench.enabled("open"):
+        return
+    # ширина колонок меряется заново, а не берётся из прошлого запуска
+    forget_widths(table)
+    with bench.measure(table, "open") as entry:
+        widget = TableWidget(table)
+        widget.resize(1200, 800)
+        widget.show()
+        bench.app.processEvents()
+        entry["rows"] = widget.proxy.rowCount()
+
+    if bench.enabled("search"):
+        for text in SEARCH_TEXTS:
+            with bench.measure(table, "search", text=text) as entry:
+                widget.search_field.setText(text)
+                bench.wait_search(widget)
+                entry["matches"] = len(widget.search_matches)
+        widget.search_field.setText("")
+        bench.wait_search(widget)
+
+    if bench.enabled("filter"):
+        with bench.measure(table, "filter") as entry:
+            widget.open_filter_dialog()
+            bench.app.processEvents()
+            entry["rows"] = widget.proxy.rowCount()
+        with bench.measure(table, "filter_reset"):
+            widget.reset_filters()
+            bench.app.processEvents()
+
+    if bench.enabled("sort"):
+        view = widget.table_view
+        column = next(c for c in range(widget.proxy.columnCount()) if not view.isColumnHidden(c))
+        with bench.measure(table, "sort", column=column) as entry:
+            view.sortByColumn(column, Qt.SortOrder.AscendingOrder)
+            bench.app.processEvents()
+        # порядок проверяется по типизированным ключам первых строк
+        keys = [widget.proxy.index(row, column).data(SORT_ROLE)
+                for row in range(min(widget.proxy.rowCount(), 500))]
+        if None not in keys:
+            try:
+                entry["ordered"] = keys == sorted(keys)
+            except TypeError:
+                pass
+        with bench.measure(table, "sort_restore"):
+            view.sortByColumn(widget.id_column, Qt.SortOrder.DescendingOrder)
+            bench.app.processEvents()
+
+    cost_col = getattr(widget.model, "cost_col", None)
+    if bench.enabled("display") and cost_col is not None:
+        # display_uncached — форматирование при каждом вызове, как было до кэша текстов
+        model = widget.model
+        indexes = [model.index(row, cost_col) for row in range(min(model.rowCount(), DISPLAY_ROWS))]
+        calls = {
+            "display_uncached": lambda index: model.displayValue(cost_col, PagedQueryModel.data(model, index)),
+            "display": model.data,
+        }
+        for index in indexes:
+            model.data(index)
+        for step, call in calls.items():
+            with bench.measure(table, step, rows=len(indexes)) as entry:
+                for _ in range(DISPLAY_PASSES):
+                    for index in indexes:
+                        call(index)
+            entry["calls_per_s"] = round(len(indexes) * DISPLAY_PASSES / max(entry["seconds"], 1e-6))
+
+    if bench.enabled("add"):
+        with bench.measure(table, "add"):
+            widget.add_row()
+            bench.app.processEvents()
+
+    if bench.enabled("edit"):
+        widget.table_view.setCurrentIndex(widget.proxy.index(0, 1))
+        with bench.measure(table, "edit"):
+            widget.edit_row()
+            bench.app.processEvents()
+
+    if bench.enabled("delete"):
+        widget.table_view.setCurrentIndex(widget.proxy.index(0, 1))
+        with bench.measure(table, "delete"):
+            widget.delete_row()
+            bench.app.processEvents()
+
+    if bench.enabled("bulk"):
+        field, value = BULK_UPDATES[table]
+        select_rows(widget, BULK_ROWS)
+        with bench.measure(table, "bulk_update") as entry:
+            result = widget.update_selected(widget.selected_ids(), field, value)
+            bench.app.processEvents()
+            entry.update(rows=result.rows, rows_per_s=round(result.rows_per_second))
+        select_rows(widget, BULK_ROWS)
+        with bench.measure(table, "bulk_delete") as entry:
+            result = widget.delete_row()
+            bench.app.processEvents()
+            entry.update(rows=result.rows, rows_per_s=round(result.rows_per_second))
+
+    if bench.enabled("report"):
+        for step, module_name, class_name in REPORTS.get(table, []):
+            module = __import__(module_name)
+            report_class = getattr(module, class_name)
+            with bench.measure(table, step):
+                if class_name == "ReportGenerator":
+                    report = report_class(table, widget.model, widget)
+                else:
+                    report = report_class(widget.model, widget)
+                if isinstance(getattr(report, "date_from", None), QDateEdit):
+                    # весь диапазон дат, а не значения по умолчанию
+                    report.date_from.setDate(QDate(1900, 1, 1))
+                    report.date_to.setDate(QDate(2100, 1, 1))
+                report.generate_report()
+                bench.wait_reports()
+
+    widget.deleteLater()
+    bench.app.processEvents()
+
+
+def table_sizes():
+    conn = db.connect_sqlite()
+    try:
+        return {t: conn.execute(f"SELECT COUNT(*) FROM [{t}]").fetchone()[0] for t in TABLES}
+    finally:
+        conn.close()
+
+
+def compare(results, old_path):
+    """Печатает отношение новое/старое время для совпадающих замеров."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+
+    def key(entry):
+        return entry["table"], entry["step"], entry.get("text")
+    before = {key(e): e["seconds"] for e in old["results"]}
+    print(f"\nСравнение с {old_path}:")
+    for entry in results:
+        prev = before.get(key(entry))
+        if prev is None:
+            continue
+        ratio = entry["seconds"] / prev if prev else float("inf")
+        label = f"{entry['table']} {entry['step']}" + (f" [{entry['text']}]" if entry.get("text") else "")
+        print(f"  {label:40} {prev:9.3f} -> {entry['seconds']:9.3f}  x{ratio:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры TableWidget и отчётов без окна")
+    parser.add_argument("db_path")
+    parser.add_argument("--out", help="файл JSON с результатами (по умолчанию — вывод в stdout)")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--tables", nargs="*", default=TABLES)
+    parser.add_argument("--skip", nargs="*", default=[],
+                        help="пропустить шаги: search filter sort display add edit delete bulk report")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    db.DB_PATH = os.path.abspath(args.db_path)
+    apply_migrations(db.DB_PATH)
+    db.create_connection()
+
+    bench = Bench(app, args.skip)
+    with tempfile.TemporaryDirectory() as report_dir, headless_dialogs(report_dir):
+        for table in args.tables:
+            bench_table(bench, table)
+
+    output = {
+        "meta": {
+            "db": db.DB_PATH,
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "rows": table_sizes(),
+            "pragmas": db.qt_pragmas(),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "platform": platform.platform(),
+        },
+        "results": bench.results,
+    }
+    text = json.dumps(output, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        compare(bench.results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
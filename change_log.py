@@ -0,0 +1,80 @@
+"""
+Журнал изменённых записей для точечного обновления JOIN-вкладок.
+
+Триггеры на ВЫДАЧА_ТЕХНИКИ и ОБСЛУЖИВАНИЕ пишут в ЖУРНАЛ_ИЗМЕНЕНИЙ id каждой
+добавленной, изменённой или удалённой записи. PagedQueryModel помнит номер
+последней прочитанной записи журнала и после add_row/edit_row/delete_row
+перечитывает только строки с этими id (PagedQueryModel.syncChanges), а не
+весь JOIN-запрос. Журнал хранит последние KEEP_CHANGES записей: если модель
+отстала сильнее, она перечитывается целиком.
+"""
+from query_builder import fetch_rows, fetch_value, run
+
+CHANGE_LOG = "ЖУРНАЛ_ИЗМЕНЕНИЙ"
+LOGGED_TABLES = ["ВЫДАЧА_ТЕХНИКИ", "ОБСЛУЖИВАНИЕ"]
+KEEP_CHANGES = 10000
+
+INSERTED, UPDATED, DELETED = "I", "U", "D"
+
+
+# --- журнал и триггеры (вызывается из migrations.py) -------------------------
+
+def create_change_log(conn):
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CHANGE_LOG} (
+            номер INTEGER PRIMARY KEY AUTOINCREMENT,
+            таблица TEXT NOT NULL,
+            запись_id INTEGER NOT NULL,
+            действие TEXT NOT NULL
+        )
+    """)
+    # старые записи удаляются по одной при каждой новой — журнал не растёт
+    conn.execute(f"DROP TRIGGER IF EXISTS [{CHANGE_LOG}_обрезка]")
+    conn.execute(f"CREATE TRIGGER [{CHANGE_LOG}_обрезка] AFTER INSERT ON {CHANGE_LOG} BEGIN "
+                 f"DELETE FROM {CHANGE_LOG} WHERE номер <= NEW.номер - {KEEP_CHANGES}; END")
+    for table in LOGGED_TABLES:
+        if table not in tables:
+            continue
+        for event, ref, action in (("INSERT", "NEW", INSERTED), ("UPDATE", "NEW", UPDATED),
+                                   ("DELETE", "OLD", DELETED)):
+            name = f"{CHANGE_LOG}_{table}_{event.lower()}"
+            conn.execute(f"DROP TRIGGER IF EXISTS [{name}]")
+            conn.execute(f"CREATE TRIGGER [{name}] AFTER {event} ON [{table}] BEGIN "
+                         f"INSERT INTO {CHANGE_LOG}(таблица, запись_id, действие) "
+                         f"VALUES ('{table}', {ref}.id, '{action}'); END")
+
+
+# --- чтение -----------------------------------------------------------------
+
+def last_change():
+    """Номер последней записи журнала; None, если журнала в базе нет."""
+    return fetch_value(f"SELECT IFNULL(MAX(номер), 0) FROM {CHANGE_LOG}")
+
+
+def changes_since(table, number):
+    """
+    Изменения таблицы после записи журнала number:
+    (номер последней записи, {id: (первое действие, последнее действие)}).
+    None — журнала нет или нужные записи уже удалены из него.
+    """
+    if number is None:
+        return None
+    bounds = fetch_rows(f"SELECT IFNULL(MIN(номер), 0), IFNULL(MAX(номер), 0) FROM {CHANGE_LOG}")
+    if not bounds:
+        return None
+    first, last = bounds[0]
+    if first > number + 1:
+        return None
+
+    q = run(f"SELECT запись_id, действие FROM {CHANGE_LOG} WHERE номер > ? AND таблица = ? ORDER BY номер",
+            [number, table])
+    if not q.isActive():
+        return None
+    changes = {}
+    while q.next():
+        record_id, action = q.value(0), q.value(1)
+        before = changes.get(record_id)
+        changes[record_id] = (before[0] if before else action, action)
+    q.finish()
+    return last, changes
@@ -0,0 +1,90 @@
+"""
+Ширина колонок и высота строк таблиц вкладок.
+
+resizeColumnsToContents()/resizeRowsToContents() и режим ResizeToContents
+меряют ячейки всех строк (постраничной модели — ещё и дочитывая страницы
+из базы), а ResizeToContents повторяет это при каждом сбросе модели. Здесь
+колонки с длинными подписями (оборудование, ФИО, рабочее место) меряются
+один раз по первым SAMPLE_ROWS строкам, и ширина запоминается в настройках
+для следующего запуска; её можно поменять мышью — запомнится и она.
+Остальные колонки делят оставшееся место поровну, строки одной высоты.
+"""
+import json
+
+from PyQt6.QtCore import QSettings, Qt
+from PyQt6.QtWidgets import QHeaderView
+
+ORGANIZATION = "Разработчики Программ"
+APPLICATION = "Учет техники"
+# колонки, ширина которых подбирается по содержимому
+WIDE_HEADERS = ("Оборудование", "Сотрудник", "Рабочее место")
+SAMPLE_ROWS = 100
+MAX_COLUMN_WIDTH = 450
+ROW_PADDING = 8
+
+
+def settings():
+    return QSettings(ORGANIZATION, APPLICATION)
+
+
+def _key(table_name):
+    return f"column_widths/{table_name}"
+
+
+def load_widths(table_name):
+    """{заголовок: ширина} из настроек."""
+    raw = settings().value(_key(table_name), "")
+    try:
+        widths = json.loads(raw) if raw else {}
+    except (TypeError, ValueError):
+        return {}
+    return widths if isinstance(widths, dict) else {}
+
+
+def save_widths(table_name, widths):
+    settings().setValue(_key(table_name), json.dumps(widths, ensure_ascii=False))
+
+
+def forget_widths(table_name):
+    settings().remove(_key(table_name))
+
+
+def sample_width(view, column):
+    """Ширина колонки по заголовку и первым SAMPLE_ROWS строкам."""
+    header = view.horizontalHeader()
+    # sizeHintForColumn смотрит не больше resizeContentsPrecision() строк
+    header.setResizeContentsPrecision(SAMPLE_ROWS)
+    return min(max(view.sizeHintForColumn(column), header.sectionSizeHint(column)), MAX_COLUMN_WIDTH)
+
+
+def setup_sizing(view, table_name):
+    """Размеры колонок и строк view; вызывать после setModel()."""
+    model = view.model()
+    header = view.horizontalHeader()
+    rows = view.verticalHeader()
+    rows.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+    rows.setDefaultSectionSize(view.fontMetrics().height() + ROW_PADDING)
+
+    cached = load_widths(table_name)
+    widths = dict(cached)
+    wide = {}
+    for col in range(model.columnCount()):
+        name = model.headerData(col, Qt.Orientation.Horizontal)
+        if name in WIDE_HEADERS:
+            header.setSectionResizeMode(col, QHeaderView.ResizeMode.Interactive)
+            if not isinstance(widths.get(name), int):
+                widths[name] = sample_width(view, col)
+            header.resizeSection(col, widths[name])
+            wide[col] = name
+        else:
+            header.setSectionResizeMode(col, QHeaderView.ResizeMode.Stretch)
+    if widths != cached:
+        save_widths(table_name, widths)
+
+    def on_resized(col, old_size, new_size):
+        # растягиваемые колонки меняются вместе с окном — их не запоминаем
+        if col in wide and new_size > 0:
+            widths[wide[col]] = new_size
+            save_widths(table_name, widths)
+
+    header.sectionResized.connect(on_resized)
@@ -1,10 +1,106 @@
-from PyQt6.QtSql import QSqlDatabase
+"""
+Единая точка подключения к tech.db.
 
-DB_PATH = "tech.db"
+Все соединения — основное соединение Qt, соединения фоновых потоков,
+sqlite3 в миграциях и окне входа — открываются здесь, к одному файлу и с
+одним профилем PRAGMA.
 
-def create_connection():
-    db = QSqlDatabase.addDatabase("QSQLITE")
-    db.setDatabaseName(DB_PATH)
+Путь к базе: переменная окружения TECH_DB_PATH или tech.db рядом с
+программой (а не в текущем каталоге). Профиль выбирается переменной
+TECH_DB_PROFILE (по умолчанию "local").
+"""
+import os
+import sqlite3
+
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+from query_builder import forget_statements
+
+DB_PATH = os.environ.get("TECH_DB_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "tech.db"
+)
+
+# Профили PRAGMA. В WAL читатели не блокируют писателя и наоборот, а
+# synchronous=NORMAL в WAL безопасен при сбое программы и не делает fsync на
+# каждую транзакцию. busy_timeout заставляет ждать чужую запись, а не сразу
+# падать с "database is locked". WAL работает только для процессов на одной
+# машине (нужна общая память), поэтому для файла на сетевом диске есть
+# профиль "network" с обычным журналом.
+PRAGMA_PROFILES = {
+    "local": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,     # отрицательное значение — в КиБ
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,         # мс
+    },
+    "network": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 15000,
+    },
+}
+PRAGMA_PROFILE = PRAGMA_PROFILES.get(os.environ.get("TECH_DB_PROFILE", "local"), PRAGMA_PROFILES["local"])
+
+
+def pragma_statements(profile=None):
+    profile = PRAGMA_PROFILE if profile is None else profile
+    return [f"PRAGMA {name} = {value}" for name, value in profile.items()]
+
+
+def read_pragmas(execute, profile=None):
+    """
+    Текущие значения PRAGMA профиля на соединении: execute(sql) должен
+    вернуть первое значение результата. Нужна для замеров, чтобы записать,
+    с какими настройками они сделаны.
+    """
+    profile = PRAGMA_PROFILE if profile is None else profile
+    return {name: execute(f"PRAGMA {name}") for name in profile}
+
+
+def connect_sqlite(db_path=None, profile=None, **kwargs):
+    """sqlite3-соединение с профилем PRAGMA (kwargs уходят в sqlite3.connect)."""
+    conn = sqlite3.connect(db_path or DB_PATH, **kwargs)
+    for statement in pragma_statements(profile):
+        conn.execute(statement)
+    return conn
+
+
+def open_database(name=None, db_path=None, profile=None):
+    """
+    Открывает соединение Qt (QSQLITE) с профилем PRAGMA. name — имя
+    соединения, None — соединение по умолчанию; для потоков нужно своё имя.
+    """
+    # подготовленные запросы прежнего соединения с этим именем перестанут работать
+    forget_statements(name)
+    if name is None:
+        db = QSqlDatabase.addDatabase("QSQLITE")
+    else:
+        db = QSqlDatabase.addDatabase("QSQLITE", name)
+    db.setDatabaseName(db_path or DB_PATH)
     if not db.open():
+        return db
+    for statement in pragma_statements(profile):
+        QSqlQuery(statement, db)
+    return db
+
+
+def qt_pragmas(db=None, profile=None):
+    """read_pragmas() для соединения Qt (по умолчанию — основного)."""
+    db = db or QSqlDatabase.database()
+
+    def execute(sql):
+        q = QSqlQuery(sql, db)
+        return q.value(0) if q.next() else None
+    return read_pragmas(execute, profile)
+
+
+def create_connection():
+    db = open_database()
+    if not db.isOpen():
         raise Exception("Не удалось открыть базу данных")
-    return db
\ No newline at end of file
+    return db
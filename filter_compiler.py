@@ -0,0 +1,115 @@
+import re
+
+
+def iso_date_sql(field, alias=None):
+    """SQL-выражение, переводящее дату dd.MM.yyyy из колонки в yyyy-MM-dd."""
+    col = f"{alias}.[{field}]" if alias else f"[{field}]"
+    return f"substr({col},7,4)||'-'||substr({col},4,2)||'-'||substr({col},1,2)"
+
+
+def to_iso_date(date_str):
+    """dd.MM.yyyy -> yyyy-MM-dd; None, если строка не похожа на дату."""
+    m = re.fullmatch(r"\s*(\d{2})\.(\d{2})\.(\d{4})\s*", str(date_str or ""))
+    if not m:
+        return None
+    d, mth, y = m.groups()
+    return f"{y}-{mth}-{d}"
+
+
+def parse_money(text):
+    """'1 234.50 ₽' -> 1234.5; None, если числа нет."""
+    cleaned = re.sub(r"[^\d,.-]", "", str(text or "")).replace(",", ".")
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def _glob_char(ch):
+    variants = {ch, ch.lower(), ch.upper()}
+    if len(variants) == 1 and ch not in "*?[]":
+        return ch
+    if ch == "]":
+        return "[]]"
+    return "[" + "".join(sorted(variants)) + "]"
+
+
+def glob_contains(text):
+    """
+    Шаблон GLOB «содержит text без учёта регистра». LIKE и lower() в SQLite
+    не различают регистр только для латиницы, поэтому регистр раскрываем
+    сами: "ив" -> *[иИ][вВ]*
+    """
+    return "*" + "".join(_glob_char(ch) for ch in text) + "*"
+
+
+def compile_filters(filters, fields, kinds=None, exact=()):
+    """
+    Переводит вывод FilterDialog.get_filters() в параметризованное условие WHERE.
+
+    filters — значения фильтров: строка или кортеж (dd.MM.yyyy, dd.MM.yyyy)
+              для диапазона дат;
+    fields  — имена колонок результата запроса, в том же порядке;
+    kinds   — {имя колонки: "money" | "date"} для колонок, у которых
+              отображаемое значение отличается от хранимого;
+    exact   — номера фильтров, значение которых выбрано из списка: они
+              сравниваются на равенство, остальные строки ищутся как
+              подстрока без учёта регистра (как прежний фильтр в прокси).
+
+    Возвращает (where, params, rest), где rest — список (значение, номер
+    фильтра) для условий, которые не удалось перевести в SQL: их нужно
+    применить в Python-прокси.
+    """
+    kinds = kinds or {}
+    clauses, params, rest = [], [], []
+    for i, (value, field) in enumerate(zip(filters, fields)):
+        if not field:
+            if isinstance(value, tuple) or str(value).strip():
+                rest.append((value, i))
+            continue
+        col = f"[{field}]"
+
+        # диапазон дат
+        if isinstance(value, tuple):
+            date_from, date_to = value
+            iso_from = to_iso_date(date_from) if date_from else ""
+            iso_to = to_iso_date(date_to) if date_to else ""
+            if iso_from is None or iso_to is None:
+                rest.append((value, i))
+                continue
+            expr = iso_date_sql(field)
+            if iso_from:
+                clauses.append(f"{expr} >= ?")
+                params.append(iso_from)
+            if iso_to:
+                clauses.append(f"{expr} <= ?")
+                params.append(iso_to)
+            continue
+
+        value = str(value)
+        if not value.strip():
+            continue
+
+        kind = kinds.get(field)
+        if kind == "money":
+            amount = parse_money(value)
+            if amount is None:
+                rest.append((value, i))
+                continue
+            clauses.append(f"ROUND({col}, 2) = ?")
+            params.append(round(amount, 2))
+        elif kind == "date":
+            iso = to_iso_date(value)
+            if iso is None:
+                rest.append((value, i))
+                continue
+            clauses.append(f"{iso_date_sql(field)} = ?")
+            params.append(iso)
+        elif i in exact:
+            clauses.append(f"{col} = ?")
+            params.append(value)
+        else:
+            clauses.append(f"{col} GLOB ?")
+            params.append(glob_contains(value))
+
+    return " AND ".join(clauses), params, rest
@@ -0,0 +1,274 @@
+"""
+Генератор тестовой базы tech.db заданного размера.
+
+Данные детерминированы: одинаковые параметры и --seed дают одинаковую базу.
+Значения берутся из тех же списков, что и диалоги (EQUIP_TYPES, WORK_TYPES,
+DEPARTMENTS, POSITIONS_BY_DEPARTMENT ...), внешние ключи всегда указывают на
+существующие строки. После заполнения применяются миграции (индексы, FTS).
+
+    python generate_data.py bench.db --rows 100000
+    python generate_data.py bench.db --equipment 5000 --maintenance 1000000 --seed 7
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+import db
+from migrations import apply_migrations
+from widgets import (
+    DEPARTMENTS, POSITIONS_BY_DEPARTMENT, EQUIP_TYPES, EQUIP_STATUS,
+    WORKPLACE_STATUS, WORK_TYPES, RETURN_STATES
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ОБОРУДОВАНИЕ (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    название TEXT, инвентарный_номер TEXT, тип TEXT, производитель TEXT,
+    модель TEXT, серийный_номер TEXT, дата_покупки TEXT, статус TEXT
+);
+CREATE TABLE IF NOT EXISTS РАБОЧЕЕ_МЕСТО (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    корпус TEXT, этаж INTEGER, кабинет TEXT, стол TEXT, статус TEXT
+);
+CREATE TABLE IF NOT EXISTS СОТРУДНИК (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    фамилия TEXT, имя TEXT, отчество TEXT, дата_рождения TEXT, отдел TEXT,
+    должность TEXT, email TEXT, номер_телефона TEXT,
+    рабочее_место_id INTEGER REFERENCES РАБОЧЕЕ_МЕСТО(id)
+);
+CREATE TABLE IF NOT EXISTS ВЫДАЧА_ТЕХНИКИ (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    оборудование_id INTEGER REFERENCES ОБОРУДОВАНИЕ(id),
+    сотрудник_id INTEGER REFERENCES СОТРУДНИК(id),
+    рабочее_место_id INTEGER REFERENCES РАБОЧЕЕ_МЕСТО(id),
+    дата_выдачи TEXT, состояние_при_возврате TEXT
+);
+CREATE TABLE IF NOT EXISTS ОБСЛУЖИВАНИЕ (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    оборудование_id INTEGER REFERENCES ОБОРУДОВАНИЕ(id),
+    дата TEXT, тип_работы TEXT, описание TEXT,
+    техник_id INTEGER REFERENCES СОТРУДНИК(id),
+    стоимость REAL
+);
+CREATE TABLE IF NOT EXISTS ПОЛЬЗОВАТЕЛИ (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    логин TEXT UNIQUE, пароль TEXT
+);
+"""
+
+MANUFACTURERS = {
+    "Компьютер": ["Dell", "HP", "Lenovo", "Acer", "ASUS"],
+    "Монитор": ["Samsung", "LG", "Dell", "AOC", "Philips"],
+    "Принтер": ["HP", "Canon", "Kyocera", "Brother", "Xerox"],
+    "Сканер": ["Canon", "Epson", "Fujitsu", "Avision"],
+    "Другое": ["Logitech", "APC", "TP-Link", "D-Link"],
+}
+MODEL_PREFIX = {
+    "Компьютер": "PC", "Монитор": "M", "Принтер": "P", "Сканер": "S", "Другое": "X",
+}
+# вес статусов оборудования в том же порядке, что EQUIP_STATUS
+EQUIP_STATUS_WEIGHTS = [70, 15, 10, 5]
+WORKPLACE_STATUS_WEIGHTS = [75, 15, 5, 5]
+RETURN_STATE_WEIGHTS = [80, 10, 2, 5, 3]
+BUILDINGS = ["А", "Б", "В", "Г", "Д"]
+
+MALE = {
+    "фамилия": ["Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Васильев",
+                "Соколов", "Михайлов", "Новиков", "Федоров", "Морозов", "Волков", "Алексеев"],
+    "имя": ["Александр", "Дмитрий", "Максим", "Сергей", "Андрей", "Алексей", "Иван",
+            "Евгений", "Михаил", "Николай", "Павел", "Роман"],
+    "отчество": ["Александрович", "Дмитриевич", "Сергеевич", "Андреевич", "Иванович",
+                 "Михайлович", "Николаевич", "Павлович"],
+}
+FEMALE = {
+    "фамилия": [f + "а" for f in MALE["фамилия"]],
+    "имя": ["Анна", "Мария", "Елена", "Ольга", "Наталья", "Татьяна", "Ирина",
+            "Светлана", "Екатерина", "Юлия", "Дарья", "Ксения"],
+    "отчество": ["Александровна", "Дмитриевна", "Сергеевна", "Андреевна", "Ивановна",
+                 "Михайловна", "Николаевна", "Павловна"],
+}
+
+WORK_DESCRIPTIONS = {
+    "Профилактика": ["Чистка от пыли", "Плановый осмотр", "Замена термопасты"],
+    "Ремонт": ["Замена блока питания", "Ремонт разъёма", "Восстановление после сбоя"],
+    "Замена комплектующих": ["Замена диска на SSD", "Установка памяти", "Замена картриджа"],
+    "Тестирование": ["Проверка после ремонта", "Диагностика неисправности"],
+    "Настройка": ["Установка ПО", "Настройка сети", "Обновление драйверов"],
+    "Другое": ["Перенос на другое рабочее место", "Консультация пользователя"],
+}
+WORK_COST = {
+    "Профилактика": (300, 1500),
+    "Ремонт": (1000, 15000),
+    "Замена комплектующих": (1500, 25000),
+    "Тестирование": (0, 1000),
+    "Настройка": (0, 2000),
+    "Другое": (0, 3000),
+}
+
+BATCH = 10000
+
+
+def fmt_date(d):
+    return d.strftime("%d.%m.%Y")
+
+
+def random_date(rnd, start, end):
+    return start + timedelta(days=rnd.randrange((end - start).days + 1))
+
+
+def insert_many(conn, table, columns, rows):
+    cols = ", ".join(columns)
+    marks = ", ".join("?" for _ in columns)
+    sql = f"INSERT INTO [{table}] ({cols}) VALUES ({marks})"
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            conn.executemany(sql, batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+
+
+def gen_workplaces(rnd, count):
+    for i in range(count):
+        floor = rnd.randint(1, 9)
+        yield (
+            BUILDINGS[i % len(BUILDINGS)],
+            floor,
+            f"{floor}{rnd.randint(1, 40):02d}",
+            str(rnd.randint(1, 12)),
+            rnd.choices(WORKPLACE_STATUS, WORKPLACE_STATUS_WEIGHTS)[0],
+        )
+
+
+def gen_employees(rnd, count, workplaces):
+    for i in range(1, count + 1):
+        names = MALE if rnd.random() < 0.5 else FEMALE
+        department = rnd.choice(DEPARTMENTS)
+        yield (
+            rnd.choice(names["фамилия"]),
+            rnd.choice(names["имя"]),
+            rnd.choice(names["отчество"]),
+            fmt_date(random_date(rnd, date(1960, 1, 1), date(2005, 12, 31))),
+            department,
+            rnd.choice(POSITIONS_BY_DEPARTMENT[department]),
+            f"user{i}@company.ru",
+            "+79" + "".join(str(rnd.randrange(10)) for _ in range(9)),
+            rnd.randint(1, workplaces),
+        )
+
+
+def gen_equipment(rnd, count):
+    for i in range(1, count + 1):
+        kind = rnd.choice(EQUIP_TYPES)
+        model = f"{MODEL_PREFIX[kind]}-{rnd.randint(100, 999)}"
+        yield (
+            f"{kind} {model}",
+            f"ИН-{i:07d}",
+            kind,
+            rnd.choice(MANUFACTURERS[kind]),
+            model,
+            f"SN{rnd.randrange(16 ** 10):010X}",
+            fmt_date(random_date(rnd, date(2015, 1, 1), date(2024, 12, 31))),
+            rnd.choices(EQUIP_STATUS, EQUIP_STATUS_WEIGHTS)[0],
+        )
+
+
+def gen_issuances(rnd, count, equipment, employees, workplaces, employee_workplace):
+    for _ in range(count):
+        employee = rnd.randint(1, employees)
+        # обычно технику выдают на рабочее место сотрудника
+        workplace = employee_workplace[employee] if rnd.random() < 0.9 else rnd.randint(1, workplaces)
+        yield (
+            rnd.randint(1, equipment),
+            employee,
+            workplace,
+            fmt_date(random_date(rnd, date(2018, 1, 1), date(2025, 6, 30))),
+            rnd.choices(RETURN_STATES, RETURN_STATE_WEIGHTS)[0],
+        )
+
+
+def gen_maintenance(rnd, count, equipment, technicians):
+    for _ in range(count):
+        work = rnd.choice(WORK_TYPES)
+        low, high = WORK_COST[work]
+        yield (
+            rnd.randint(1, equipment),
+            fmt_date(random_date(rnd, date(2018, 1, 1), date(2025, 6, 30))),
+            work,
+            rnd.choice(WORK_DESCRIPTIONS[work]),
+            rnd.choice(technicians) if technicians and rnd.random() < 0.95 else None,
+            round(rnd.uniform(low, high), 2),
+        )
+
+
+def generate(db_path, equipment, employees, workplaces, issuances, maintenance, seed=1, migrate=True):
+    """Создаёт базу db_path (файл не должен существовать) и заполняет её."""
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} уже существует")
+    rnd = random.Random(seed)
+    conn = db.connect_sqlite(db_path)
+    try:
+        conn.executescript(SCHEMA)
+        insert_many(conn, "РАБОЧЕЕ_МЕСТО", ["корпус", "этаж", "кабинет", "стол", "статус"],
+                    gen_workplaces(rnd, workplaces))
+        insert_many(conn, "СОТРУДНИК",
+                    ["фамилия", "имя", "отчество", "дата_рождения", "отдел", "должность",
+                     "email", "номер_телефона", "рабочее_место_id"],
+                    gen_employees(rnd, employees, workplaces))
+        insert_many(conn, "ОБОРУДОВАНИЕ",
+                    ["название", "инвентарный_номер", "тип", "производитель", "модель",
+                     "серийный_номер", "дата_покупки", "статус"],
+                    gen_equipment(rnd, equipment))
+
+        employee_workplace = dict(conn.execute("SELECT id, рабочее_место_id FROM СОТРУДНИК"))
+        technicians = [row[0] for row in conn.execute(
+            "SELECT id FROM СОТРУДНИК WHERE должность = 'Техник' ORDER BY id")]
+        insert_many(conn, "ВЫДАЧА_ТЕХНИКИ",
+                    ["оборудование_id", "сотрудник_id", "рабочее_место_id", "дата_выдачи",
+                     "состояние_при_возврате"],
+                    gen_issuances(rnd, issuances, equipment, employees, workplaces, employee_workplace))
+        insert_many(conn, "ОБСЛУЖИВАНИЕ",
+                    ["оборудование_id", "дата", "тип_работы", "описание", "техник_id", "стоимость"],
+                    gen_maintenance(rnd, maintenance, equipment, technicians))
+        conn.execute("INSERT INTO ПОЛЬЗОВАТЕЛИ (логин, пароль) VALUES ('admin1', 'admin123')")
+        conn.commit()
+    finally:
+        conn.close()
+    if migrate:
+        apply_migrations(db_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генератор тестовой базы tech.db")
+    parser.add_argument("db_path")
+    parser.add_argument("--rows", type=int, default=10000,
+                        help="строк в ОБОРУДОВАНИЕ, СОТРУДНИК, ВЫДАЧА_ТЕХНИКИ и ОБСЛУЖИВАНИЕ")
+    parser.add_argument("--equipment", type=int)
+    parser.add_argument("--employees", type=int)
+    parser.add_argument("--workplaces", type=int, help="по умолчанию rows / 10")
+    parser.add_argument("--issuances", type=int)
+    parser.add_argument("--maintenance", type=int)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-migrate", action="store_true", help="не строить индексы и FTS")
+    args = parser.parse_args(argv)
+
+    rows = args.rows
+    generate(
+        args.db_path,
+        equipment=args.equipment or rows,
+        employees=args.employees or rows,
+        workplaces=args.workplaces or max(rows // 10, 1),
+        issuances=args.issuances or rows,
+        maintenance=args.maintenance or rows,
+        seed=args.seed,
+        migrate=not args.no_migrate,
+    )
+    print(f"{args.db_path}: готово")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
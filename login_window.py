@@ -1,13 +1,11 @@
 import sys
 import sqlite3
-import os
 from PyQt6.QtWidgets import (
     QApplication, QDialog, QLabel, QLineEdit, QPushButton,
     QVBoxLayout, QHBoxLayout, QCheckBox, QMessageBox
 )
 from PyQt6.QtCore import Qt
-
-DB_PATH = os.path.join(os.path.dirname(__file__), "tech.db")
+from db import connect_sqlite
 
 class LoginWindow(QDialog):
     def __init__(self):
@@ -129,7 +127,7 @@ class LoginWindow(QDialog):
             return
 
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = connect_sqlite()
             cursor = conn.cursor()
             cursor.execute("SELECT пароль FROM ПОЛЬЗОВАТЕЛИ WHERE логин = ?", (login,))
             row = cursor.fetchone()
@@ -164,7 +162,7 @@ class LoginWindow(QDialog):
             return
 
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = connect_sqlite()
             cursor = conn.cursor()
             cursor.execute("INSERT INTO ПОЛЬЗОВАТЕЛИ (логин, пароль) VALUES (?, ?)", (login, password))
             conn.commit()
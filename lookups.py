@@ -0,0 +1,179 @@
+"""
+Кэш справочников для выпадающих списков AddRowDialog/EditRowDialog.
+
+Раньше каждый диалог заново читал ОБОРУДОВАНИЕ, СОТРУДНИК и РАБОЧЕЕ_МЕСТО и
+добавлял в QComboBox по строке. Теперь список каждого вида — один общий
+LookupModel на весь процесс; диалоги только подключают его к своим
+спискам. Модель перечитывается, когда меняется счётчик изменений её
+таблицы в ВЕРСИИ_ТАБЛИЦ: его увеличивают триггеры, поэтому изменения из
+других окон и программ тоже видны.
+
+Списки редактируемые, с автодополнением по подстроке, и не меряют все
+элементы при показе — с десятками тысяч устройств диалог открывается сразу.
+"""
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt6.QtSql import QSqlQuery
+from PyQt6.QtWidgets import QComboBox, QCompleter
+
+from query_builder import fetch_value
+
+VERSIONS_TABLE = "ВЕРСИИ_ТАБЛИЦ"
+REFERENCE_TABLES = ["ОБОРУДОВАНИЕ", "СОТРУДНИК", "РАБОЧЕЕ_МЕСТО"]
+
+
+def _equipment_label(name, maker, serial):
+    return f"{name} ({maker}, {serial})"
+
+
+def _person_label(surname, name, patronymic):
+    label = f"{surname} {name}"
+    if patronymic and patronymic.strip() != "-":
+        label += f" {patronymic}"
+    return label
+
+
+def _technician_label(surname, name):
+    return f"{surname} {name}"
+
+
+def _workplace_label(building, floor, room, desk):
+    return f"{building} | этаж {floor} | каб. {room} | стол {desk}"
+
+
+# вид списка: (таблица, запрос id и полей подписи, подпись, первый пункт без id)
+LOOKUPS = {
+    "equipment": ("ОБОРУДОВАНИЕ", "SELECT id, название, производитель, серийный_номер FROM ОБОРУДОВАНИЕ",
+                  _equipment_label, None),
+    "employee": ("СОТРУДНИК", "SELECT id, фамилия, имя, отчество FROM СОТРУДНИК", _person_label, None),
+    "technician": ("СОТРУДНИК", "SELECT id, фамилия, имя FROM СОТРУДНИК", _technician_label, "Не указано"),
+    "workplace": ("РАБОЧЕЕ_МЕСТО", "SELECT id, корпус, этаж, кабинет, стол FROM РАБОЧЕЕ_МЕСТО",
+                  _workplace_label, None),
+}
+
+
+# --- счётчики изменений (вызывается из migrations.py) -----------------------
+
+def create_change_counters(conn):
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} (таблица TEXT PRIMARY KEY, версия INTEGER NOT NULL)")
+    for table in REFERENCE_TABLES:
+        if table not in tables:
+            continue
+        conn.execute(f"INSERT OR IGNORE INTO {VERSIONS_TABLE} VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            name = f"{VERSIONS_TABLE}_{table}_{event.lower()}"
+            conn.execute(f"DROP TRIGGER IF EXISTS [{name}]")
+            conn.execute(f"CREATE TRIGGER [{name}] AFTER {event} ON [{table}] BEGIN "
+                         f"UPDATE {VERSIONS_TABLE} SET версия = версия + 1 WHERE таблица = '{table}'; END")
+
+
+def table_version(table):
+    """Счётчик изменений таблицы; None, если счётчиков в базе нет."""
+    return fetch_value(f"SELECT версия FROM {VERSIONS_TABLE} WHERE таблица = ?", [table])
+
+
+# --- модель -----------------------------------------------------------------
+
+class LookupModel(QAbstractListModel):
+    """Подписи строк справочника; id строки — в Qt.ItemDataRole.UserRole и в ids."""
+    def __init__(self, kind, parent=None):
+        super().__init__(parent)
+        self.kind = kind
+        self.ids = []
+        self.labels = []
+        self._rows = {}
+        self.version = None
+        self.loaded = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.labels)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self.labels[index.row()]
+        if role == Qt.ItemDataRole.UserRole:
+            return self.ids[index.row()]
+        return None
+
+    def row_of(self, record_id):
+        """Номер строки по id или -1."""
+        return self._rows.get(record_id, -1)
+
+    def reload(self, version):
+        table, sql, label, empty = LOOKUPS[self.kind]
+        ids, labels = ([None], [empty]) if empty else ([], [])
+        q = QSqlQuery()
+        q.setForwardOnly(True)
+        q.exec(sql)
+        ncols = q.record().count()
+        while q.next():
+            ids.append(q.value(0))
+            labels.append(label(*(q.value(i) for i in range(1, ncols))))
+        self.beginResetModel()
+        # списки ids подменяются на месте: диалоги держат ссылку на них
+        self.ids[:] = ids
+        self.labels = labels
+        self._rows = {record_id: row for row, record_id in enumerate(ids)}
+        self.endResetModel()
+        self.version = version
+        self.loaded = True
+
+
+_models = {}
+
+
+def lookup_model(kind):
+    """Общая модель списка вида kind, перечитанная, если таблица менялась."""
+    model = _models.get(kind)
+    if model is None:
+        model = _models[kind] = LookupModel(kind)
+    version = table_version(LOOKUPS[kind][0])
+    if not model.loaded or version is None or version != model.version:
+        model.reload(version)
+    return model
+
+
+def invalidate(table=None):
+    """Сбрасывает кэш списков таблицы (или всех) — например, после смены базы."""
+    for model in _models.values():
+        if table is None or LOOKUPS[model.kind][0] == table:
+            model.loaded = False
+
+
+def lookup_combo(kind, parent=None):
+    """QComboBox на общей модели с автодополнением по подстроке."""
+    model = lookup_model(kind)
+    combo = QComboBox(parent)
+    # порядок важен: список делается редактируемым и получает своё
+    # автодополнение до модели, иначе setEditable() строит стандартное
+    # автодополнение по всем строкам модели (секунда на 50 тысяч)
+    combo.setEditable(True)
+    combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+    completer = QCompleter(combo)
+    completer.setFilterMode(Qt.MatchFlag.MatchContains)
+    completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+    completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
+    completer.popup().setUniformItemSizes(True)
+    combo.setCompleter(completer)
+    # ширина по умолчанию считается по всем элементам — задаём её явно
+    combo.setSizeAdjustPolicy(QComboBox.SizeAdjustPolicy.AdjustToMinimumContentsLengthWithIcon)
+    combo.setMinimumContentsLength(40)
+    combo.view().setUniformItemSizes(True)
+    combo.setModel(model)
+    return combo
+
+
+def lookup_index(combo):
+    """
+    Строка списка, соответствующая введённому тексту, или -1.
+
+    currentIndex() редактируемого списка остаётся прежним, если набрать
+    текст, которого нет в списке, — по нему сохранился бы чужой id.
+    """
+    text = combo.currentText()
+    row = combo.currentIndex()
+    if row >= 0 and combo.itemText(row) == text:
+        return row
+    return combo.findText(text)
@@ -1,11 +1,15 @@
+import startup_trace
 import sys
 from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QTabWidget, 
                             QLabel, QFrame)
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from login_window import LoginWindow
 from db import create_connection
+from migrations import apply_migrations
 from widgets import TableWidget
 
+startup_trace.checkpoint("импорт модулей")
+
 TABLES = [
     ("Оборудование", "ОБОРУДОВАНИЕ"),
     ("Рабочие места", "РАБОЧЕЕ_МЕСТО"),
@@ -92,19 +96,44 @@ class MainWindow(QWidget):
             }
         """)
         
+        # Вкладки пустые, пока их не откроют: TableWidget с запросом и
+        # подгонкой колонок строится при первой активации
         for label, table in TABLES:
-            self.tabs.addTab(TableWidget(table), label)
+            page = QWidget()
+            page.table_name = table
+            page.table_widget = None
+            page_layout = QVBoxLayout(page)
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            self.tabs.addTab(page, label)
+        self.tabs.currentChanged.connect(self.load_tab)
+        self.load_tab(self.tabs.currentIndex())
 
         main_layout.addWidget(self.tabs, stretch=1)
 
+    def load_tab(self, index):
+        page = self.tabs.widget(index)
+        if page is None or page.table_widget is not None:
+            return
+        with startup_trace.span(f"вкладка {page.table_name}"):
+            page.table_widget = TableWidget(page.table_name)
+            page.layout().addWidget(page.table_widget)
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    startup_trace.checkpoint("QApplication")
+    apply_migrations()
+    startup_trace.checkpoint("миграции")
     create_connection()
+    startup_trace.checkpoint("подключение")
 
     login = LoginWindow()
     if login.exec():
+        startup_trace.checkpoint("вход")
         window = MainWindow()
         window.showMaximized()
+        startup_trace.checkpoint("окно")
+        # итог — после первой отрисовки окна
+        QTimer.singleShot(0, startup_trace.ready)
         sys.exit(app.exec())
     else:
         sys.exit()
\ No newline at end of file
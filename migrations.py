@@ -0,0 +1,322 @@
+"""
+Миграции схемы tech.db.
+
+Номер последней применённой миграции хранится в PRAGMA user_version, поэтому
+каждая миграция выполняется один раз. Приложение применяет их при запуске;
+вручную: python migrations.py [путь к базе]
+
+python migrations.py --explain [путь к базе] выводит EXPLAIN QUERY PLAN для
+запросов приложения и отмечает полные сканирования таблиц.
+"""
+import sys
+from datetime import datetime
+
+import db
+from filter_compiler import iso_date_sql
+from queries import (JOIN_TAB_QUERIES, WORKPLACE_LABELS, WORKPLACE_LABELS_SQL,
+                     equipment_costs_query, technicians_summary_query)
+from search_index import (JOIN_SOURCES, search_table, create_label_search_index, create_search_index,
+                          update_dependency_triggers)
+from summary_tables import SUMMARY_TABLE, create_summary_tables
+from lookups import create_change_counters
+from change_log import CHANGE_LOG, LOGGED_TABLES, create_change_log
+from sort_keys import create_sort_keys, sort_column, sort_table
+from value_index import delta_sql, load_sql
+
+# Колонки с датами в формате dd.MM.yyyy (так их пишут QDateEdit в диалогах)
+DATE_COLUMNS = [
+    ("ОБСЛУЖИВАНИЕ", "дата"),
+    ("ВЫДАЧА_ТЕХНИКИ", "дата_выдачи"),
+    ("СОТРУДНИК", "дата_рождения"),
+    ("ОБОРУДОВАНИЕ", "дата_покупки"),
+]
+
+# Индексы по внешним ключам JOIN-вкладок (по ним же триггеры search_index.py
+# ищут строки при изменении справочника) и составные индексы по колонкам,
+# по которым чаще всего фильтруют справочники: условие [a] = ? из
+# FilterDialog ищется по индексу. Списки значений FilterDialog читаются
+# не отсюда, а из индекса значений в памяти (value_index.py).
+JOIN_INDEXES = [
+    ("ОБСЛУЖИВАНИЕ", ["оборудование_id"]),
+    ("ОБСЛУЖИВАНИЕ", ["техник_id"]),
+    ("ВЫДАЧА_ТЕХНИКИ", ["оборудование_id"]),
+    ("ВЫДАЧА_ТЕХНИКИ", ["сотрудник_id"]),
+    ("ВЫДАЧА_ТЕХНИКИ", ["рабочее_место_id"]),
+    ("СОТРУДНИК", ["рабочее_место_id"]),
+    ("СОТРУДНИК", ["отдел", "должность"]),
+    ("ОБОРУДОВАНИЕ", ["тип", "производитель", "модель"]),
+    ("ОБОРУДОВАНИЕ", ["статус"]),
+    ("РАБОЧЕЕ_МЕСТО", ["корпус", "этаж", "кабинет"]),
+    ("РАБОЧЕЕ_МЕСТО", ["статус"]),
+]
+
+# Покрывающий индекс сводки по техникам (queries.technicians_summary_query):
+# группировка по (техник, оборудование) идёт по нему в порядке ключа, дата,
+# стоимость и тип работы читаются из индекса, а не из строк таблицы.
+SUMMARY_INDEX = ("ОБСЛУЖИВАНИЕ", ["[техник_id]", "[оборудование_id]", iso_date_sql("дата"),
+                                  "[стоимость]", "[тип_работы]"])
+
+# Форматы, которые встречались в старых данных
+LEGACY_DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%Y.%m.%d", "%d.%m.%Y"]
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info([{table}])")]
+
+
+def existing_date_columns(conn):
+    return [(t, c) for t, c in DATE_COLUMNS if c in table_columns(conn, t)]
+
+
+def normalize_dates(conn):
+    """Приводит все даты к dd.MM.yyyy, чтобы выражение iso_date_sql было верным."""
+    for table, column in existing_date_columns(conn):
+        rows = conn.execute(
+            f"SELECT id, [{column}] FROM [{table}] "
+            f"WHERE [{column}] IS NOT NULL AND [{column}] <> '' "
+            f"AND [{column}] NOT GLOB '[0-9][0-9].[0-9][0-9].[0-9][0-9][0-9][0-9]'"
+        ).fetchall()
+        for row_id, value in rows:
+            for fmt in LEGACY_DATE_FORMATS:
+                try:
+                    parsed = datetime.strptime(str(value).strip(), fmt)
+                except ValueError:
+                    continue
+                conn.execute(
+                    f"UPDATE [{table}] SET [{column}] = ? WHERE id = ?",
+                    (parsed.strftime("%d.%m.%Y"), row_id)
+                )
+                break
+
+
+def create_date_indexes(conn):
+    """
+    Индексы по выражению yyyy-MM-dd. SQLite сам поддерживает их при INSERT и
+    UPDATE, а фильтры с тем же выражением (filter_compiler.iso_date_sql)
+    выполняются поиском по диапазону индекса, а не полным сканированием.
+    """
+    for table, column in existing_date_columns(conn):
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS [idx_{table}_{column}_iso] "
+            f"ON [{table}]({iso_date_sql(column)})"
+        )
+
+
+def create_join_indexes(conn):
+    for table, columns in JOIN_INDEXES:
+        if not set(columns) <= set(table_columns(conn, table)):
+            continue
+        name = f"idx_{table}_{'_'.join(columns)}"
+        cols = ", ".join(f"[{c}]" for c in columns)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS [{name}] ON [{table}]({cols})")
+
+
+def create_summary_index(conn):
+    table, columns = SUMMARY_INDEX
+    if not {"техник_id", "оборудование_id", "дата", "стоимость", "тип_работы"} <= set(table_columns(conn, table)):
+        return
+    conn.execute(f"CREATE INDEX IF NOT EXISTS [idx_{table}_сводка] ON [{table}]({', '.join(columns)})")
+
+
+def create_workplace_labels(conn):
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "РАБОЧЕЕ_МЕСТО" not in tables:
+        return
+    conn.execute(f"DROP VIEW IF EXISTS [{WORKPLACE_LABELS}]")
+    conn.execute(f"CREATE VIEW [{WORKPLACE_LABELS}] AS {WORKPLACE_LABELS_SQL}")
+
+
+def analyze(conn):
+    """Статистика для планировщика, чтобы новые индексы выбирались."""
+    conn.execute("ANALYZE")
+
+
+# (номер, описание, шаги)
+MIGRATIONS = [
+    (1, "Единый формат дат и индексы по yyyy-MM-dd", [normalize_dates, create_date_indexes]),
+    (2, "Полнотекстовый индекс FTS5 для поиска по вкладкам", [create_search_index]),
+    (3, "Индексы по ключам JOIN и для списков FilterDialog", [create_join_indexes, analyze]),
+    (4, "Покрывающий индекс для сводки по техникам", [create_summary_index, analyze]),
+    (5, "Сводка обслуживания по техникам, оборудованию и месяцам на триггерах", [create_summary_tables, analyze]),
+    (6, "Счётчики изменений справочников для кэша выпадающих списков", [create_change_counters]),
+    (7, "Подписи рабочих мест для вкладки СОТРУДНИК", [create_workplace_labels]),
+    (8, "Журнал изменений выдачи и обслуживания для точечного обновления вкладок", [create_change_log]),
+    (9, "Поиск переиндексирует строки только при изменении подписей справочников",
+     [update_dependency_triggers]),
+    (10, "Ключи сортировки JOIN-вкладок с индексами для сортировки в SQL", [create_sort_keys, analyze]),
+    (11, "Поиск по вкладке СОТРУДНИК — по подписи рабочего места, а не по id", [create_label_search_index]),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Применяет недостающие миграции, каждую в своей транзакции."""
+    version = schema_version(conn)
+    for number, title, steps in MIGRATIONS:
+        if number <= version:
+            continue
+        conn.execute("BEGIN")
+        try:
+            for step in steps:
+                step(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        version = number
+    return version
+
+
+# --- EXPLAIN QUERY PLAN -----------------------------------------------------
+
+def app_queries(conn):
+    """
+    Запросы, которые выполняет приложение, в виде (название, sql, параметры,
+    вид). Вид:
+      "lookup" — должен идти по индексу;
+      "page"   — страница по id: проход таблицы в порядке rowid с LIMIT
+                 допустим, сортировка во временном B-дереве — нет;
+      "full"   — по смыслу читает всю таблицу (список вкладки, число строк).
+    Формы запросов PagedQueryModel повторяют paged_model.py.
+    """
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    queries = []
+
+    for table, sql in JOIN_TAB_QUERIES.items():
+        if table not in tables:
+            continue
+        base = f"FROM ({sql}) AS base"
+        page = f"SELECT * {base}"
+        queries += [
+            (f"{table}: число строк", f"SELECT COUNT(*) {base}", [], "full"),
+            (f"{table}: первая страница", f"{page} ORDER BY [id] DESC LIMIT ?", [256], "page"),
+            (f"{table}: следующая страница", f"{page} WHERE [id] < ? ORDER BY [id] DESC LIMIT ?", [1000, 256], "page"),
+            (f"{table}: переход скроллбаром",
+             f"SELECT [id] {base} ORDER BY [id] DESC LIMIT 1 OFFSET ?", [10000], "page"),
+        ]
+        if sort_table(table) in tables:
+            # сортировка по колонке: страницы по индексу (ключ, id) таблицы ключей
+            key = f"sk.[{sort_column(JOIN_SOURCES[table]['columns'][0][0])}]"
+            sorted_base = f"FROM [{sort_table(table)}] AS sk CROSS JOIN ({sql}) AS base ON base.[id] = sk.id"
+            queries += [
+                (f"{table}: первая страница по колонке",
+                 f"SELECT {key}, sk.id, base.* {sorted_base} ORDER BY {key} ASC, sk.id ASC LIMIT ?", [256], "page"),
+                (f"{table}: следующая страница по колонке",
+                 f"SELECT {key}, sk.id, base.* {sorted_base} WHERE ({key}, sk.id) > (?, ?) "
+                 f"ORDER BY {key} ASC, sk.id ASC LIMIT ?", ["", 0, 256], "page"),
+            ]
+        date_field = next((f for f, _ in JOIN_SOURCES[table]["columns"] if "дата" in f.lower()), None)
+        if date_field:
+            iso = iso_date_sql(date_field)
+            queries.append((f"{table}: фильтр по дате",
+                            f"SELECT COUNT(*) {base} WHERE {iso} >= ? AND {iso} <= ?",
+                            ["2024-01-01", "2024-12-31"], "lookup"))
+        if search_table(table) in tables:
+            keys_sql = f"SELECT rowid FROM [{search_table(table)}] WHERE [{search_table(table)}] MATCH ?"
+            queries.append((f"{table}: поиск", keys_sql, ['"иванов"'], "lookup"))
+            queries.append((f"{table}: номера найденных строк",
+                            f"SELECT rn FROM (SELECT [id] AS k, ROW_NUMBER() OVER (ORDER BY [id] DESC) - 1 AS rn "
+                            f"{base}) WHERE k IN ({keys_sql}) ORDER BY rn", ['"иванов"'], "full"))
+        # триггеры индекса поиска при изменении справочника
+        for dep_table, fk in JOIN_SOURCES[table]["depends"]:
+            queries.append((f"{table}: строки, ссылающиеся на {dep_table}",
+                            f"SELECT id FROM [{table}] WHERE [{fk}] = ?", [1], "lookup"))
+        queries.append((f"{table}: удаление", f"DELETE FROM [{table}] WHERE id = ?", [-1], "lookup"))
+
+    if {"ОБСЛУЖИВАНИЕ", "СОТРУДНИК", "ОБОРУДОВАНИЕ"} <= tables:
+        sql, params = technicians_summary_query("2024-01-01", "2024-12-31")
+        queries.append(("ОБСЛУЖИВАНИЕ: сводка по техникам", sql, params, "lookup"))
+    if SUMMARY_TABLE in tables:
+        # сводка читается целиком, но в ней группы, а не заявки
+        sql, params = technicians_summary_query(use_summary=True)
+        queries.append((f"{SUMMARY_TABLE}: сводка по техникам", sql, params, "full"))
+        sql, params = equipment_costs_query()
+        queries.append((f"{SUMMARY_TABLE}: затраты по оборудованию", sql, params, "full"))
+        queries.append((f"{SUMMARY_TABLE}: пересчёт первой даты после удаления",
+                        f"SELECT MIN({iso_date_sql('дата')}) FROM ОБСЛУЖИВАНИЕ WHERE техник_id IS ? "
+                        f"AND оборудование_id IS ? AND {iso_date_sql('дата')} BETWEEN ? AND ?",
+                        [1, 1, "2024-01-01", "2024-01-31"], "lookup"))
+
+    for table in ("ОБОРУДОВАНИЕ", "РАБОЧЕЕ_МЕСТО", "СОТРУДНИК"):
+        if table not in tables:
+            continue
+        queries.append((f"{table}: список", f"SELECT * FROM [{table}]", [], "full"))
+
+    # FilterDialog: индекс значений (value_index.py) читает вкладку целиком в
+    # порядке id — без сортировки во временном B-дереве — и потом только
+    # строки из журнала изменений (он есть только у JOIN-вкладок)
+    for table in list(JOIN_TAB_QUERIES) + ["ОБОРУДОВАНИЕ", "РАБОЧЕЕ_МЕСТО", "СОТРУДНИК"]:
+        if table not in tables:
+            continue
+        queries.append((f"{table}: индекс значений фильтра", load_sql(table), [], "page"))
+        if table in LOGGED_TABLES:
+            queries.append((f"{table}: строки индекса значений из журнала", delta_sql(table, 2), [1, 2], "lookup"))
+    if CHANGE_LOG in tables:
+        queries.append((f"{CHANGE_LOG}: изменения вкладки с номера",
+                        f"SELECT запись_id, действие FROM {CHANGE_LOG} WHERE номер > ? AND таблица = ? "
+                        f"ORDER BY номер", [0, "ОБСЛУЖИВАНИЕ"], "lookup"))
+    return queries
+
+
+def explain(conn, sql, params=()):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", list(params))]
+
+
+def full_scans(plan, kind="lookup"):
+    """Строки плана, которые для запроса такого вида означают лишнее чтение."""
+    if kind == "full":
+        return []
+    if kind == "page":
+        return [line for line in plan if "TEMP B-TREE FOR ORDER BY" in line]
+    # проход по результату подзапроса (CTE) — не чтение таблицы
+    subqueries = {line.split()[1] for line in plan if line.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+    return [line for line in plan
+            if line.startswith("SCAN ") and " USING " not in line and "VIRTUAL TABLE" not in line
+            and not line.startswith("SCAN CONSTANT ROW") and line.split()[1] not in subqueries]
+
+
+def explain_queries(db_path=None):
+    """Выводит планы запросов приложения; возвращает число лишних сканирований."""
+    conn = db.connect_sqlite(db_path)
+    problems = 0
+    try:
+        for title, sql, params, kind in app_queries(conn):
+            try:
+                plan = explain(conn, sql, params)
+            except Exception as e:
+                print(f"[ОШИБКА] {title}: {e}")
+                continue
+            if full_scans(plan, kind):
+                mark = "СКАН"
+                problems += 1
+            else:
+                mark = "ok"
+            print(f"[{mark}] {title}")
+            for line in plan:
+                print(f"    {line}")
+    finally:
+        conn.close()
+    return problems
+
+
+def apply_migrations(db_path=None):
+    conn = db.connect_sqlite(db_path, isolation_level=None)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "--explain":
+        path = args[1] if len(args) > 1 else db.DB_PATH
+        found = explain_queries(path)
+        print(f"Полных сканирований: {found}")
+        sys.exit(1 if found else 0)
+    path = args[0] if args else db.DB_PATH
+    print(f"{path}: версия схемы {apply_migrations(path)}")
@@ -0,0 +1,527 @@
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt, QModelIndex, QSortFilterProxyModel
+from PyQt6.QtSql import QSqlQueryModel
+
+from change_log import INSERTED, changes_since, last_change
+from filter_compiler import to_iso_date
+from query_builder import fetch_rows, fetch_value, run
+from sort_keys import sort_column, sort_columns, sort_table
+
+# Роль с типизированным ключом сортировки: по ней прокси сравнивает строки,
+# если сортирует сам, а не по тексту "1 234.00 ₽" или "dd.MM.yyyy"
+SORT_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+def sort_key(value, kind=None):
+    """Ключ сортировки значения: дата -> yyyy-MM-dd, число -> float; пусто -> ''."""
+    if value is None or value == "":
+        return ""
+    if kind == "date":
+        return to_iso_date(value) or str(value)
+    if kind == "number":
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return str(value)
+    return value
+
+
+class PagedQueryModel(QSqlQueryModel):
+    """
+    QSqlQueryModel, который не загружает результат запроса целиком.
+    Строки читаются страницами по PAGE_SIZE штук с keyset-пагинацией по
+    колонке id (WHERE id > последний_id ORDER BY id LIMIT n), последние
+    MAX_PAGES страниц держатся в LRU-кэше. Снаружи модель ведёт себя как
+    обычный QSqlQueryModel: record(), headerData(), setHeaderData() и
+    setQuery(sql) работают как прежде.
+
+    При сортировке по другой колонке (setSortKeys, sort_keys.py) порядок —
+    (ключ колонки, id) из таблицы ключей, и страницы ищутся по её индексу
+    тем же keyset-условием: WHERE (ключ, id) > (?, ?).
+    """
+    PAGE_SIZE = 256
+    MAX_PAGES = 64
+
+    def __init__(self, sql_query: str = "", parent=None, page_size=None, max_pages=None):
+        super().__init__(parent)
+        self.page_size = page_size or self.PAGE_SIZE
+        self.max_pages = max_pages or self.MAX_PAGES
+        self.key_field = "id"
+        self._base_sql = ""
+        self._where = ""
+        self._params = []
+        self._descending = False
+        self._row_count = 0
+        self._key_col = -1
+        self._pages = OrderedDict()   # номер страницы -> список кортежей
+        self._anchors = {}            # номер страницы -> (оператор, значения ключей порядка)
+        self._sort_table = None       # таблица ключей сортировки (sort_keys.py)
+        self._sort_columns = set()
+        self._sort_col = -1           # колонка сортировки; -1 — по id
+        self._change_table = None     # таблица, изменения которой читаются из журнала
+        self._change_number = None    # последняя учтённая запись журнала
+        if sql_query:
+            self.setQuery(sql_query)
+
+    # --- запрос ---------------------------------------------------------
+
+    def setQuery(self, query: str):
+        # Сам QSqlQueryModel получает пустой результат (LIMIT 0): от него нам
+        # нужны только имена колонок, заголовки и record().
+        self._base_sql = query
+        self._clear_window()
+        self._mark_synced()
+        self._row_count = self._count_rows()
+        super().setQuery(f"SELECT * FROM ({query}) LIMIT 0")
+        self._key_col = super().record().indexOf(self.key_field)
+
+    def baseQuery(self):
+        return self._base_sql
+
+    def setFilter(self, where, params=()):
+        """
+        Условие WHERE поверх исходного запроса. В условии можно ссылаться на
+        колонки результата по их именам ([Тип работы], [Дата] ...), значения
+        передаются параметрами.
+        """
+        self._where = where or ""
+        self._params = list(params)
+        self.refresh()
+
+    def filter(self):
+        return self._where, list(self._params)
+
+    def refresh(self):
+        """Перечитывает количество строк и сбрасывает кэш страниц."""
+        self.beginResetModel()
+        self._clear_window()
+        self._mark_synced()
+        self._row_count = self._count_rows()
+        self.endResetModel()
+
+    def _clear_window(self):
+        self._pages.clear()
+        self._anchors.clear()
+
+    # --- точечное обновление по журналу изменений -------------------------
+
+    def trackChanges(self, table):
+        """Обновлять модель по журналу изменений таблицы table (change_log.py)."""
+        self._change_table = table
+        self._mark_synced()
+
+    def _mark_synced(self):
+        if self._change_table is not None:
+            self._change_number = last_change()
+
+    def syncChanges(self):
+        """
+        Приводит модель к базе после add/edit/delete: перечитываются только
+        строки, id которых записаны в журнал с прошлой синхронизации, а вид
+        получает сигналы по строкам, а не сброс модели — прокрутка и
+        выделение сохраняются. Если журнала нет, он обрезан, изменений
+        больше страницы или по фильтру нельзя понять, была ли строка в
+        модели, модель перечитывается целиком (refresh).
+        """
+        found = changes_since(self._change_table, self._change_number) if self._change_table else None
+        if found is None:
+            self.refresh()
+            return
+        number, changes = found
+        if len(changes) > self.page_size:
+            self.refresh()
+            return
+
+        current = self._rows_by_key(list(changes))
+        if self._sort_col >= 0:
+            if not self._sync_sorted(changes, current):
+                self.refresh()
+                return
+            self._change_number = number
+            return
+
+        plan = []
+        for key in sorted(changes):
+            first, last = changes[key]
+            row = self._cached_row(key)
+            if row is not None:
+                was_present = True
+            elif first == INSERTED:
+                was_present = False
+            elif self._where:
+                self.refresh()
+                return
+            else:
+                was_present = True
+            plan.append((key, was_present, row))
+
+        removed = [key for key, was_present, _ in plan if was_present and key not in current]
+        added = [key for key, was_present, _ in plan if not was_present and key in current]
+
+        def before(other, key):
+            return other > key if self._descending else other < key
+
+        # все номера считаются до первого сигнала, по строкам модели
+        replaced, removed_rows = [], []
+        for key, was_present, row in plan:
+            if not was_present:
+                continue
+            now = current.get(key)
+            if now is not None:
+                if row is not None:
+                    replaced.append((row, now))
+                continue
+            if row is None:
+                # _position_of() считает по базе, где изменения уже есть: в
+                # модели выше строки ещё стоят удалённые и нет новых
+                row = (self._position_of(key)
+                       + sum(before(other, key) for other in removed)
+                       - sum(before(other, key) for other in added))
+            removed_rows.append(row)
+
+        for row, values in replaced:
+            self._replace_row(row, values)
+        # снизу вверх — номера ещё не удалённых строк не сдвигаются
+        for row in sorted(removed_rows, reverse=True):
+            self._remove_row(row)
+        # новые id больше всех прежних (rowid SQLite), поэтому строки
+        # встают в конец при возрастании и в начало при убывании
+        for _ in added:
+            self._insert_row(0 if self._descending else self._row_count)
+        self._change_number = number
+
+    def _sync_sorted(self, changes, current):
+        """
+        syncChanges() при сортировке по колонке: строка, у которой значение
+        этой колонки не изменилось, обновляется на месте, иначе убирается и
+        вставляется туда, где она теперь по порядку. False — место прежней
+        строки неизвестно (её страницы нет в кэше).
+        """
+        replaced, removed, added = [], [], []
+        for key, (first, last) in changes.items():
+            row = self._cached_row(key)
+            now = current.get(key)
+            if row is None:
+                if first != INSERTED:
+                    return False
+                if now is not None:
+                    added.append(key)
+                continue
+            if now is None:
+                removed.append(row)
+            elif now[self._sort_col] == self.rowValues(row)[self._sort_col]:
+                replaced.append((row, now))
+            else:
+                removed.append(row)
+                added.append(key)
+
+        for row, values in replaced:
+            self._replace_row(row, values)
+        # снизу вверх — номера ещё не удалённых строк не сдвигаются
+        for row in sorted(removed, reverse=True):
+            self._remove_row(row)
+        # места считаются по базе, где все изменения уже есть: вставляя по
+        # возрастанию, каждая строка встаёт на своё итоговое место
+        for row in sorted(self._position_of(key) for key in added):
+            self._insert_row(row)
+        return True
+
+    def _rows_by_key(self, keys):
+        """{id: кортеж значений} для строк с этими id, проходящих фильтр."""
+        where = [f"base.[{self.key_field}] IN ({', '.join('?' * len(keys))})"]
+        if self._where:
+            where.append(f"({self._where})")
+        rows = {}
+        for values in fetch_rows(f"SELECT * FROM ({self._base_sql}) AS base WHERE {' AND '.join(where)}",
+                                 list(keys) + self._params):
+            rows[values[self._key_col]] = values
+        return rows
+
+    def _cached_row(self, key):
+        """Номер строки с этим id, если её страница в кэше, иначе None."""
+        for page, rows in self._pages.items():
+            if not rows:
+                continue
+            if self._sort_col < 0:
+                # страницы по id: проверяем только ту, в границы которой id попадает
+                low, high = rows[0][self._key_col], rows[-1][self._key_col]
+                if self._descending:
+                    low, high = high, low
+                if not low <= key <= high:
+                    continue
+            for offset, values in enumerate(rows):
+                if values[self._key_col] == key:
+                    return page * self.page_size + offset
+        return None
+
+    def _position_of(self, key):
+        """Номер строки с этим id по запросу (страница строки не в кэше)."""
+        op = ">" if self._descending else "<"
+        if self._sort_col >= 0:
+            # ключи строки берутся из таблицы ключей — строка должна быть в базе
+            keys = self._order_keys()
+            condition = (f"({', '.join(keys)}) {op} "
+                         f"(SELECT [{self._sort_key()}], id FROM [{self._sort_table}] WHERE id = ?)")
+        else:
+            condition = f"base.[{self.key_field}] {op} ?"
+        where = f"WHERE ({self._where}) AND" if self._where else "WHERE"
+        return int(fetch_value(f"SELECT COUNT(*) {self._source_sql()} {where} {condition}",
+                               self._params + [key], default=0))
+
+    def _forget_from(self, page):
+        """
+        Страницы с номера page сдвинулись — убираем их из кэша вместе с
+        границами следующих страниц; граница самой page остаётся верной.
+        """
+        for p in [p for p in self._pages if p >= page]:
+            del self._pages[p]
+        for p in [p for p in self._anchors if p > page]:
+            del self._anchors[p]
+
+    def _replace_row(self, row, values):
+        rows = self._pages.get(row // self.page_size)
+        if rows is not None:
+            rows[row % self.page_size] = values
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    def _remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._row_count -= 1
+        self._forget_from(row // self.page_size)
+        self.endRemoveRows()
+
+    def _insert_row(self, row):
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._row_count += 1
+        self._forget_from(row // self.page_size)
+        self.endInsertRows()
+
+    def _source_sql(self):
+        sql = f"FROM ({self._base_sql}) AS base"
+        if self._sort_col >= 0:
+            # CROSS JOIN: таблица ключей — внешний цикл, строки идут в порядке её индекса
+            sql = (f"FROM [{self._sort_table}] AS sk CROSS JOIN ({self._base_sql}) AS base "
+                   f"ON base.[{self.key_field}] = sk.id")
+        return sql
+
+    def _from_sql(self):
+        sql = self._source_sql()
+        if self._where:
+            sql += f" WHERE {self._where}"
+        return sql
+
+    def _exec(self, sql, params=()):
+        # подготовленный запрос берётся из кэша query_builder.py: текст зависит
+        # только от фильтра и сортировки, значения и границы страниц — параметры.
+        # При ошибке запроса q.next() вернёт False — модель просто будет пустой,
+        # как и обычный QSqlQueryModel
+        return run(sql, params)
+
+    def _count_rows(self):
+        return int(fetch_value(f"SELECT COUNT(*) {self._from_sql()}", self._params, default=0))
+
+    # --- страницы -------------------------------------------------------
+
+    def _sort_key(self):
+        """Колонка таблицы ключей для текущей сортировки."""
+        return sort_column(super().record().fieldName(self._sort_col))
+
+    def _order_keys(self):
+        """Выражения порядка строк: (ключ, id) или только id."""
+        if self._sort_col >= 0:
+            return [f"sk.[{self._sort_key()}]", "sk.id"]
+        return [f"base.[{self.key_field}]"]
+
+    def _order_sql(self):
+        direction = "DESC" if self._descending else "ASC"
+        return "ORDER BY " + ", ".join(f"{key} {direction}" for key in self._order_keys())
+
+    def _keyset(self, op):
+        """Условие «строка после границы страницы» для оператора op."""
+        keys = self._order_keys()
+        if len(keys) == 1:
+            return f"{keys[0]} {op} ?"
+        return f"({', '.join(keys)}) {op} ({', '.join('?' * len(keys))})"
+
+    def _anchor(self, page):
+        """Граница страницы в виде (оператор, ключи порядка) для keyset-условия."""
+        if page == 0:
+            return None
+        anchor = self._anchors.get(page)
+        if anchor is not None:
+            return anchor
+        # Соседняя страница не загружена (прыжок скроллбаром) — находим
+        # первую строку страницы одним коротким запросом по индексу.
+        found = fetch_rows(
+            f"SELECT {', '.join(self._order_keys())} {self._from_sql()} {self._order_sql()} LIMIT 1 OFFSET ?",
+            self._params + [page * self.page_size]
+        )
+        if not found:
+            return None
+        anchor = ("<=" if self._descending else ">=", found[0])
+        self._anchors[page] = anchor
+        return anchor
+
+    def _fetch_page(self, page):
+        rows = self._pages.get(page)
+        if rows is not None:
+            self._pages.move_to_end(page)
+            return rows
+
+        where = [f"({self._where})"] if self._where else []
+        params = list(self._params)
+        anchor = self._anchor(page)
+        if anchor is not None:
+            op, keys = anchor
+            where.append(self._keyset(op))
+            params.extend(keys)
+        # перед колонками результата — ключи порядка для границ страниц
+        order_keys = self._order_keys()
+        sql = f"SELECT {', '.join(order_keys)}, base.* {self._source_sql()}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" {self._order_sql()} LIMIT ?"
+        params.append(self.page_size)
+
+        n = len(order_keys)
+        found = fetch_rows(sql, params)
+        rows = [values[n:] for values in found]
+
+        if found:
+            self._anchors[page] = ("<=" if self._descending else ">=", found[0][:n])
+            self._anchors.setdefault(page + 1, ("<" if self._descending else ">", found[-1][:n]))
+
+        self._pages[page] = rows
+        if len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return rows
+
+    def rowsForKeysQuery(self, keys_sql, params=()):
+        """
+        (sql, params) запроса, возвращающего номера строк модели (в текущем
+        порядке и с текущим фильтром), чей id входит в результат подзапроса
+        keys_sql. Номера считает SQLite, страницы в Python не читаются;
+        запрос можно выполнить и в другом потоке (search_worker.py).
+        """
+        sql = (f"SELECT rn FROM (SELECT base.[{self.key_field}] AS k, "
+               f"ROW_NUMBER() OVER ({self._order_sql()}) - 1 AS rn {self._from_sql()}) "
+               f"WHERE k IN ({keys_sql}) ORDER BY rn")
+        return sql, self._params + list(params)
+
+    def rowsForKeys(self, keys_sql, params=()):
+        """Номера строк модели для rowsForKeysQuery(), списком."""
+        return [row[0] for row in fetch_rows(*self.rowsForKeysQuery(keys_sql, params))]
+
+    def allRowsQuery(self):
+        """(sql, params) запроса всех строк модели с текущим фильтром и порядком."""
+        return f"SELECT base.* {self._from_sql()} {self._order_sql()}", list(self._params)
+
+    def displayValue(self, column, value):
+        """Текст, который модель показывает для сырого значения колонки."""
+        return value
+
+    def rowValues(self, row):
+        """Кортеж сырых значений строки (без форматирования)."""
+        rows = self._fetch_page(row // self.page_size)
+        offset = row % self.page_size
+        return rows[offset] if offset < len(rows) else None
+
+    # --- интерфейс модели -----------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return False
+
+    def fetchMore(self, parent=QModelIndex()):
+        pass
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole, SORT_ROLE):
+            return None
+        values = self.rowValues(index.row())
+        if values is None or index.column() >= len(values):
+            return None
+        if role == SORT_ROLE:
+            return sort_key(values[index.column()], self.sortKind(index.column()))
+        return values[index.column()]
+
+    def record(self, row=None):
+        rec = super().record()
+        if row is None:
+            return rec
+        values = self.rowValues(row) or ()
+        for i, v in enumerate(values):
+            rec.setValue(i, v)
+        return rec
+
+    # --- сортировка -----------------------------------------------------
+
+    def sortKind(self, column):
+        """Вид значений колонки для sort_key(): "date", "number" или None."""
+        return "date" if "дата" in super().record().fieldName(column).lower() else None
+
+    def setSortKeys(self, table):
+        """Сортировать по колонкам через таблицу ключей вкладки table (если она есть в базе)."""
+        self._sort_columns = sort_columns(table)
+        self._sort_table = sort_table(table) if self._sort_columns else None
+
+    def can_sort(self, column):
+        if column == self._key_col:
+            return True
+        if self._sort_table is None or not 0 <= column < self.columnCount():
+            return False
+        return sort_column(super().record().fieldName(column)) in self._sort_columns
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if not self.can_sort(column):
+            return
+        column = -1 if column == self._key_col else column
+        descending = order == Qt.SortOrder.DescendingOrder
+        if column == self._sort_col and descending == self._descending:
+            return
+        self._sort_col = column
+        self._descending = descending
+        # набор строк тот же — пересчитывать их число не нужно
+        self.beginResetModel()
+        self._clear_window()
+        self.endResetModel()
+
+
+def paged_source(model):
+    """PagedQueryModel под цепочкой прокси (или None)."""
+    while isinstance(model, QSortFilterProxyModel):
+        model = model.sourceModel()
+    return model if isinstance(model, PagedQueryModel) else None
+
+
+def sql_sort_source(model):
+    """Модель под цепочкой прокси, которая сортирует в SQL сама (can_sort), или None."""
+    while isinstance(model, QSortFilterProxyModel):
+        model = model.sourceModel()
+    return model if hasattr(model, "can_sort") else None
+
+
+class PagedSortProxy(QSortFilterProxyModel):
+    """
+    Прокси, который отдаёт сортировку в модель, если та умеет сортировать
+    по колонке сама (в SQL: PagedQueryModel, таблицы из query_builder.py),
+    вместо того чтобы вычитывать в Python все строки источника. Между ним и
+    моделью может стоять фильтрующий прокси — он порядок строк не меняет.
+    Если сортирует сам прокси, он сравнивает ключи SORT_ROLE, а не текст.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        model = sql_sort_source(self.sourceModel())
+        if model is not None and model.can_sort(column):
+            # прокси сохраняет порядок источника (для колонки -1 Qt
+            # учитывает направление, поэтому всегда Ascending)
+            super().sort(-1, Qt.SortOrder.AscendingOrder)
+            model.sort(column, order)
+            return
+        super().sort(column, order)
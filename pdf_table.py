@@ -0,0 +1,129 @@
+"""
+Потоковая запись таблицы в PDF через QPdfWriter/QPainter.
+
+Строки рисуются сразу на страницу и не хранятся: память не зависит от числа
+строк, а время растёт линейно (QTextDocument с QTextTable раскладывает всю
+таблицу целиком и держит её в памяти). Оформление то же, что было у отчётов
+на QTextTable: заголовок организации, таблица с рамками, колонка "#",
+подпись руководителя в конце. Строка заголовков таблицы повторяется на
+каждой странице.
+
+    writer = PdfTableWriter(path, headers)
+    writer.begin("Отчёт по оборудованию")
+    for values in rows:
+        writer.add_row(values)
+    writer.finish(FOOTER)
+"""
+from PyQt6.QtCore import QMarginsF, QRectF, Qt
+from PyQt6.QtGui import QColor, QFont, QFontMetricsF, QPageLayout, QPainter, QPdfWriter, QPen, QTextOption
+
+RESOLUTION = 1200   # точек на дюйм, как у QPrinter.HighResolution
+CELL_PADDING = 4    # пт
+CELL_BORDER = 0.5   # пт
+
+
+class PdfTableWriter:
+    def __init__(self, path, headers, widths=None, margins=10, font_family="Arial", text_size=8):
+        """
+        widths — ширины колонок в процентах (по умолчанию поровну), margins —
+        поля страницы в мм.
+        """
+        self.headers = list(headers)
+        self.pdf = QPdfWriter(path)
+        self.pdf.setResolution(RESOLUTION)
+        self.pdf.setPageMargins(QMarginsF(margins, margins, margins, margins), QPageLayout.Unit.Millimeter)
+        self.font_family = font_family
+        self.painter = None
+
+        self.page = QRectF(self.pdf.pageLayout().paintRectPixels(RESOLUTION))
+        self.page.moveTo(0, 0)
+        widths = widths or [100 / len(self.headers)] * len(self.headers)
+        scale = self.page.width() / sum(widths)
+        self.columns = []
+        x = 0.0
+        for w in widths:
+            self.columns.append((x, w * scale))
+            x += w * scale
+
+        self.padding = self.points(CELL_PADDING)
+        self.header_font = self.font(10, bold=True)
+        self.text_font = self.font(text_size)
+        self.option = QTextOption()
+        self.option.setWrapMode(QTextOption.WrapMode.WrapAtWordBoundaryOrAnywhere)
+        self.option.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
+        self.y = 0.0
+        self.rows = 0
+
+    def points(self, value):
+        return value * RESOLUTION / 72
+
+    def font(self, size, bold=False, italic=False):
+        font = QFont(self.font_family) if self.font_family else QFont()
+        font.setPointSize(size)
+        font.setBold(bold)
+        font.setItalic(italic)
+        return font
+
+    def begin(self, title, company="ООО «Разработчики Программ»", subtitle_size=None):
+        self.painter = QPainter(self.pdf)
+        pen = QPen(QColor("black"))
+        pen.setWidthF(self.points(CELL_BORDER))
+        self.painter.setPen(pen)
+        self.text_line(company, self.font(16, bold=True))
+        self.text_line(title, self.font(subtitle_size) if subtitle_size else QFont())
+        self.text_line("", QFont())
+        self.draw_row(self.headers, self.header_font)
+
+    def text_line(self, text, font):
+        metrics = QFontMetricsF(font, self.pdf)
+        rect = QRectF(0, self.y, self.page.width(), self.page.height())
+        self.painter.setFont(font)
+        height = max(self.painter.boundingRect(rect, text, self.option).height(), metrics.height())
+        if self.y + height > self.page.height():
+            self.new_page(header=False)
+            rect.moveTop(self.y)
+        self.painter.drawText(rect, text, self.option)
+        self.y += height
+
+    def row_height(self, values, font):
+        metrics = QFontMetricsF(font, self.pdf)
+        line = metrics.height()
+        height = line
+        for (_, width), text in zip(self.columns, values):
+            inner = width - 2 * self.padding
+            # короткий текст в одну строку — без дорогого расчёта переносов
+            if text and metrics.horizontalAdvance(text) > inner:
+                rect = self.painter.boundingRect(QRectF(0, 0, inner, self.page.height()), text, self.option)
+                height = max(height, rect.height())
+        return height + 2 * self.padding
+
+    def draw_row(self, values, font):
+        self.painter.setFont(font)
+        height = self.row_height(values, font)
+        if self.y + height > self.page.height() and self.rows:
+            self.new_page()
+            self.painter.setFont(font)
+        for (x, width), text in zip(self.columns, values):
+            cell = QRectF(x, self.y, width, height)
+            self.painter.drawRect(cell)
+            if text:
+                self.painter.drawText(cell.adjusted(self.padding, self.padding, -self.padding, -self.padding),
+                                      text, self.option)
+        self.y += height
+
+    def new_page(self, header=True):
+        self.pdf.newPage()
+        self.y = 0.0
+        if header:
+            self.draw_row(self.headers, self.header_font)
+
+    def add_row(self, values):
+        self.rows += 1
+        self.draw_row(["" if v is None else str(v) for v in values], self.text_font)
+
+    def finish(self, footer):
+        self.text_line("", QFont())
+        self.text_line(footer, self.font(10, italic=True))
+        self.painter.end()
+        self.painter = None
+        self.pdf = None
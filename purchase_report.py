@@ -2,20 +2,20 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QListWidget,
     QListWidgetItem, QDateEdit, QPushButton, QFileDialog, QMessageBox
 )
-from PyQt6.QtGui import (
-    QTextDocument, QTextCursor, QTextTableFormat, QTextCharFormat,
-    QFont, QTextTableCellFormat, QTextLength, QColor
-)
-from PyQt6.QtCore import Qt, QDate, QMarginsF
-from PyQt6.QtPrintSupport import QPrinter
+from PyQt6.QtCore import Qt, QDate
 import os
 
+from report_data import ReportData
+from report_worker import ReportWorker, run_report
+
 class PurchaseReportGenerator(QDialog):
     def __init__(self, model, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Отчёт по закупкам оборудования")
         self.setMinimumSize(600, 500)
         self.model = model
+        self.data = ReportData(model)
+        self.find_columns()
 
         self.init_ui()
         self.load_filters()
@@ -66,39 +66,23 @@ class PurchaseReportGenerator(QDialog):
         self.cancel_btn.clicked.connect(self.reject)
 
     def load_filters(self):
-        equipment_col = supplier_col = date_col = None
-        for col in range(self.model.columnCount()):
-            header = str(self.model.headerData(col, Qt.Orientation.Horizontal)).strip().lower()
+        self.equipment_filter.addItems(self.data.unique(self.equipment_col))
+        self.supplier_filter.addItems(self.data.unique(self.supplier_col))
+
+        # Даты
+        dates = self.data.date_range(self.date_col)
+        self.date_from.setDate(dates[0] if dates else QDate(2020, 1, 1))
+        self.date_to.setDate(dates[1] if dates else QDate.currentDate())
+
+    def find_columns(self):
+        self.equipment_col = self.supplier_col = self.date_col = None
+        for col, header in enumerate(self.data.headers):
             if "оборудование" in header:
-                equipment_col = col
+                self.equipment_col = col
             elif "поставщик" in header:
-                supplier_col = col
+                self.supplier_col = col
             elif "дата закупки" in header:
-                date_col = col
-
-        def fill_unique_values(col_index, widget):
-            seen = set()
-            for row in range(self.model.rowCount()):
-                val = self.model.data(self.model.index(row, col_index))
-                if val and val not in seen:
-                    widget.addItem(val)
-                    seen.add(val)
-
-        if equipment_col is not None:
-            fill_unique_values(equipment_col, self.equipment_filter)
-        if supplier_col is not None:
-            fill_unique_values(supplier_col, self.supplier_filter)
-
-        # Даты
-        dates = []
-        if date_col is not None:
-            for row in range(self.model.rowCount()):
-                val = self.model.data(self.model.index(row, date_col))
-                dt = QDate.fromString(val, "dd.MM.yyyy")
-                if dt.isValid():
-                    dates.append(dt)
-        self.date_from.setDate(min(dates) if dates else QDate(2020, 1, 1))
-        self.date_to.setDate(max(dates) if dates else QDate.currentDate())
+                self.date_col = col
 
     def load_fields(self):
         self.fields_list.clear()
@@ -128,112 +112,24 @@ class PurchaseReportGenerator(QDialog):
             QMessageBox.warning(self, "Нет полей", "Выберите хотя бы одно поле для отчёта.")
             return
 
-        doc = QTextDocument()
-        cursor = QTextCursor(doc)
-
-        title_format = QTextCharFormat()
-        title_font = QFont("Arial", 16)
-        title_font.setBold(True)
-        title_format.setFont(title_font)
-        cursor.insertText("ООО «Разработчики Программ»\n", title_format)
-        cursor.insertText("Отчёт по закупкам оборудования\n\n")
-
-        table_format = QTextTableFormat()
-        table_format.setCellPadding(4)
-        table_format.setBorder(1)
-        table_format.setBorderBrush(QColor("black"))
-        table_format.setWidth(QTextLength(QTextLength.Type.PercentageLength, 100))
-        table_format.setColumnWidthConstraints([
-            QTextLength(QTextLength.Type.PercentageLength, 100 / (len(selected_fields) + 1))
-            for _ in range(len(selected_fields) + 1)
-        ])
-        table = cursor.insertTable(1, len(selected_fields) + 1, table_format)
-
-        header_format = QTextCharFormat()
-        header_font = QFont("Arial", 10)
-        header_font.setBold(True)
-        header_format.setFont(header_font)
-
-        cell_format = QTextTableCellFormat()
-        cell_format.setBorder(0.5)
-        cell_format.setBorderBrush(QColor("black"))
-        cell_text_format = QTextCharFormat()
-        small_font = QFont("Arial", 8)
-        cell_text_format.setFont(small_font)
-
-        # Заголовки
-        table.cellAt(0, 0).setFormat(cell_format)
-        cursor0 = table.cellAt(0, 0).firstCursorPosition()
-        cursor0.setCharFormat(header_format)
-        cursor0.insertText("#")
-        for i, (_, hdr) in enumerate(selected_fields, 1):
-            table.cellAt(0, i).setFormat(cell_format)
-            cursor_i = table.cellAt(0, i).firstCursorPosition()
-            cursor_i.setCharFormat(header_format)
-            cursor_i.insertText(hdr)
-
-        # Фильтры
-        equipments = [item.text() for item in self.equipment_filter.selectedItems()]
-        suppliers = [item.text() for item in self.supplier_filter.selectedItems()]
-        d_from = self.date_from.date()
-        d_to = self.date_to.date()
-
-        equipment_col = supplier_col = date_col = None
-        for col in range(self.model.columnCount()):
-            header = str(self.model.headerData(col, Qt.Orientation.Horizontal)).strip().lower()
-            if "оборудование" in header:
-                equipment_col = col
-            elif "поставщик" in header:
-                supplier_col = col
-            elif "дата закупки" in header:
-                date_col = col
-
-        for row in range(self.model.rowCount()):
-            eq = self.model.data(self.model.index(row, equipment_col)) if equipment_col is not None else ""
-            sup = self.model.data(self.model.index(row, supplier_col)) if supplier_col is not None else ""
-            d_str = self.model.data(self.model.index(row, date_col)) if date_col is not None else ""
-            d_obj = QDate.fromString(d_str, "dd.MM.yyyy")
-
-            if equipments and eq not in equipments:
-                continue
-            if suppliers and sup not in suppliers:
-                continue
-            if d_obj.isValid() and (d_obj < d_from or d_obj > d_to):
-                continue
-
-            table.appendRows(1)
-            r_idx = table.rows() - 1
-            table.cellAt(r_idx, 0).setFormat(cell_format)
-            cursor0 = table.cellAt(r_idx, 0).firstCursorPosition()
-            cursor0.setCharFormat(cell_text_format)
-            cursor0.insertText(str(r_idx))
-            for i, (col, _) in enumerate(selected_fields, 1):
-                val = self.model.data(self.model.index(row, col))
-                table.cellAt(r_idx, i).setFormat(cell_format)
-                cursor_i = table.cellAt(r_idx, i).firstCursorPosition()
-                cursor_i.setCharFormat(cell_text_format)
-                cursor_i.insertText(str(val) if val else "")
-
-        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-        printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
         file_path, _ = QFileDialog.getSaveFileName(
             self, "Сохранить отчёт", os.path.expanduser("~/Отчет_ЗакупкиОборудования.pdf"), "PDF Files (*.pdf)"
         )
         if not file_path:
             return
 
-        printer.setOutputFileName(file_path)
-        printer.setPageMargins(QMarginsF(10, 10, 10, 10))
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        cursor.insertBlock()
-
-        footer_format = QTextCharFormat()
-        footer_font = QFont("Arial", 10)
-        footer_font.setItalic(True)
-        footer_format.setFont(footer_font)
-        cursor.setCharFormat(footer_format)
-        cursor.insertText("\nРуководитель отдела ИТ: ____________ /Фамилия И.О./")
-        doc.print(printer)
-
-        QMessageBox.information(self, "Успешно", f"Отчёт сохранён:\n{file_path}")
-        self.accept()
\ No newline at end of file
+        rows = self.data.select(
+            allowed=[
+                (self.equipment_col, [item.text() for item in self.equipment_filter.selectedItems()]),
+                (self.supplier_col, [item.text() for item in self.supplier_filter.selectedItems()]),
+            ],
+            dates=[(self.date_col, self.date_from.date(), self.date_to.date())],
+        )
+
+        # Документ строится и печатается в фоне
+        run_report(self.parentWidget() or self, ReportWorker(
+            file_path, "Отчёт по закупкам оборудования", [hdr for _, hdr in selected_fields],
+            self.data.table(rows, [col for col, _ in selected_fields]),
+            footer="Руководитель отдела ИТ: ____________ /Фамилия И.О./"
+        ))
+        self.accept()
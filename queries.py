@@ -0,0 +1,165 @@
+"""
+Запросы вкладок с JOIN. Вынесены из TableWidget.setup_table, чтобы их же
+проверял migrations.py --explain.
+
+CROSS JOIN в SQLite — тот же внутренний JOIN, но планировщик не меняет
+порядок таблиц: основная таблица всегда внешняя. Иначе при индексах по
+внешним ключам он начинает обход со справочника, и страницы по id (ORDER BY
+id LIMIT/OFFSET) требуют сортировки всех строк.
+"""
+from filter_compiler import iso_date_sql
+from summary_tables import SUMMARY_TABLE
+
+MAINTENANCE_SQL = """
+                SELECT
+                m.id AS id,
+                o.название||' ('||o.производитель||', SN:'||o.серийный_номер||')' AS Оборудование,
+                m.дата        AS Дата,
+                m.тип_работы  AS "Тип работы",
+                m.описание    AS Описание,
+                s.фамилия||' '||s.имя||COALESCE(' '||s.отчество,'') AS Техник,
+                m.стоимость   AS Стоимость
+                FROM ОБСЛУЖИВАНИЕ m
+                CROSS JOIN ОБОРУДОВАНИЕ o ON m.оборудование_id = o.id
+                LEFT JOIN СОТРУДНИК s ON m.техник_id = s.id
+            """
+
+ISSUANCE_SQL = """
+                SELECT
+                w.id AS id,
+                o.название||' ('||o.производитель||', SN:'||o.серийный_номер||')' AS Оборудование,
+                s.фамилия||' '||s.имя||COALESCE(' '||s.отчество,'') AS Сотрудник,
+                wp.корпус||' | этаж '||wp.этаж||' | каб. '||wp.кабинет||' | стол '||wp.стол AS Рабочее_место,
+                w.дата_выдачи        AS Дата_выдачи,
+                w.состояние_при_возврате AS Состояние_возврата
+                FROM ВЫДАЧА_ТЕХНИКИ w
+                CROSS JOIN ОБОРУДОВАНИЕ  o  ON w.оборудование_id   = o.id
+                CROSS JOIN СОТРУДНИК     s  ON w.сотрудник_id      = s.id
+                CROSS JOIN РАБОЧЕЕ_МЕСТО wp ON w.рабочее_место_id = wp.id
+            """
+
+JOIN_TAB_QUERIES = {
+    "ОБСЛУЖИВАНИЕ": MAINTENANCE_SQL,
+    "ВЫДАЧА_ТЕХНИКИ": ISSUANCE_SQL,
+}
+
+
+EQUIPMENT_LABEL_SQL = "o.название||' ('||o.производитель||', SN:'||o.серийный_номер||')'"
+PERSON_LABEL_SQL = "s.фамилия||' '||s.имя||COALESCE(' '||s.отчество,'')"
+
+# Подписи рабочих мест для вкладки СОТРУДНИК: QSqlRelationalTableModel
+# показывает колонку представления вместо рабочее_место_id (подпись — это
+# выражение, а QSqlRelation принимает только имя колонки).
+WORKPLACE_LABELS = "РАБОЧЕЕ_МЕСТО_ПОДПИСЬ"
+WORKPLACE_LABELS_SQL = f"""
+    SELECT wp.id AS место_id,
+           wp.корпус||' | этаж '||wp.этаж||' | каб. '||wp.кабинет||' | стол '||wp.стол AS рабочее_место
+    FROM РАБОЧЕЕ_МЕСТО wp
+"""
+
+
+def filter_source(table_name):
+    """
+    FROM для списков значений FilterDialog: у СОТРУДНИК к строкам добавлена
+    колонка рабочее_место с подписью, как во вкладке.
+    """
+    if table_name == "СОТРУДНИК":
+        return (f"(SELECT t.*, v.рабочее_место FROM СОТРУДНИК t "
+                f"LEFT JOIN {WORKPLACE_LABELS} v ON v.место_id = t.рабочее_место_id)")
+    return table_name
+
+
+def technicians_summary_query(date_from=None, date_to=None, work_types=(), where="", params=(),
+                              use_summary=False):
+    """
+    (sql, params) сводки по техникам одним запросом с GROUP BY: техник,
+    заявок, устройства (через char(31)), сумма, первая и последняя дата
+    (yyyy-MM-dd).
+
+    date_from/date_to — границы в yyyy-MM-dd, work_types — типы работ; where
+    и params — условие по колонкам MAINTENANCE_SQL (фильтр вкладки).
+
+    Сначала строки сворачиваются по паре (техник, оборудование) — это проход
+    по покрывающему индексу сводки из migrations.py без чтения самой
+    таблицы, — затем пары по ФИО техника (однофамильцы с одинаковым ФИО
+    попадают в одну строку, как и раньше в отчёте).
+
+    use_summary — без условий пары берутся из СВОДКА_ОБСЛУЖИВАНИЯ
+    (summary_tables.py): чтение по числу групп, а не заявок.
+    """
+    if use_summary and not (date_from or date_to or work_types or where):
+        pairs = f"""
+            SELECT техник_id, оборудование_id, SUM(заявок) AS cnt, TOTAL(сумма) AS total,
+                   MIN(первая) AS first, MAX(последняя) AS last
+            FROM {SUMMARY_TABLE}
+            WHERE техник_id <> 0
+            GROUP BY техник_id, оборудование_id
+        """
+        return _summary_by_technician(pairs), []
+
+    iso = iso_date_sql("дата")
+    clauses, args = ["техник_id IS NOT NULL"], []
+    if date_from:
+        clauses.append(f"{iso} >= ?")
+        args.append(date_from)
+    if date_to:
+        clauses.append(f"{iso} <= ?")
+        args.append(date_to)
+    if work_types:
+        clauses.append(f"тип_работы IN ({', '.join('?' * len(work_types))})")
+        args += list(work_types)
+    if where:
+        clauses.append(f"id IN (SELECT id FROM ({MAINTENANCE_SQL}) AS base WHERE {where})")
+        args += list(params)
+
+    pairs = f"""
+            SELECT техник_id, оборудование_id, COUNT(*) AS cnt, SUM(стоимость) AS total,
+                   MIN({iso}) AS first, MAX({iso}) AS last
+            FROM ОБСЛУЖИВАНИЕ
+            WHERE {" AND ".join(clauses)}
+            GROUP BY техник_id, оборудование_id
+        """
+    return _summary_by_technician(pairs), args
+
+
+def _summary_by_technician(pairs):
+    return f"""
+        WITH pairs AS ({pairs})
+        SELECT {PERSON_LABEL_SQL} AS Техник,
+               SUM(pairs.cnt), group_concat({EQUIPMENT_LABEL_SQL}, char(31)),
+               TOTAL(pairs.total), MIN(pairs.first), MAX(pairs.last)
+        FROM pairs
+        CROSS JOIN СОТРУДНИК s ON s.id = pairs.техник_id
+        CROSS JOIN ОБОРУДОВАНИЕ o ON o.id = pairs.оборудование_id
+        GROUP BY Техник
+        ORDER BY Техник
+    """
+
+
+def equipment_costs_query(month_from="", month_to=""):
+    """
+    (sql, params) затрат на обслуживание по оборудованию из
+    СВОДКА_ОБСЛУЖИВАНИЯ: оборудование, заявок, сумма, первая и последняя
+    дата (yyyy-MM-dd). month_from/month_to — границы в yyyy-MM.
+    """
+    clauses, args = [], []
+    if month_from:
+        clauses.append("месяц >= ?")
+        args.append(month_from)
+    if month_to:
+        clauses.append("месяц <= ?")
+        args.append(month_to)
+    sql = f"""
+        WITH costs AS (
+            SELECT оборудование_id, SUM(заявок) AS cnt, TOTAL(сумма) AS total,
+                   MIN(первая) AS first, MAX(последняя) AS last
+            FROM {SUMMARY_TABLE}
+            {"WHERE " + " AND ".join(clauses) if clauses else ""}
+            GROUP BY оборудование_id
+        )
+        SELECT {EQUIPMENT_LABEL_SQL} AS Оборудование, costs.cnt, costs.total, costs.first, costs.last
+        FROM costs
+        CROSS JOIN ОБОРУДОВАНИЕ o ON o.id = costs.оборудование_id
+        ORDER BY costs.total DESC
+    """
+    return sql, args
@@ -0,0 +1,221 @@
+"""
+Параметризованные запросы и кэш подготовленных запросов.
+
+Условие собирается из шаблонов с "?" (Conditions), значения передаются
+отдельно. Запросы run()/fetch_rows() (JOIN-вкладки, отчёты, поиск) привязывают
+их параметрами: у запросов с одинаковым набором условий один и тот же текст,
+и подготовленный запрос (sqlite3_prepare) берётся из кэша по этому тексту —
+повторный фильтр или следующая страница только привязывают новые значения.
+
+Таблицы обычных вкладок (BoundTableModel) так не умеют: QSqlTableModel::select()
+параметры не привязывает, поэтому значения их фильтра подставляются в текст
+литералами (inline_params). Каждый новый фильтр такой таблицы — новый текст,
+и SQLite готовит его заново; кэш запросов его не переиспользует. Кавычки в
+данных запрос не ломают ни в одном из случаев.
+
+run() — выполнить запрос из кэша; fetch_rows()/fetch_value() — выполнить,
+прочитать результат и освободить запрос; execute() — выполнить запрос без
+результата (INSERT/UPDATE/DELETE). Запрос в кэше на текст один: результат
+run() нужно дочитать и закрыть (finish), иначе следующий run() с тем же
+текстом выполнит отдельный, некэшированный запрос, а не сбросит чужой.
+"""
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery, QSqlTableModel, QSqlRelationalTableModel
+
+from filter_compiler import iso_date_sql, to_iso_date
+
+MAX_STATEMENTS = 128
+# имя соединения Qt по умолчанию (QSqlDatabase::defaultConnection)
+DEFAULT_CONNECTION = "qt_sql_default_connection"
+
+_statements = OrderedDict()          # (соединение, текст) -> QSqlQuery
+stats = {"prepared": 0, "reused": 0}
+
+
+def statement(sql, database=None):
+    """Подготовленный запрос с текстом sql; готовится один раз на соединение."""
+    database = database or QSqlDatabase.database()
+    key = (database.connectionName(), sql)
+    q = _statements.get(key)
+    if q is not None:
+        _statements.move_to_end(key)
+        stats["reused"] += 1
+        return q
+    q = QSqlQuery(database)
+    q.setForwardOnly(True)
+    if not q.prepare(sql):
+        # запрос с ошибкой не кэшируем: exec() вернёт False, как и раньше
+        return q
+    stats["prepared"] += 1
+    _statements[key] = q
+    if len(_statements) > MAX_STATEMENTS:
+        _, old = _statements.popitem(last=False)
+        old.finish()
+    return q
+
+
+def run(sql, params=(), database=None):
+    """Выполняет запрос sql с параметрами params; возвращает QSqlQuery."""
+    q = statement(sql, database)
+    if q.isActive():
+        # результат ещё читают (например, вызывающий код внутри цикла по нему
+        # вызвал функцию с тем же запросом) — его не трогаем
+        q = QSqlQuery(database or QSqlDatabase.database())
+        q.setForwardOnly(True)
+        q.prepare(sql)
+    for i, v in enumerate(params):
+        q.bindValue(i, v)
+    # при ошибке q.next() вернёт False — вызывающий код получит пустой результат
+    q.exec()
+    return q
+
+
+def fetch_rows(sql, params=(), database=None):
+    """Все строки результата списком кортежей."""
+    q = run(sql, params, database)
+    ncols = q.record().count()
+    rows = []
+    while q.next():
+        rows.append(tuple(q.value(i) for i in range(ncols)))
+    q.finish()
+    return rows
+
+
+def execute(sql, params=(), database=None):
+    """Выполняет запрос без результата; возвращает QSqlError (isValid() — ошибка)."""
+    q = run(sql, params, database)
+    error = q.lastError()
+    q.finish()
+    return error
+
+
+def fetch_value(sql, params=(), database=None, default=None):
+    """Первое значение первой строки результата (default, если строк нет)."""
+    q = run(sql, params, database)
+    value = q.value(0) if q.next() else default
+    q.finish()
+    return value
+
+
+def forget_statements(connection_name=None):
+    """Убирает из кэша запросы соединения (перед его закрытием или заменой)."""
+    name = connection_name or DEFAULT_CONNECTION
+    for key in [key for key in list(_statements) if key[0] == name]:
+        _statements.pop(key).finish()
+
+
+def sql_literal(value):
+    """Значение как литерал SQLite: строки в кавычках с удвоенными кавычками."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def inline_params(where, params):
+    """
+    Подставляет params вместо "?" в условие where, собранное Conditions:
+    значения в нём только параметрами, поэтому каждый "?" — место значения.
+    """
+    pieces = where.split("?")
+    if len(pieces) != len(params) + 1:
+        raise ValueError(f"в условии {len(pieces) - 1} параметров, передано {len(params)}")
+    return "".join(piece + (sql_literal(value) if i < len(params) else "")
+                   for i, (piece, value) in enumerate(zip(pieces, list(params) + [None])))
+
+
+def escape_like(text):
+    """Экранирует % и _ для LIKE ... ESCAPE '\\'."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class Conditions:
+    """
+    Условие WHERE из частей с параметрами. Текст условия зависит только от
+    набора полей и видов сравнения, значения копятся в params. Переиспользуют
+    подготовленный запрос только запросы run(); в фильтр BoundTableModel
+    значения попадают литералами (BoundFilterMixin.setFilter).
+    """
+    def __init__(self):
+        self.clauses = []
+        self.params = []
+
+    def add(self, clause, *params):
+        self.clauses.append(clause)
+        self.params.extend(params)
+        return self
+
+    def equals(self, field, value):
+        return self.add(f"[{field}] = ?", value)
+
+    def contains(self, field, text):
+        return self.add(f"[{field}] LIKE ? ESCAPE '\\'", f"%{escape_like(text)}%")
+
+    def date_range(self, field, date_from="", date_to=""):
+        """Диапазон дат dd.MM.yyyy (любая граница может быть пустой)."""
+        expr = iso_date_sql(field)
+        if date_from:
+            self.add(f"{expr} >= ?", to_iso_date(date_from))
+        if date_to:
+            self.add(f"{expr} <= ?", to_iso_date(date_to))
+        return self
+
+    def sql(self):
+        return " AND ".join(self.clauses)
+
+    def __bool__(self):
+        return bool(self.clauses)
+
+
+class BoundFilterMixin:
+    """
+    Примесь к QSqlTableModel: setFilter(where, params) принимает условие с
+    "?" и значения к нему. QSqlTableModel::select() значения не привязывает,
+    поэтому они подставляются в фильтр литералами (sql_literal): кавычки в
+    данных запрос не ломают, а select() — обычный, со сбросом кэша правок,
+    заголовков и первичного ключа. Плата за это — текст запроса меняется с
+    каждым значением фильтра, и SQLite готовит его заново: кэш запросов
+    здесь не работает.
+
+    Сортирует модель SQLite (ORDER BY по всей таблице, а не по уже
+    прочитанным строкам); даты dd.MM.yyyy — в виде yyyy-MM-dd.
+    """
+    def can_sort(self, column):
+        return 0 <= column < self.columnCount()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if getattr(self, "_sort_order", None) == (column, order):
+            return
+        super().sort(column, order)
+
+    def setSort(self, column, order):
+        self._sort_order = (column, order)
+        super().setSort(column, order)
+
+    def sortOrder(self):
+        """(колонка, порядок) сортировки модели; (-1, None) — без сортировки."""
+        return getattr(self, "_sort_order", (-1, None))
+
+    def orderByClause(self):
+        column, order = self.sortOrder()
+        field = self.record().fieldName(column) if column >= 0 else ""
+        if "дата" not in field.lower():
+            return super().orderByClause()
+        direction = "DESC" if order == Qt.SortOrder.DescendingOrder else "ASC"
+        return f"ORDER BY {iso_date_sql(field, self.tableName())} {direction}"
+
+    def setFilter(self, where, params=()):
+        super().setFilter(inline_params(where or "", params))
+
+
+class BoundTableModel(BoundFilterMixin, QSqlTableModel):
+    pass
+
+
+class BoundRelationalTableModel(BoundFilterMixin, QSqlRelationalTableModel):
+    pass
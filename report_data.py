@@ -0,0 +1,158 @@
+"""
+Общий слой данных для диалогов отчётов.
+
+ReportData один раз читает строки вкладки — одним SQL-запросом с текущим
+фильтром и порядком модели, а не через model.data() по каждой ячейке — и
+хранит сырые значения: стоимость остаётся числом, а не строкой "1 234.00 ₽",
+которую потом приходилось разбирать регулярным выражением. Даты разбираются
+один раз на колонку. Поверх этого — то, что раньше повторял каждый отчёт:
+колонки по заголовкам, уникальные значения для списков фильтров, диапазоны
+дат и чисел, отбор строк и значения выбранных полей для печати.
+"""
+import datetime
+
+from PyQt6.QtCore import QDate, Qt
+from PyQt6.QtSql import QSqlTableModel
+
+from paged_model import PagedQueryModel
+from query_builder import fetch_rows
+
+# форматы дат, которые встречаются в базе; основной — dd.MM.yyyy
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%Y.%m.%d")
+
+
+def to_date(value):
+    """datetime.date из значения базы или None."""
+    if isinstance(value, datetime.date):
+        return value
+    if not value:
+        return None
+    text = str(value)
+    if len(text) == 10 and text[2] == "." and text[5] == ".":
+        try:
+            return datetime.date(int(text[6:]), int(text[3:5]), int(text[:2]))
+        except ValueError:
+            return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def to_number(value):
+    """float из значения базы или None."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(" ", "").replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+def to_qdate(value):
+    return QDate(value.year, value.month, value.day)
+
+
+def read_rows(model):
+    """Все строки модели кортежами сырых значений, в порядке колонок модели."""
+    if isinstance(model, PagedQueryModel):
+        sql, params = model.allRowsQuery()
+    elif isinstance(model, QSqlTableModel):
+        # значения фильтра уже подставлены в selectStatement() (query_builder.BoundFilterMixin)
+        sql, params = model.selectStatement(), []
+    else:
+        columns = range(model.columnCount())
+        return [
+            tuple(model.data(model.index(row, col), Qt.ItemDataRole.EditRole) for col in columns)
+            for row in range(model.rowCount())
+        ]
+
+    return fetch_rows(sql, params)
+
+
+class ReportData:
+    def __init__(self, model):
+        self.model = model
+        # заголовки в нижнем регистре, как их сравнивали диалоги
+        self.headers = [
+            str(model.headerData(col, Qt.Orientation.Horizontal)).strip().lower()
+            for col in range(model.columnCount())
+        ]
+        self.rows = read_rows(model)
+        # форматирование модели для печати (например, стоимость с ₽)
+        self._display = getattr(model, "displayValue", None)
+        self._dates = {}
+        self._numbers = {}
+
+    def column(self, header):
+        """Номер колонки по заголовку (без учёта регистра) или None."""
+        header = header.strip().lower()
+        return self.headers.index(header) if header in self.headers else None
+
+    def text(self, value, col):
+        """Значение так, как его показывает таблица."""
+        if self._display is not None:
+            value = self._display(col, value)
+        return "" if value is None else str(value)
+
+    def unique(self, col):
+        """Непустые значения колонки без повторов, в порядке первого появления."""
+        if col is None:
+            return []
+        seen = set()
+        result = []
+        for row in self.rows:
+            value = row[col]
+            if value in (None, "") or value in seen:
+                continue
+            seen.add(value)
+            result.append(self.text(value, col))
+        return result
+
+    def dates(self, col):
+        if col not in self._dates:
+            self._dates[col] = [to_date(row[col]) for row in self.rows]
+        return self._dates[col]
+
+    def numbers(self, col):
+        if col not in self._numbers:
+            self._numbers[col] = [to_number(row[col]) for row in self.rows]
+        return self._numbers[col]
+
+    def date_range(self, col):
+        """(QDate, QDate) — первая и последняя дата колонки, или None."""
+        values = [d for d in self.dates(col) if d is not None] if col is not None else []
+        return (to_qdate(min(values)), to_qdate(max(values))) if values else None
+
+    def number_range(self, col):
+        values = [n for n in self.numbers(col) if n is not None] if col is not None else []
+        return (min(values), max(values)) if values else None
+
+    def select(self, allowed=(), dates=(), numbers=()):
+        """
+        Номера строк, прошедших фильтры:
+          allowed — [(колонка, значения)]: текст ячейки входит в значения
+                    (пустой список значений — фильтр не задан);
+          dates   — [(колонка, QDate от, QDate до)]: строки без даты проходят;
+          numbers — [(колонка, от, до)]: пустое число считается нулём.
+        """
+        checks = []
+        for col, values in allowed:
+            if col is not None and values:
+                values = set(values)
+                checks.append(lambda i, col=col, values=values: self.text(self.rows[i][col], col) in values)
+        for col, d_from, d_to in dates:
+            if col is not None:
+                column, lo, hi = self.dates(col), d_from.toPyDate(), d_to.toPyDate()
+                checks.append(lambda i, column=column, lo=lo, hi=hi: column[i] is None or lo <= column[i] <= hi)
+        for col, lo, hi in numbers:
+            if col is not None:
+                column = self.numbers(col)
+                checks.append(lambda i, column=column, lo=lo, hi=hi: lo <= (column[i] or 0.0) <= hi)
+        return [i for i in range(len(self.rows)) if all(check(i) for check in checks)]
+
+    def table(self, indices, columns):
+        """Строки для печати: тексты выбранных колонок по номерам строк."""
+        return [[self.text(self.rows[i][col], col) for col in columns] for i in indices]
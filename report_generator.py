@@ -2,19 +2,19 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QListWidget, QListWidgetItem, QFileDialog, QMessageBox, QDateEdit
 )
-from PyQt6.QtPrintSupport import QPrinter
-from PyQt6.QtGui import (
-    QTextDocument, QTextCursor, QTextTableFormat, QTextCharFormat,
-    QTextBlockFormat, QTextTableCellFormat, QFont, QTextLength, QColor
-)
-from PyQt6.QtCore import Qt, QMarginsF, QDate
+from PyQt6.QtCore import Qt, QDate
 import os
 
+from report_data import ReportData
+from report_worker import ReportWorker, run_report
+
 class ReportGenerator(QDialog):
     def __init__(self, table_name, model, parent=None):
         super().__init__(parent)
         self.table_name = table_name
         self.model = model
+        self.data = ReportData(model)
+        self.find_columns()
         self.setWindowTitle(f"Генерация отчета: {table_name}")
         self.setMinimumSize(600, 500)
 
@@ -99,72 +99,36 @@ class ReportGenerator(QDialog):
         self.department_filter.clear()
         self.position_filter.clear()
 
-        name_col_fam = name_col_name = name_col_patronym = dept_col = pos_col = birth_col = None
+        if None not in (self.name_col_fam, self.name_col_name, self.name_col_patronym):
+            names = (self.full_name(row) for row in self.data.rows)
+            self.name_filter.addItems([name for name in dict.fromkeys(names) if name])
+        self.department_filter.addItems(self.data.unique(self.dept_col))
+        self.position_filter.addItems(self.data.unique(self.pos_col))
 
-        for col in range(self.model.columnCount()):
-            header = str(self.model.headerData(col, Qt.Orientation.Horizontal)).strip().lower()
+        dates = self.data.date_range(self.birth_col)
+        self.date_from.setDate(dates[0] if dates else QDate(1950, 1, 1))
+        self.date_to.setDate(dates[1] if dates else QDate.currentDate())
+
+    def find_columns(self):
+        self.name_col_fam = self.name_col_name = self.name_col_patronym = None
+        self.dept_col = self.pos_col = self.birth_col = None
+        for col, header in enumerate(self.data.headers):
             if header == "фамилия":
-                name_col_fam = col
+                self.name_col_fam = col
             elif header == "имя":
-                name_col_name = col
+                self.name_col_name = col
             elif header == "отчество":
-                name_col_patronym = col
+                self.name_col_patronym = col
             elif "отдел" in header:
-                dept_col = col
+                self.dept_col = col
             elif "должн" in header:
-                pos_col = col
+                self.pos_col = col
             elif "дата рождения" in header or "рожд" in header:
-                birth_col = col
-
-        seen_names = set()
-        for row in range(self.model.rowCount()):
-            fam = self.model.data(self.model.index(row, name_col_fam)) or ""
-            name = self.model.data(self.model.index(row, name_col_name)) or ""
-            pat = self.model.data(self.model.index(row, name_col_patronym)) or ""
-            full_name = f"{fam} {name} {pat}".strip()
-            if full_name and full_name not in seen_names:
-                self.name_filter.addItem(full_name)
-                seen_names.add(full_name)
-
-        if dept_col is not None:
-            seen_depts = set()
-            for row in range(self.model.rowCount()):
-                val = self.model.data(self.model.index(row, dept_col))
-                if val and val not in seen_depts:
-                    self.department_filter.addItem(val)
-                    seen_depts.add(val)
-
-        if pos_col is not None:
-            seen_positions = set()
-            for row in range(self.model.rowCount()):
-                val = self.model.data(self.model.index(row, pos_col))
-                if val and val not in seen_positions:
-                    self.position_filter.addItem(val)
-                    seen_positions.add(val)
-
-        dates = []
-        if birth_col is not None:
-            for row in range(self.model.rowCount()):
-                val = self.model.data(self.model.index(row, birth_col))
-                date_obj = QDate.fromString(val, "yyyy-MM-dd")
-                if date_obj.isValid():
-                    dates.append(date_obj)
-        self.date_from.setDate(min(dates) if dates else QDate(1950, 1, 1))
-        self.date_to.setDate(max(dates) if dates else QDate.currentDate())
-
-        # Вспомогательная функция заполнения
-        def populate_unique_values(col_index, widget):
-            if col_index is None:
-                return
-            seen = set()
-            for row in range(self.model.rowCount()):
-                fam = self.model.data(self.model.index(row, name_col_fam)) or ""
-                name = self.model.data(self.model.index(row, name_col_name)) or ""
-                patronym = self.model.data(self.model.index(row, name_col_patronym)) or ""
-                full_name = f"{fam} {name} {patronym}".strip()
-                if full_name and full_name not in seen:
-                    self.name_filter.addItem(full_name)
-                    seen.add(full_name)
+                self.birth_col = col
+
+    def full_name(self, row):
+        parts = (row[self.name_col_fam], row[self.name_col_name], row[self.name_col_patronym])
+        return " ".join(str(p or "") for p in parts).strip()
 
     def load_fields(self):
         self.fields_list.clear()
@@ -204,115 +168,10 @@ class ReportGenerator(QDialog):
             QMessageBox.warning(self, "Ошибка", "Не выбрано ни одного поля для отчета!")
             return
 
-        doc = QTextDocument()
-        cursor = QTextCursor(doc)
-
-        title_format = QTextCharFormat()
-        title_font = QFont()
-        title_font.setPointSize(16)
-        title_font.setBold(True)
-        title_format.setFont(title_font)
-
-        subtitle_format = QTextCharFormat()
-        subtitle_font = QFont()
-        subtitle_font.setPointSize(12)
-        subtitle_format.setFont(subtitle_font)
-
-        header_format = QTextCharFormat()
-        header_font = QFont()
-        header_font.setPointSize(10)
-        header_font.setBold(True)
-        header_format.setFont(header_font)
-
-        cursor.insertText("ООО «Разработчики Программ»\n", title_format)
-        cursor.insertText(f"Отчет по таблице: {self.table_name}\n\n", subtitle_format)
-
-        table_format = QTextTableFormat()
-        table_format.setCellPadding(4)
-        table_format.setBorder(1)
-        table_format.setBorderBrush(QColor("black"))
-        table_format.setWidth(QTextLength(QTextLength.Type.PercentageLength, 100))
-        table_format.setAlignment(Qt.AlignmentFlag.AlignLeft)
-
-        table = cursor.insertTable(1, len(selected_fields) + 1, table_format)
-        for i in range(len(selected_fields) + 1):
-            table_format.setColumnWidthConstraints([
-                QTextLength(QTextLength.Type.PercentageLength, 100 / (len(selected_fields) + 1))
-                for _ in range(len(selected_fields) + 1)
-            ])
-
-        cell_format = QTextTableCellFormat()
-        cell_format.setBorder(0.5)
-        cell_format.setBorderBrush(QColor("black"))
-
-        table.cellAt(0, 0).setFormat(cell_format)
-        table.cellAt(0, 0).firstCursorPosition().insertText("#", header_format)
-
-        for i, (_, header_text) in enumerate(selected_fields, 1):
-            table.cellAt(0, i).setFormat(cell_format)
-            table.cellAt(0, i).firstCursorPosition().insertText(header_text, header_format)
-
-        # Ищем индексы нужных колонок
-        name_col_fam = name_col_name = name_col_patronym = dept_col = pos_col = birth_col = None
-
-        for col in range(self.model.columnCount()):
-            header = str(self.model.headerData(col, Qt.Orientation.Horizontal)).strip().lower()
-            if header == "фамилия":
-                name_col_fam = col
-            elif header == "имя":
-                name_col_name = col
-            elif header == "отчество":
-                name_col_patronym = col
-            elif "отдел" in header:
-                dept_col = col
-            elif "должн" in header:
-                pos_col = col
-            elif "дата рождения" in header or "рожд" in header:
-                birth_col = col
-
-        if name_col_fam is None or name_col_name is None or name_col_patronym is None:
+        if self.name_col_fam is None or self.name_col_name is None or self.name_col_patronym is None:
             QMessageBox.warning(self, "Ошибка", "Не найдены все колонки ФИО в таблице.")
             return
 
-        names = [item.text() for item in self.name_filter.selectedItems()]
-        depts = [item.text() for item in self.department_filter.selectedItems()]
-        positions = [item.text() for item in self.position_filter.selectedItems()]
-        date_start = self.date_from.date()
-        date_end = self.date_to.date()
-
-        for row in range(self.model.rowCount()):
-            fam = self.model.data(self.model.index(row, name_col_fam)) or ""
-            name = self.model.data(self.model.index(row, name_col_name)) or ""
-            pat = self.model.data(self.model.index(row, name_col_patronym)) or ""
-            full_name = f"{fam} {name} {pat}".strip()
-
-            dept_val = self.model.data(self.model.index(row, dept_col)) if dept_col is not None else ""
-            pos_val = self.model.data(self.model.index(row, pos_col)) if pos_col is not None else ""
-            date_val = self.model.data(self.model.index(row, birth_col)) if birth_col is not None else ""
-            birth_date = QDate.fromString(date_val, "dd.MM.yyyy") if date_val else QDate()
-
-            if names and full_name not in names:
-                continue
-            if depts and dept_val not in depts:
-                continue
-            if positions and pos_val not in positions:
-                continue
-            if birth_date.isValid() and (birth_date < date_start or birth_date > date_end):
-                continue
-
-            table.appendRows(1)
-            row_index = table.rows() - 1
-            table.cellAt(row_index, 0).setFormat(cell_format)
-            table.cellAt(row_index, 0).firstCursorPosition().insertText(str(row_index))  # row_index = 1, 2, 3…
-
-            for i, (col, _) in enumerate(selected_fields, 1):
-                val = self.model.data(self.model.index(row, col))
-                table.cellAt(row_index, i).setFormat(cell_format)
-                table.cellAt(row_index, i).firstCursorPosition().insertText(str(val) if val else "")
-
-        # Сохранение
-        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-        printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
         file_path, _ = QFileDialog.getSaveFileName(
             self, "Сохранить отчет как PDF",
             os.path.expanduser(f"~/Отчет_{self.table_name}.pdf"),
@@ -321,19 +180,21 @@ class ReportGenerator(QDialog):
         if not file_path:
             return
 
-        printer.setOutputFileName(file_path)
-        printer.setPageMargins(QMarginsF(15, 15, 15, 15))
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        cursor.insertBlock()
-
-        footer_format = QTextCharFormat()
-        footer_font = QFont("Arial", 10)
-        footer_font.setItalic(True)
-        footer_format.setFont(footer_font)
-
-        cursor.setCharFormat(footer_format)
-        cursor.insertText("\nРуководитель отдела информационных технологий: ____________ /Фамилия И.О./")
-        doc.print(printer)
-
-        QMessageBox.information(self, "Успешно", f"Отчет сохранен:\n{file_path}")
+        rows = self.data.select(
+            allowed=[
+                (self.dept_col, [item.text() for item in self.department_filter.selectedItems()]),
+                (self.pos_col, [item.text() for item in self.position_filter.selectedItems()]),
+            ],
+            dates=[(self.birth_col, self.date_from.date(), self.date_to.date())],
+        )
+        names = {item.text() for item in self.name_filter.selectedItems()}
+        if names:
+            rows = [i for i in rows if self.full_name(self.data.rows[i]) in names]
+
+        # Документ строится и печатается в фоне
+        run_report(self.parentWidget() or self, ReportWorker(
+            file_path, f"Отчет по таблице: {self.table_name}", [hdr for _, hdr in selected_fields],
+            self.data.table(rows, [col for col, _ in selected_fields]),
+            margins=15, font_family="", subtitle_size=12
+        ))
         self.accept()
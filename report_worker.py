@@ -0,0 +1,177 @@
+"""
+Формирование PDF-отчётов в фоновом процессе.
+
+Диалог отчёта собирает строки (это быстро и требует модели, то есть
+GUI-потока), спрашивает имя файла и отдаёт всё ReportWorker. Документ
+строится и печатается (см. pdf_table.py) в отдельном процессе Python: поток
+здесь не помогает, потому что PyQt держит GIL на всё время каждого вызова Qt
+и окно всё равно подтормаживает. run_report() показывает
+немодальный прогресс с кнопкой «Отмена» и сообщает о результате.
+
+Процесс пишет во временный файл, который переименовывается только после
+успешной печати, поэтому отменённый отчёт не оставляет недописанный PDF.
+
+    python report_worker.py задание.json вывод.pdf
+"""
+import json
+import os
+import sys
+import tempfile
+
+from PyQt6.QtCore import QObject, QProcess, Qt, pyqtSignal
+from PyQt6.QtGui import QGuiApplication
+from PyQt6.QtWidgets import QMessageBox, QProgressDialog
+
+from pdf_table import PdfTableWriter
+
+COMPANY = "ООО «Разработчики Программ»"
+FOOTER = "Руководитель отдела информационных технологий: ____________ /Фамилия И.О./"
+
+
+def render_report(path, title, headers, rows, widths=None, numbered=True, footer=FOOTER,
+                  margins=10, font_family="Arial", subtitle_size=None, text_size=8,
+                  progress=None):
+    """
+    Печатает таблицу rows в PDF path. numbered добавляет колонку "#" с
+    номером строки, widths — ширины колонок в процентах (по умолчанию
+    поровну). progress(готово, всего) вызывается по мере печати.
+    """
+    headers = (["#"] if numbered else []) + list(headers)
+    total = len(rows)
+    writer = PdfTableWriter(path, headers, widths, margins, font_family, text_size)
+    writer.begin(title, COMPANY, subtitle_size)
+    step = max(1, total // 100)
+    for r, values in enumerate(rows, 1):
+        writer.add_row([str(r)] + list(values) if numbered else values)
+        if progress and r % step == 0:
+            progress(r, total)
+    writer.finish(footer)
+    if progress:
+        progress(total, total)
+
+
+class ReportWorker(QObject):
+    progress = pyqtSignal(int, int)   # готово строк, всего строк
+    saved = pyqtSignal(str)           # путь к готовому PDF
+    failed = pyqtSignal(str)          # текст ошибки
+    finished = pyqtSignal()
+
+    def __init__(self, file_path, title, headers, rows, parent=None, **options):
+        """Параметры те же, что у render_report(); значения строк приводятся к str."""
+        super().__init__(parent)
+        self.file_path = file_path
+        self.title = title
+        self.total = len(rows)
+        self.spec = dict(options, title=title, headers=list(headers), rows=[
+            ["" if val is None else str(val) for val in row] for row in rows
+        ])
+        self.process = None
+        self._spec_path = None
+        self._cancelled = False
+
+    def part_path(self):
+        return self.file_path + ".part"
+
+    def start(self):
+        fd, self._spec_path = tempfile.mkstemp(prefix="report_", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.spec, f, ensure_ascii=False)
+        self.spec = None
+
+        self.process = QProcess(self)
+        self.process.readyReadStandardOutput.connect(self._read_progress)
+        self.process.finished.connect(self._on_finished)
+        self.process.start(sys.executable, [os.path.abspath(__file__), self._spec_path, self.part_path()])
+
+    def cancel(self):
+        if self.process is not None and self.process.state() != QProcess.ProcessState.NotRunning:
+            self._cancelled = True
+            self.process.kill()
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def _read_progress(self):
+        while self.process.canReadLine():
+            parts = bytes(self.process.readLine()).split()
+            if len(parts) == 2:
+                self.progress.emit(int(parts[0]), int(parts[1]))
+
+    def _on_finished(self, exit_code, exit_status):
+        ok = not self._cancelled and exit_status == QProcess.ExitStatus.NormalExit and exit_code == 0
+        for path in (self._spec_path, None if ok else self.part_path()):
+            if path and os.path.exists(path):
+                os.remove(path)
+        if self._cancelled:
+            pass
+        elif ok:
+            try:
+                os.replace(self.part_path(), self.file_path)
+            except OSError as e:
+                self.failed.emit(str(e))
+            else:
+                self.saved.emit(self.file_path)
+        else:
+            error = bytes(self.process.readAllStandardError()).decode("utf-8", "replace").strip()
+            self.failed.emit(error.splitlines()[-1] if error else f"код завершения {exit_code}")
+        self.finished.emit()
+
+
+_running = set()
+
+
+def running_reports():
+    """Отчёты, которые ещё формируются (для замеров и закрытия программы)."""
+    return list(_running)
+
+
+def run_report(parent, worker):
+    """
+    Запускает worker и показывает немодальный прогресс. Сообщение об успехе
+    или ошибке выводится, когда отчёт готов.
+    """
+    progress = QProgressDialog("Формирование отчёта…", "Отмена", 0, max(worker.total, 1), parent)
+    progress.setWindowTitle(worker.title)
+    progress.setWindowModality(Qt.WindowModality.NonModal)
+    progress.setMinimumDuration(500)
+    progress.setAutoReset(False)
+    progress.setAutoClose(False)
+    progress.setValue(0)
+
+    def on_progress(done, total):
+        progress.setMaximum(max(total, 1))
+        progress.setValue(done)
+
+    def on_finished():
+        _running.discard(worker)
+        progress.canceled.disconnect(worker.cancel)
+        progress.close()
+        progress.deleteLater()
+        worker.deleteLater()
+
+    progress.canceled.connect(worker.cancel)
+    worker.progress.connect(on_progress)
+    worker.saved.connect(lambda path: QMessageBox.information(parent, "Успешно", f"Отчёт сохранён:\n{path}"))
+    worker.failed.connect(lambda error: QMessageBox.critical(parent, "Ошибка", f"Не удалось сформировать отчёт:\n{error}"))
+    worker.finished.connect(on_finished)
+    _running.add(worker)
+    worker.start()
+    return worker
+
+
+def main(argv):
+    spec_path, out_path = argv[1:3]
+    # процессу окна не нужны, только шрифты и печать
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QGuiApplication(argv[:1])
+    with open(spec_path, encoding="utf-8") as f:
+        spec = json.load(f)
+
+    def progress(done, total):
+        print(done, total, flush=True)
+    render_report(out_path, progress=progress, **spec)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,262 @@
+"""
+Полнотекстовый индекс FTS5 для строки поиска TableWidget.
+
+Для каждой вкладки есть таблица ПОИСК_<таблица> с теми же колонками, что видит
+пользователь (для JOIN-вкладок — уже склеенные названия оборудования, ФИО и
+т.д.), rowid совпадает с id записи. Триггеры на основной и связанных таблицах
+держат индекс актуальным. Токенизатор trigram даёт поиск по подстроке без
+учёта регистра, как и прежний поиск в Python.
+"""
+from PyQt6.QtSql import QSqlQuery
+
+from filter_compiler import glob_contains
+from query_builder import run
+
+EQUIPMENT_LABEL = "o.название||' ('||o.производитель||', SN:'||o.серийный_номер||')'"
+PERSON_LABEL = "s.фамилия||' '||s.имя||COALESCE(' '||s.отчество,'')"
+WORKPLACE_LABEL = "wp.корпус||' | этаж '||wp.этаж||' | каб. '||wp.кабинет||' | стол '||wp.стол"
+# то же, что показывает CostModel: "1 234.00 ₽"
+MONEY_LABEL = ("replace(printf('%,d', CAST(ROUND(m.стоимость, 2) AS INTEGER)), ',', ' ')"
+               "||substr(printf('%.2f', m.стоимость), -3)||' ₽'")
+
+# Описание JOIN-вкладок: колонки (имя поля результата, выражение), FROM,
+# ключ и связанные таблицы (таблица, внешний ключ в основной таблице).
+JOIN_SOURCES = {
+    "ОБСЛУЖИВАНИЕ": {
+        "alias": "m",
+        "columns": [
+            ("Оборудование", EQUIPMENT_LABEL),
+            ("Дата", "m.дата"),
+            ("Тип работы", "m.тип_работы"),
+            ("Описание", "m.описание"),
+            ("Техник", PERSON_LABEL),
+            ("Стоимость", MONEY_LABEL),
+        ],
+        "from": "ОБСЛУЖИВАНИЕ m "
+                "JOIN ОБОРУДОВАНИЕ o ON m.оборудование_id = o.id "
+                "LEFT JOIN СОТРУДНИК s ON m.техник_id = s.id",
+        "depends": [("ОБОРУДОВАНИЕ", "оборудование_id"), ("СОТРУДНИК", "техник_id")],
+    },
+    "ВЫДАЧА_ТЕХНИКИ": {
+        "alias": "w",
+        "columns": [
+            ("Оборудование", EQUIPMENT_LABEL),
+            ("Сотрудник", PERSON_LABEL),
+            ("Рабочее_место", WORKPLACE_LABEL),
+            ("Дата_выдачи", "w.дата_выдачи"),
+            ("Состояние_возврата", "w.состояние_при_возврате"),
+        ],
+        "from": "ВЫДАЧА_ТЕХНИКИ w "
+                "JOIN ОБОРУДОВАНИЕ o ON w.оборудование_id = o.id "
+                "JOIN СОТРУДНИК s ON w.сотрудник_id = s.id "
+                "JOIN РАБОЧЕЕ_МЕСТО wp ON w.рабочее_место_id = wp.id",
+        "depends": [
+            ("ОБОРУДОВАНИЕ", "оборудование_id"),
+            ("СОТРУДНИК", "сотрудник_id"),
+            ("РАБОЧЕЕ_МЕСТО", "рабочее_место_id"),
+        ],
+    },
+}
+PLAIN_TABLES = ["ОБОРУДОВАНИЕ", "РАБОЧЕЕ_МЕСТО", "СОТРУДНИК"]
+# Внешние ключи справочников, вместо которых вкладка показывает подпись
+# (СОТРУДНИК — queries.WORKPLACE_LABELS): в индекс идёт та же подпись.
+# внешний ключ -> (поле вкладки, выражение, JOIN, справочник)
+PLAIN_LABELS = {
+    "СОТРУДНИК": {
+        "рабочее_место_id": ("рабочее_место", WORKPLACE_LABEL,
+                             "LEFT JOIN РАБОЧЕЕ_МЕСТО wp ON t.рабочее_место_id = wp.id", "РАБОЧЕЕ_МЕСТО"),
+    },
+}
+# колонки справочников, из которых собраны подписи JOIN-вкладок: только их
+# изменение переиндексирует ссылающиеся строки (смена статуса — нет)
+LABEL_COLUMNS = {
+    "ОБОРУДОВАНИЕ": ["название", "производитель", "серийный_номер"],
+    "СОТРУДНИК": ["фамилия", "имя", "отчество"],
+    "РАБОЧЕЕ_МЕСТО": ["корпус", "этаж", "кабинет", "стол"],
+}
+
+# trigram ищет только по фрагментам от трёх символов
+MIN_MATCH_LENGTH = 3
+
+
+def search_table(table_name):
+    return f"ПОИСК_{table_name}"
+
+
+def fts_column(field):
+    return str(field).replace(" ", "_")
+
+
+# --- создание индекса (вызывается из migrations.py) -------------------------
+
+def _plain_source(conn, table):
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info([{table}])") if row[1] != "id"]
+    if not columns:
+        return None
+    source = {"alias": "t", "columns": [], "from": f"[{table}] t", "depends": []}
+    labels = PLAIN_LABELS.get(table, {})
+    for c in columns:
+        if c in labels:
+            field, expr, join, dep_table = labels[c]
+            source["columns"].append((field, expr))
+            source["from"] += f" {join}"
+            source["depends"].append((dep_table, c))
+        else:
+            source["columns"].append((c, f"t.[{c}]"))
+    return source
+
+
+def _refill_sql(table, source, where):
+    """INSERT в индекс поиска строк table, подходящих под where."""
+    fts = search_table(table)
+    names = ", ".join(f"[{fts_column(name)}]" for name, _ in source["columns"])
+    exprs = ", ".join(expr for _, expr in source["columns"])
+    return (f"INSERT INTO [{fts}](rowid, {names}) "
+            f"SELECT {source['alias']}.id, {exprs} FROM {source['from']} WHERE {where};")
+
+
+def _dependency_triggers(table, source):
+    """Триггеры справочников: изменение подписи меняет текст всех ссылающихся строк."""
+    fts = search_table(table)
+    alias = source["alias"]
+    triggers = {}
+    for dep_table, fk in source["depends"]:
+        for event, ref in (("au", "NEW"), ("ad", "OLD")):
+            if event == "au":
+                kind = f"UPDATE OF {', '.join(LABEL_COLUMNS[dep_table])}"
+            else:
+                kind = "DELETE"
+            triggers[f"{fts}_{dep_table}_{event}"] = (
+                f"AFTER {kind} ON [{dep_table}] BEGIN "
+                f"DELETE FROM [{fts}] WHERE rowid IN (SELECT id FROM [{table}] WHERE [{fk}] = {ref}.id); "
+                f"{_refill_sql(table, source, f'{alias}.[{fk}] = {ref}.id')} END"
+            )
+    return triggers
+
+
+def _create_triggers(conn, triggers):
+    for name, body in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS [{name}]")
+        conn.execute(f"CREATE TRIGGER [{name}] {body}")
+
+
+def _create_index(conn, table, source):
+    fts = search_table(table)
+    alias = source["alias"]
+    names = ", ".join(f"[{fts_column(name)}]" for name, _ in source["columns"])
+
+    def refill(where):
+        return _refill_sql(table, source, where)
+
+    conn.execute(f"DROP TABLE IF EXISTS [{fts}]")
+    conn.execute(f"CREATE VIRTUAL TABLE [{fts}] USING fts5({names}, tokenize='trigram')")
+    conn.execute(refill("1").rstrip(";"))
+
+    triggers = {
+        f"{fts}_ai": f"AFTER INSERT ON [{table}] BEGIN {refill(f'{alias}.id = NEW.id')} END",
+        f"{fts}_au": (f"AFTER UPDATE ON [{table}] BEGIN "
+                      f"DELETE FROM [{fts}] WHERE rowid = OLD.id; "
+                      f"{refill(f'{alias}.id = NEW.id')} END"),
+        f"{fts}_ad": f"AFTER DELETE ON [{table}] BEGIN DELETE FROM [{fts}] WHERE rowid = OLD.id; END",
+    }
+    triggers.update(_dependency_triggers(table, source))
+    _create_triggers(conn, triggers)
+
+
+def create_search_index(conn):
+    """Создаёт (пересоздаёт) индексы поиска и триггеры для всех вкладок."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE temp.fts5_probe")
+    except Exception:
+        # SQLite собран без FTS5/trigram — остаётся поиск в Python
+        return
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in PLAIN_TABLES:
+        if table in tables:
+            source = _plain_source(conn, table)
+            if source and {dep for dep, _ in source["depends"]} <= tables:
+                _create_index(conn, table, source)
+    for table, source in JOIN_SOURCES.items():
+        needed = {table} | {dep for dep, _ in source["depends"]}
+        if needed <= tables:
+            _create_index(conn, table, source)
+
+
+def create_label_search_index(conn):
+    """Пересоздаёт индексы справочников из PLAIN_LABELS (подписи вместо id)."""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in PLAIN_LABELS:
+        if search_table(table) not in tables:
+            continue
+        source = _plain_source(conn, table)
+        if source and {dep for dep, _ in source["depends"]} <= tables:
+            _create_index(conn, table, source)
+            _columns_cache.pop(search_table(table), None)
+
+
+def update_dependency_triggers(conn):
+    """Пересоздаёт только триггеры справочников у уже построенных индексов."""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table, source in JOIN_SOURCES.items():
+        if search_table(table) in tables:
+            _create_triggers(conn, _dependency_triggers(table, source))
+
+
+# --- поиск -----------------------------------------------------------------
+
+_columns_cache = {}
+
+
+def search_columns(table_name):
+    """Колонки индекса поиска вкладки; пустой список, если индекса нет."""
+    fts = search_table(table_name)
+    if fts not in _columns_cache:
+        q = QSqlQuery(f"PRAGMA table_info([{fts}])")
+        cols = []
+        while q.next():
+            cols.append(q.value(1))
+        _columns_cache[fts] = cols
+    return _columns_cache[fts]
+
+
+def match_query(table_name, text, field=None):
+    """
+    Подзапрос «SELECT rowid ...» с id записей, где встречается text (во всех
+    колонках или только в колонке field). Возвращает (sql, params) или None,
+    если для вкладки нет индекса.
+    """
+    columns = search_columns(table_name)
+    if not columns or not text:
+        return None
+    fts = search_table(table_name)
+    if field is not None:
+        column = fts_column(field)
+        if column not in columns:
+            return None
+        columns = [column]
+
+    if len(text) >= MIN_MATCH_LENGTH:
+        target = f"[{columns[0]}]" if field is not None else f"[{fts}]"
+        phrase = '"' + text.replace('"', '""') + '"'
+        return f"SELECT rowid FROM [{fts}] WHERE {target} MATCH ?", [phrase]
+
+    # короткий фрагмент — GLOB по колонкам индекса (без триграмм)
+    pattern = glob_contains(text)
+    where = " OR ".join(f"[{c}] GLOB ?" for c in columns)
+    return f"SELECT rowid FROM [{fts}] WHERE {where}", [pattern] * len(columns)
+
+
+def search_ids(table_name, text, field=None):
+    """Множество id записей, подходящих под поиск, или None без индекса."""
+    query = match_query(table_name, text, field)
+    if query is None:
+        return None
+    q = run(*query)
+    if not q.isActive():
+        return None
+    ids = set()
+    while q.next():
+        ids.add(q.value(0))
+    q.finish()
+    return ids
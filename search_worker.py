@@ -0,0 +1,71 @@
+"""
+Фоновый поиск для строки поиска TableWidget.
+
+SearchWorker выполняет SQL-запрос поиска (см. search_index.py) в отдельном
+потоке со своим соединением к базе и отдаёт найденные значения пачками, чтобы
+первые совпадения выделялись сразу, не дожидаясь конца запроса. Устаревший
+поиск отменяется через cancel(): поток перестаёт читать результат и
+завершается, а его пачки отбрасываются по номеру поиска.
+"""
+import itertools
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+from db import open_database
+
+
+class SearchWorker(QThread):
+    CHUNK_SIZE = 500
+    # пачка уходит и раньше, если с прошлой прошло столько секунд
+    CHUNK_INTERVAL = 0.05
+
+    chunk_found = pyqtSignal(int, list)   # номер поиска, значения первой колонки
+    search_done = pyqtSignal(int)         # номер поиска
+
+    _names = itertools.count()
+
+    def __init__(self, generation, sql, params=(), parent=None):
+        super().__init__(parent)
+        self.generation = generation
+        self.sql = sql
+        self.params = list(params)
+        # путь к базе берём здесь, в GUI-потоке: соединение по умолчанию
+        # нельзя трогать из другого потока
+        self.db_path = QSqlDatabase.database().databaseName()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        name = f"search_{next(self._names)}"
+        conn = open_database(name, self.db_path)
+        if conn.isOpen():
+            self._read(conn)
+            conn.close()
+        del conn
+        QSqlDatabase.removeDatabase(name)
+        if not self._cancelled:
+            self.search_done.emit(self.generation)
+
+    def _read(self, conn):
+        q = QSqlQuery(conn)
+        q.setForwardOnly(True)
+        q.prepare(self.sql)
+        for i, v in enumerate(self.params):
+            q.bindValue(i, v)
+        if not q.exec():
+            return
+        chunk = []
+        last_emit = time.monotonic()
+        while not self._cancelled and q.next():
+            chunk.append(q.value(0))
+            now = time.monotonic()
+            if len(chunk) >= self.CHUNK_SIZE or now - last_emit >= self.CHUNK_INTERVAL:
+                self.chunk_found.emit(self.generation, chunk)
+                chunk = []
+                last_emit = now
+        if chunk and not self._cancelled:
+            self.chunk_found.emit(self.generation, chunk)
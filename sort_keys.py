@@ -0,0 +1,109 @@
+"""
+Ключи сортировки JOIN-вкладок.
+
+Вид сортирует ВЫДАЧА_ТЕХНИКИ и ОБСЛУЖИВАНИЕ в SQL (PagedQueryModel.sort), но
+сортировать JOIN по подписи или дате заново для каждой страницы — это чтение
+и сортировка всех строк. Поэтому для каждой вкладки есть таблица
+ПОРЯДОК_<таблица> (rowid совпадает с id записи): в ней для каждой колонки
+вкладки лежит ключ с правильным типом — подписи справочников текстом, даты в
+виде yyyy-MM-dd, стоимость числом; NULL заменён на ''. По каждому ключу есть
+индекс, и страница отсортированной вкладки — поиск по индексу (ключ, id).
+Триггеры держат таблицу актуальной так же, как индекс поиска (search_index.py).
+"""
+from PyQt6.QtSql import QSqlQuery
+
+from filter_compiler import iso_date_sql
+from search_index import JOIN_SOURCES, LABEL_COLUMNS, fts_column
+
+# Колонки, у которых ключ — не то же выражение, что видно во вкладке
+SORT_EXPRESSIONS = {
+    ("ОБСЛУЖИВАНИЕ", "Дата"): iso_date_sql("дата", "m"),
+    ("ОБСЛУЖИВАНИЕ", "Стоимость"): "m.стоимость",
+    ("ВЫДАЧА_ТЕХНИКИ", "Дата_выдачи"): iso_date_sql("дата_выдачи", "w"),
+}
+
+
+def sort_table(table_name):
+    return f"ПОРЯДОК_{table_name}"
+
+
+def sort_column(field):
+    """Колонка ключа в ПОРЯДОК_* для поля результата запроса вкладки."""
+    return f"порядок_{fts_column(field)}"
+
+
+def _keys(table):
+    """[(колонка ключа, выражение)] для вкладки table."""
+    return [(sort_column(name), f"IFNULL({SORT_EXPRESSIONS.get((table, name), expr)}, '')")
+            for name, expr in JOIN_SOURCES[table]["columns"]]
+
+
+# --- создание таблиц (вызывается из migrations.py) --------------------------
+
+def _refill_sql(table, where):
+    source = JOIN_SOURCES[table]
+    keys = _keys(table)
+    names = ", ".join(f"[{name}]" for name, _ in keys)
+    exprs = ", ".join(expr for _, expr in keys)
+    return (f"INSERT INTO [{sort_table(table)}](id, {names}) "
+            f"SELECT {source['alias']}.id, {exprs} FROM {source['from']} WHERE {where};")
+
+
+def _triggers(table):
+    target = sort_table(table)
+    alias = JOIN_SOURCES[table]["alias"]
+    triggers = {
+        f"{target}_ai": f"AFTER INSERT ON [{table}] BEGIN {_refill_sql(table, f'{alias}.id = NEW.id')} END",
+        f"{target}_au": (f"AFTER UPDATE ON [{table}] BEGIN "
+                         f"DELETE FROM [{target}] WHERE id = OLD.id; "
+                         f"{_refill_sql(table, f'{alias}.id = NEW.id')} END"),
+        f"{target}_ad": f"AFTER DELETE ON [{table}] BEGIN DELETE FROM [{target}] WHERE id = OLD.id; END",
+    }
+    # изменение подписи в справочнике меняет ключи всех ссылающихся строк
+    for dep_table, fk in JOIN_SOURCES[table]["depends"]:
+        for event, kind, ref in (("au", f"UPDATE OF {', '.join(LABEL_COLUMNS[dep_table])}", "NEW"),
+                                 ("ad", "DELETE", "OLD")):
+            triggers[f"{target}_{dep_table}_{event}"] = (
+                f"AFTER {kind} ON [{dep_table}] BEGIN "
+                f"DELETE FROM [{target}] WHERE id IN (SELECT id FROM [{table}] WHERE [{fk}] = {ref}.id); "
+                f"{_refill_sql(table, f'{alias}.[{fk}] = {ref}.id')} END"
+            )
+    return triggers
+
+
+def create_sort_keys(conn):
+    """Создаёт (пересоздаёт) таблицы ключей сортировки, индексы и триггеры."""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table, source in JOIN_SOURCES.items():
+        if not {table} | {dep for dep, _ in source["depends"]} <= tables:
+            continue
+        target = sort_table(table)
+        keys = _keys(table)
+        conn.execute(f"DROP TABLE IF EXISTS [{target}]")
+        conn.execute(f"CREATE TABLE [{target}] (id INTEGER PRIMARY KEY, "
+                     f"{', '.join(f'[{name}]' for name, _ in keys)})")
+        conn.execute(_refill_sql(table, "1").rstrip(";"))
+        # индекс (ключ) хранит и rowid — это и есть порядок (ключ, id)
+        for name, _ in keys:
+            conn.execute(f"CREATE INDEX [idx_{target}_{name}] ON [{target}]([{name}])")
+        for name, body in _triggers(table).items():
+            conn.execute(f"DROP TRIGGER IF EXISTS [{name}]")
+            conn.execute(f"CREATE TRIGGER [{name}] {body}")
+
+
+# --- чтение -----------------------------------------------------------------
+
+_columns_cache = {}
+
+
+def sort_columns(table_name):
+    """Колонки ключей вкладки; пустое множество, если таблицы ключей нет."""
+    target = sort_table(table_name)
+    if target not in _columns_cache:
+        q = QSqlQuery(f"PRAGMA table_info([{target}])")
+        columns = set()
+        while q.next():
+            columns.add(q.value(1))
+        columns.discard("id")
+        _columns_cache[target] = columns
+    return _columns_cache[target]
@@ -0,0 +1,101 @@
+"""
+Замер холодного старта программы.
+
+Включается переменной окружения TECH_STARTUP_TRACE:
+
+    TECH_STARTUP_TRACE=1 python main.py            этапы печатаются в stderr
+    TECH_STARTUP_TRACE=start.json python main.py   этапы пишутся в JSON
+
+Этапы: импорт модулей, миграции, подключение, вход (вместе с ожиданием
+пользователя), построение окна и загрузка каждой вкладки. Вкладки грузятся
+при первом открытии, поэтому их этапы дописываются и после старта.
+Бюджет старта (без входа) задаётся TECH_STARTUP_BUDGET_MS; если он превышен,
+в отчёте это отмечено.
+"""
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# модуль импортируется первым в main.py: отсчёт идёт от запуска программы
+_STARTED = time.perf_counter()
+TARGET = os.environ.get("TECH_STARTUP_TRACE", "")
+BUDGET_MS = float(os.environ.get("TECH_STARTUP_BUDGET_MS") or 0)
+# этап входа ждёт пользователя и в бюджет не входит
+INTERACTIVE = {"вход"}
+
+_steps = []
+_last = _STARTED
+_ready = False
+_startup_ms = None
+
+
+def enabled():
+    return bool(TARGET)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def _add(name, started, finished):
+    _steps.append({"step": name, "start_ms": _ms(started - _STARTED), "ms": _ms(finished - started)})
+    if _ready:
+        _write(latest=True)
+
+
+def checkpoint(name):
+    """Этап от предыдущей отметки до текущего момента."""
+    global _last
+    now = time.perf_counter()
+    if enabled():
+        _add(name, _last, now)
+    _last = now
+
+
+@contextmanager
+def span(name):
+    """Этап, который занимает блок with."""
+    global _last
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _last = time.perf_counter()
+        if enabled():
+            _add(name, started, _last)
+
+
+def startup_ms():
+    """Время старта без интерактивных этапов (после ready() — зафиксированное)."""
+    if _startup_ms is not None:
+        return _startup_ms
+    return round(sum(s["ms"] for s in _steps if s["step"] not in INTERACTIVE), 1)
+
+
+def ready():
+    """Окно показано: итог старта печатается или записывается."""
+    global _ready, _startup_ms
+    checkpoint("показ окна")
+    _startup_ms = startup_ms()
+    _ready = True
+    if enabled():
+        _write()
+
+
+def _write(latest=False):
+    total = startup_ms()
+    over = bool(BUDGET_MS) and total > BUDGET_MS
+    if TARGET.lower().endswith(".json"):
+        with open(TARGET, "w", encoding="utf-8") as f:
+            json.dump({"steps": _steps, "startup_ms": total, "budget_ms": BUDGET_MS or None,
+                       "over_budget": over}, f, ensure_ascii=False, indent=2)
+        return
+    # после старта печатается только новый этап (вкладка, открытая позже)
+    for s in _steps[-1:] if latest else _steps:
+        print(f"[старт] {s['step']}: {s['ms']} мс", file=sys.stderr)
+    if latest:
+        return
+    budget = f" (бюджет {BUDGET_MS:g} мс{', превышен' if over else ''})" if BUDGET_MS else ""
+    print(f"[старт] итого без входа: {total} мс{budget}", file=sys.stderr)
@@ -0,0 +1,161 @@
+"""
+Сводка обслуживания, которую поддерживают триггеры.
+
+СВОДКА_ОБСЛУЖИВАНИЯ хранит по одной строке на (техник, оборудование, месяц):
+число заявок, сумму и первую/последнюю дату в месяце. Триггеры на
+ОБСЛУЖИВАНИЕ обновляют её при каждом INSERT, UPDATE и DELETE (в том числе из
+TableWidget.add_row, edit_row и delete_row), поэтому сводка по техникам и
+затраты по оборудованию читают число групп, а не число заявок.
+
+Строки без техника хранятся с техник_id = 0, без даты — с месяцем ''.
+
+    python summary_tables.py [--rebuild] [путь к базе]
+
+проверяет сводку, пересчитав её с нуля, и с --rebuild заменяет расхождения
+пересчитанными значениями.
+"""
+import sys
+
+import db
+from filter_compiler import iso_date_sql
+
+SUMMARY_TABLE = "СВОДКА_ОБСЛУЖИВАНИЯ"
+SOURCE_TABLE = "ОБСЛУЖИВАНИЕ"
+KEY = ("техник_id", "оборудование_id", "месяц")
+# суммы складываются и вычитаются по одной, поэтому сверяются с точностью до копейки
+MONEY_EPSILON = 0.005
+
+
+def _iso(ref):
+    """Дата строки ref (NEW, OLD, псевдоним) в yyyy-MM-dd или NULL."""
+    return f"CASE WHEN length({ref}.[дата]) = 10 THEN {iso_date_sql('дата', ref)} END"
+
+
+def _key(ref):
+    """Значения ключа сводки для строки ОБСЛУЖИВАНИЕ ref."""
+    return (f"IFNULL({ref}.техник_id, 0)", f"IFNULL({ref}.оборудование_id, 0)",
+            f"IFNULL(substr({_iso(ref)}, 1, 7), '')")
+
+
+def _match(ref):
+    return " AND ".join(f"{col} = {expr}" for col, expr in zip(KEY, _key(ref)))
+
+
+def _fresh_sql():
+    """Сводка, посчитанная заново по ОБСЛУЖИВАНИЕ."""
+    tech, equipment, month = _key("m")
+    return (f"SELECT {tech}, {equipment}, {month}, COUNT(*), TOTAL(m.стоимость), "
+            f"MIN({_iso('m')}), MAX({_iso('m')}) "
+            f"FROM {SOURCE_TABLE} m GROUP BY 1, 2, 3")
+
+
+def _add(ref):
+    tech, equipment, month = _key(ref)
+    return (f"INSERT INTO {SUMMARY_TABLE} VALUES ({tech}, {equipment}, {month}, 1, "
+            f"IFNULL({ref}.стоимость, 0), {_iso(ref)}, {_iso(ref)}) "
+            f"ON CONFLICT({', '.join(KEY)}) DO UPDATE SET "
+            f"заявок = заявок + 1, сумма = сумма + excluded.сумма, "
+            f"первая = CASE WHEN первая IS NULL OR excluded.первая < первая THEN excluded.первая ELSE первая END, "
+            f"последняя = CASE WHEN последняя IS NULL OR excluded.последняя > последняя "
+            f"THEN excluded.последняя ELSE последняя END;")
+
+
+def _remove(ref):
+    # первую и последнюю дату нельзя «вычесть»: если удалённая строка была
+    # крайней, они пересчитываются по строкам группы за этот месяц (поиск по
+    # индексу сводки из migrations.py)
+    iso = iso_date_sql("дата")
+    group = (f"FROM {SOURCE_TABLE} WHERE техник_id IS {ref}.техник_id AND оборудование_id IS {ref}.оборудование_id "
+             f"AND {iso} BETWEEN месяц || '-01' AND месяц || '-31'")
+    return (f"UPDATE {SUMMARY_TABLE} SET заявок = заявок - 1, сумма = сумма - IFNULL({ref}.стоимость, 0) "
+            f"WHERE {_match(ref)}; "
+            f"DELETE FROM {SUMMARY_TABLE} WHERE {_match(ref)} AND заявок <= 0; "
+            f"UPDATE {SUMMARY_TABLE} SET первая = (SELECT MIN({iso}) {group}), "
+            f"последняя = (SELECT MAX({iso}) {group}) "
+            f"WHERE {_match(ref)} AND месяц <> '' AND {_iso(ref)} IN (первая, последняя);")
+
+
+def create_summary_tables(conn):
+    """Создаёт (пересоздаёт) сводку и её триггеры, заполняет её по текущим данным."""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if SOURCE_TABLE not in tables:
+        return
+    conn.execute(f"DROP TABLE IF EXISTS {SUMMARY_TABLE}")
+    conn.execute(f"""
+        CREATE TABLE {SUMMARY_TABLE} (
+            техник_id INTEGER NOT NULL,
+            оборудование_id INTEGER NOT NULL,
+            месяц TEXT NOT NULL,
+            заявок INTEGER NOT NULL,
+            сумма REAL NOT NULL,
+            первая TEXT,
+            последняя TEXT,
+            PRIMARY KEY ({', '.join(KEY)})
+        ) WITHOUT ROWID
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS [idx_{SUMMARY_TABLE}_оборудование] "
+                 f"ON {SUMMARY_TABLE}(оборудование_id)")
+    conn.execute(f"INSERT INTO {SUMMARY_TABLE} {_fresh_sql()}")
+
+    triggers = {
+        f"{SUMMARY_TABLE}_ai": f"AFTER INSERT ON {SOURCE_TABLE} BEGIN {_add('NEW')} END",
+        f"{SUMMARY_TABLE}_au": (f"AFTER UPDATE OF техник_id, оборудование_id, дата, стоимость ON {SOURCE_TABLE} "
+                                f"BEGIN {_remove('OLD')} {_add('NEW')} END"),
+        f"{SUMMARY_TABLE}_ad": f"AFTER DELETE ON {SOURCE_TABLE} BEGIN {_remove('OLD')} END",
+    }
+    for name, body in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS [{name}]")
+        conn.execute(f"CREATE TRIGGER [{name}] {body}")
+
+
+def summary_mismatches(conn):
+    """
+    Группы, в которых сводка расходится с пересчётом по ОБСЛУЖИВАНИЕ:
+    [(техник_id, оборудование_id, месяц, что не так)].
+    """
+    same_key = " AND ".join(f"s.{col} = f.{col}" for col in KEY)
+    sql = f"""
+        WITH f({', '.join(KEY)}, заявок, сумма, первая, последняя) AS ({_fresh_sql()})
+        SELECT f.техник_id, f.оборудование_id, f.месяц,
+               CASE WHEN s.месяц IS NULL THEN 'нет в сводке' ELSE 'значения расходятся' END
+        FROM f LEFT JOIN {SUMMARY_TABLE} s ON {same_key}
+        WHERE s.месяц IS NULL OR s.заявок <> f.заявок OR abs(s.сумма - f.сумма) >= {MONEY_EPSILON}
+              OR s.первая IS NOT f.первая OR s.последняя IS NOT f.последняя
+        UNION ALL
+        SELECT s.техник_id, s.оборудование_id, s.месяц, 'лишняя группа'
+        FROM {SUMMARY_TABLE} s
+        WHERE NOT EXISTS (SELECT 1 FROM f WHERE {same_key})
+    """
+    return conn.execute(sql).fetchall()
+
+
+def rebuild_summary(conn):
+    """Заполняет сводку заново по ОБСЛУЖИВАНИЕ (триггеры не трогает)."""
+    conn.execute(f"DELETE FROM {SUMMARY_TABLE}")
+    conn.execute(f"INSERT INTO {SUMMARY_TABLE} {_fresh_sql()}")
+
+
+def check_summary(db_path=None, rebuild=False):
+    """Выводит расхождения сводки; с rebuild пересчитывает её. Возвращает их число."""
+    conn = db.connect_sqlite(db_path, isolation_level=None)
+    try:
+        found = summary_mismatches(conn)
+        for tech, equipment, month, problem in found:
+            print(f"[{problem}] техник {tech}, оборудование {equipment}, месяц {month or '—'}")
+        if found and rebuild:
+            conn.execute("BEGIN")
+            rebuild_summary(conn)
+            conn.execute("COMMIT")
+            print("Сводка пересчитана")
+    finally:
+        conn.close()
+    return len(found)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    rebuild = "--rebuild" in args
+    args = [a for a in args if a != "--rebuild"]
+    found = check_summary(args[0] if args else db.DB_PATH, rebuild)
+    print(f"Расхождений: {found}")
+    sys.exit(1 if found and not rebuild else 0)
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from generate_data import generate
+
+
+@pytest.fixture
+def small_db(tmp_path):
+    """Небольшая сгенерированная база со всеми миграциями."""
+    path = str(tmp_path / "tech.db")
+    generate(path, equipment=60, employees=40, workplaces=8, issuances=120, maintenance=300)
+    return path
+
+
+@pytest.fixture
+def conn(small_db):
+    conn = db.connect_sqlite(small_db, isolation_level=None)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def change_maintenance(conn):
+    """Добавление, изменение и удаление заявок, в том числе смена техника и месяца."""
+    def apply():
+        conn.execute("INSERT INTO ОБСЛУЖИВАНИЕ (оборудование_id, дата, тип_работы, описание, техник_id, стоимость) "
+                     "SELECT оборудование_id, '15.03.2024', 'Ремонт', 'тест', техник_id, 99.99 "
+                     "FROM ОБСЛУЖИВАНИЕ WHERE техник_id IS NOT NULL LIMIT 1")
+        conn.execute("UPDATE ОБСЛУЖИВАНИЕ SET стоимость = стоимость + 10 WHERE id % 7 = 0")
+        conn.execute("UPDATE ОБСЛУЖИВАНИЕ SET дата = '01.01.2020', техник_id = NULL WHERE id % 11 = 0")
+        conn.execute("DELETE FROM ОБСЛУЖИВАНИЕ WHERE id % 13 = 0")
+    return apply
+
+
+@pytest.fixture
+def rename_lookups(conn):
+    """Изменение подписей справочников, на которые ссылаются JOIN-вкладки."""
+    def apply():
+        conn.execute("UPDATE ОБОРУДОВАНИЕ SET название = название || ' новое' WHERE id % 3 = 0")
+        conn.execute("UPDATE СОТРУДНИК SET фамилия = 'Яковлев' WHERE id % 4 = 0")
+        conn.execute("UPDATE РАБОЧЕЕ_МЕСТО SET корпус = 'Z' WHERE id = 1")
+    return apply
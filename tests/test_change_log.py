@@ -0,0 +1,10 @@
+from change_log import CHANGE_LOG
+
+
+def test_change_log_records_changes(conn, change_maintenance):
+    start = conn.execute(f"SELECT IFNULL(MAX(номер), 0) FROM {CHANGE_LOG}").fetchone()[0]
+    change_maintenance()
+    logged = {row[0] for row in conn.execute(
+        f"SELECT запись_id FROM {CHANGE_LOG} WHERE номер > ? AND таблица = 'ОБСЛУЖИВАНИЕ'", [start])}
+    assert {row[0] for row in conn.execute("SELECT id FROM ОБСЛУЖИВАНИЕ WHERE id % 7 = 0")} <= logged
+    assert {13, 26} <= logged
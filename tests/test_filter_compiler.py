@@ -0,0 +1,63 @@
+from filter_compiler import compile_filters, glob_contains, iso_date_sql, to_iso_date
+
+FIELDS = ["Оборудование", "Дата", "Тип работы", "Стоимость"]
+KINDS = {"Дата": "date", "Стоимость": "money"}
+
+
+def test_empty_filters():
+    assert compile_filters(["", ("", ""), "  ", ""], FIELDS, KINDS) == ("", [], [])
+
+
+def test_list_value_is_equality():
+    where, params, rest = compile_filters(["", "", "Ремонт", ""], FIELDS, KINDS, exact={2})
+    assert where == "[Тип работы] = ?"
+    assert params == ["Ремонт"]
+    assert rest == []
+
+
+def test_typed_value_is_case_insensitive_substring():
+    where, params, rest = compile_filters(["ив", "", "", ""], FIELDS, KINDS)
+    assert where == "[Оборудование] GLOB ?"
+    assert params == ["*[Ии][Вв]*"]
+    assert rest == []
+
+
+def test_glob_special_characters_are_literal():
+    assert glob_contains("a*?[]") == "*[Aa][*][?][[][]]*"
+
+
+def test_date_range():
+    where, params, _ = compile_filters(["", ("01.02.2024", "31.12.2024"), "", ""], FIELDS, KINDS)
+    expr = iso_date_sql("Дата")
+    assert where == f"{expr} >= ? AND {expr} <= ?"
+    assert params == ["2024-02-01", "2024-12-31"]
+
+
+def test_open_date_range():
+    where, params, _ = compile_filters(["", ("", "31.12.2024"), "", ""], FIELDS, KINDS)
+    assert where == f"{iso_date_sql('Дата')} <= ?"
+    assert params == ["2024-12-31"]
+
+
+def test_money_is_rounded_amount():
+    where, params, _ = compile_filters(["", "", "", "1 234.50 ₽"], FIELDS, KINDS, exact={3})
+    assert where == "ROUND([Стоимость], 2) = ?"
+    assert params == [1234.5]
+
+
+def test_uncompilable_values_go_to_proxy():
+    filters = ["", ("2024-01-01", ""), "", "без суммы"]
+    where, params, rest = compile_filters(filters, FIELDS, KINDS)
+    assert (where, params) == ("", [])
+    assert rest == [(("2024-01-01", ""), 1), ("без суммы", 3)]
+
+
+def test_column_without_field_goes_to_proxy():
+    where, _, rest = compile_filters(["x", "", "Ремонт", ""], [None] + FIELDS[1:], KINDS, exact={2})
+    assert where == "[Тип работы] = ?"
+    assert rest == [("x", 0)]
+
+
+def test_to_iso_date():
+    assert to_iso_date(" 05.07.2023 ") == "2023-07-05"
+    assert to_iso_date("2023-07-05") is None
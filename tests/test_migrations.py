@@ -0,0 +1,54 @@
+import db
+from migrations import MIGRATIONS, apply_migrations, explain_queries, schema_version
+from search_index import JOIN_SOURCES, search_table
+from sort_keys import sort_table
+from summary_tables import SUMMARY_TABLE
+
+LAST = MIGRATIONS[-1][0]
+
+
+def tables(path):
+    conn = db.connect_sqlite(path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+
+
+def test_numbers_are_sequential():
+    assert [number for number, _, _ in MIGRATIONS] == list(range(1, LAST + 1))
+
+
+def test_empty_database(tmp_path):
+    path = str(tmp_path / "empty.db")
+    assert apply_migrations(path) == LAST
+    # повторный запуск ничего не применяет
+    assert apply_migrations(path) == LAST
+
+
+def test_generated_database(small_db):
+    conn = db.connect_sqlite(small_db)
+    try:
+        assert schema_version(conn) == LAST
+    finally:
+        conn.close()
+    found = tables(small_db)
+    assert SUMMARY_TABLE in found
+    for table in ["ОБОРУДОВАНИЕ", "РАБОЧЕЕ_МЕСТО", "СОТРУДНИК"] + list(JOIN_SOURCES):
+        assert search_table(table) in found
+    for table in JOIN_SOURCES:
+        assert sort_table(table) in found
+
+
+def test_old_version_catches_up(small_db):
+    conn = db.connect_sqlite(small_db, isolation_level=None)
+    try:
+        conn.execute("PRAGMA user_version = 5")
+    finally:
+        conn.close()
+    assert apply_migrations(small_db) == LAST
+
+
+def test_no_full_scans(small_db, capsys):
+    assert explain_queries(small_db) == 0
+    assert "[ОШИБКА]" not in capsys.readouterr().out
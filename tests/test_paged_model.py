@@ -0,0 +1,45 @@
+import pytest
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication
+
+import db
+from paged_model import PagedQueryModel
+from query_builder import execute, fetch_rows
+
+SQL = "SELECT id, дата, тип_работы, стоимость FROM ОБСЛУЖИВАНИЕ"
+
+
+@pytest.fixture
+def qt_db(small_db):
+    app = QApplication.instance() or QApplication([])
+    db.open_database(db_path=small_db)
+    yield app
+    db.forget_statements()
+
+
+def ids(order):
+    return [row[0] for row in fetch_rows(f"SELECT id FROM ОБСЛУЖИВАНИЕ ORDER BY id {order}")]
+
+
+@pytest.mark.parametrize("order", [Qt.SortOrder.DescendingOrder, Qt.SortOrder.AscendingOrder])
+def test_sync_removes_rows_on_uncached_pages(qt_db, order):
+    model = PagedQueryModel(SQL, page_size=16)
+    model.trackChanges("ОБСЛУЖИВАНИЕ")
+    model.sort(0, order)
+    direction = "DESC" if order == Qt.SortOrder.DescendingOrder else "ASC"
+    before = ids(direction)
+    model.rowValues(0)          # в кэше только первая страница
+    rows = [3, 150, 170, 171, 250]
+    for row in rows:
+        assert not execute("DELETE FROM ОБСЛУЖИВАНИЕ WHERE id = ?", [before[row]]).isValid()
+    execute("INSERT INTO ОБСЛУЖИВАНИЕ (оборудование_id, дата, тип_работы, описание, техник_id, стоимость) "
+            "SELECT оборудование_id, '15.03.2024', 'Ремонт', 'тест', техник_id, 1 FROM ОБСЛУЖИВАНИЕ LIMIT 1")
+
+    removed, inserted = [], []
+    model.rowsAboutToBeRemoved.connect(lambda parent, first, last: removed.append(first))
+    model.rowsAboutToBeInserted.connect(lambda parent, first, last: inserted.append(first))
+    model.syncChanges()
+
+    assert removed == sorted(rows, reverse=True)
+    assert inserted == [0 if direction == "DESC" else len(before) - len(rows)]
+    assert [model.rowValues(row)[0] for row in range(model.rowCount())] == ids(direction)
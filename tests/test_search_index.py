@@ -0,0 +1,21 @@
+from search_index import JOIN_SOURCES, fts_column, search_table
+
+
+def test_search_index_follows_changes(conn, change_maintenance, rename_lookups):
+    change_maintenance()
+    rename_lookups()
+    for table, source in JOIN_SOURCES.items():
+        names = ", ".join(f"[{fts_column(name)}]" for name, _ in source["columns"])
+        exprs = ", ".join(expr for _, expr in source["columns"])
+        stored = conn.execute(f"SELECT rowid, {names} FROM [{search_table(table)}] ORDER BY rowid").fetchall()
+        fresh = conn.execute(f"SELECT {source['alias']}.id, {exprs} FROM {source['from']} "
+                             f"ORDER BY {source['alias']}.id").fetchall()
+        assert stored == fresh, table
+
+
+def test_employee_search_uses_workplace_label(conn):
+    conn.execute("UPDATE РАБОЧЕЕ_МЕСТО SET корпус = 'Зюйд' WHERE id = 1")
+    found = conn.execute(f"SELECT count(*) FROM [{search_table('СОТРУДНИК')}] WHERE рабочее_место MATCH ?",
+                         ['"Зюйд"']).fetchone()[0]
+    expected = conn.execute("SELECT count(*) FROM СОТРУДНИК WHERE рабочее_место_id = 1").fetchone()[0]
+    assert found == expected
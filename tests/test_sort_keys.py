@@ -0,0 +1,15 @@
+from search_index import JOIN_SOURCES
+from sort_keys import _keys, sort_table
+
+
+def test_sort_keys_follow_changes(conn, change_maintenance, rename_lookups):
+    change_maintenance()
+    rename_lookups()
+    for table, source in JOIN_SOURCES.items():
+        keys = _keys(table)
+        names = ", ".join(f"[{name}]" for name, _ in keys)
+        exprs = ", ".join(expr for _, expr in keys)
+        stored = conn.execute(f"SELECT id, {names} FROM [{sort_table(table)}] ORDER BY id").fetchall()
+        fresh = conn.execute(f"SELECT {source['alias']}.id, {exprs} FROM {source['from']} "
+                             f"ORDER BY {source['alias']}.id").fetchall()
+        assert stored == fresh, table
@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+
+from summary_tables import check_summary
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_summary_after_changes(small_db, change_maintenance):
+    change_maintenance()
+    assert check_summary(small_db) == 0
+
+
+def test_summary_check_command(small_db, change_maintenance):
+    change_maintenance()
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "summary_tables.py"), small_db],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Расхождений: 0" in result.stdout
@@ -0,0 +1,323 @@
+"""
+Индекс значений колонок для FilterDialog.
+
+Раньше окно фильтров выполняло SELECT DISTINCT на каждую колонку (а для
+JOIN-вкладок перебирало все строки модели), и после каждого выбора в списке
+заново — для всех списков. Теперь строки вкладки читаются один раз: для
+каждой колонки запоминаются различные значения и код значения каждой строки.
+Каскад «значения колонки среди строк, подходящих под выбранное» считается в
+памяти пересечением битовых карт (int Python: бит N — строка N) без запросов
+к базе.
+
+Индекс живёт, пока не изменятся данные вкладки. Изменения выдачи и
+обслуживания берутся из журнала (change_log.py) и вносятся в индекс по
+строкам; изменения справочников (счётчики ВЕРСИИ_ТАБЛИЦ, lookups.py) меняют
+подписи многих строк сразу, и индекс строится заново.
+
+Колонки, где почти все значения разные (описание), — свободный текст: их
+значения не собираются, в окне фильтров текст вводится вручную.
+"""
+import bisect
+from array import array
+from collections import Counter
+
+from change_log import LOGGED_TABLES, changes_since, last_change
+from lookups import REFERENCE_TABLES, table_version
+from queries import JOIN_TAB_QUERIES, filter_source
+from query_builder import run
+from search_index import JOIN_SOURCES
+
+# у колонок с большим числом значений битовые карты не хранятся заранее:
+# карта значения строится по кодам строк, когда оно выбрано
+BITMAP_MAX_VALUES = 256
+# свободный текст: больше FREE_TEXT_MIN_VALUES значений и больше такой доли строк
+FREE_TEXT_MIN_VALUES = 1000
+FREE_TEXT_SHARE = 0.5
+# больше изменений из журнала — индекс строится заново
+MAX_DELTA_ROWS = 10000
+EMPTY = -1
+
+
+def _bits(bitmap):
+    """Номера установленных битов."""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for offset, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield offset * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+def _read(sql, params=()):
+    """
+    (имена колонок, строки) результата. Читается через соединение Qt: второе
+    соединение sqlite3 в том же процессе — другая копия SQLite, и в WAL она
+    не видит (и ломает) блокировки соединения Qt, через которое идёт запись.
+    """
+    q = run(sql, params)
+    record = q.record()
+    names = [record.fieldName(i) for i in range(record.count())]
+    columns = range(len(names))
+    rows = []
+    while q.next():
+        rows.append(tuple(q.value(i) for i in columns))
+    q.finish()
+    return names, rows
+
+
+def _source_sql(table_name):
+    source = JOIN_TAB_QUERIES.get(table_name)
+    return f"SELECT * FROM ({source}) AS base" if source else f"SELECT * FROM {filter_source(table_name)}"
+
+
+def load_sql(table_name):
+    """Запрос всех строк вкладки в порядке id (построение индекса)."""
+    return f"{_source_sql(table_name)} ORDER BY id"
+
+
+def delta_sql(table_name, count):
+    """Запрос строк вкладки по count id из журнала изменений."""
+    return f"{_source_sql(table_name)} WHERE id IN ({', '.join('?' * count)})"
+
+
+class ColumnValues:
+    """
+    Значения одной колонки: код значения каждой строки (codes), текст кода
+    и число строк с ним. show превращает сырое значение в текст списка
+    (например, стоимость в "1 234.00 ₽"); вызывается по разу на значение.
+    """
+    def __init__(self, cells, show=None):
+        distinct = set(cells)
+        distinct.discard(None)
+        distinct.discard("")
+        self.free_text = len(distinct) > max(FREE_TEXT_MIN_VALUES, len(cells) * FREE_TEXT_SHARE)
+        self._show = show
+        self._labels = []                       # код -> текст
+        self._code_of = {}                      # текст -> код
+        self._raw_code = {None: EMPTY, "": EMPTY}
+        self.counts = array("i")
+        self.codes = array("i")
+        self._bitmaps = {}
+        self._all_bitmaps = False
+        self._sorted = None
+        if self.free_text:
+            return
+        for raw in distinct:
+            self._code(raw)
+        self.codes = array("i", map(self._raw_code.__getitem__, cells))
+        for code, count in Counter(self.codes).items():
+            if code != EMPTY:
+                self.counts[code] = count
+
+    def _code(self, raw):
+        code = self._raw_code.get(raw)
+        if code is not None:
+            return code
+        text = self._show(raw) if self._show else raw
+        text = "" if text is None else str(text)
+        if text == "":
+            code = EMPTY
+        else:
+            code = self._code_of.get(text)
+            if code is None:
+                code = self._code_of[text] = len(self._labels)
+                self._labels.append(text)
+                self.counts.append(0)
+                if self._all_bitmaps:
+                    self._bitmaps[code] = 0
+        self._raw_code[raw] = code
+        return code
+
+    def __contains__(self, text):
+        code = self._code_of.get(text)
+        return code is not None and self.counts[code] > 0
+
+    @property
+    def values(self):
+        """Отсортированные значения, которые есть хотя бы в одной строке."""
+        if self._sorted is None:
+            self._sorted = sorted(text for code, text in enumerate(self._labels) if self.counts[code])
+        return self._sorted
+
+    def set_row(self, row, raw):
+        """Новое значение строки row (row == числу строк — строка добавляется)."""
+        if self.free_text:
+            return
+        new = self._code(raw)
+        if row == len(self.codes):
+            self.codes.append(EMPTY)
+        old = self.codes[row]
+        if old == new:
+            return
+        self.codes[row] = new
+        for code, delta in ((old, -1), (new, 1)):
+            if code == EMPTY:
+                continue
+            self.counts[code] += delta
+            if self.counts[code] == (0 if delta < 0 else 1):
+                self._sorted = None
+            bitmap = self._bitmaps.get(code)
+            if bitmap is not None:
+                self._bitmaps[code] = bitmap ^ (1 << row)
+
+    def bitmap(self, text):
+        """Строки, где колонка равна text."""
+        code = self._code_of.get(text)
+        if code is None:
+            return 0
+        if code not in self._bitmaps:
+            bits = bytearray((len(self.codes) + 7) // 8)
+            for row, c in enumerate(self.codes):
+                if c == code:
+                    bits[row >> 3] |= 1 << (row & 7)
+            self._bitmaps[code] = int.from_bytes(bits, "little")
+        return self._bitmaps[code]
+
+    def _build_bitmaps(self):
+        # все карты колонки за один проход по строкам
+        maps = [bytearray((len(self.codes) + 7) // 8) for _ in self._labels]
+        for row, c in enumerate(self.codes):
+            if c != EMPTY:
+                maps[c][row >> 3] |= 1 << (row & 7)
+        self._bitmaps = {code: int.from_bytes(bits, "little") for code, bits in enumerate(maps)}
+        self._all_bitmaps = True
+
+    def values_in(self, rows):
+        """Значения колонки среди строк rows (битовая карта; None — все строки)."""
+        if rows is None:
+            return self.values
+        if self.free_text:
+            return []
+        if len(self._labels) <= BITMAP_MAX_VALUES:
+            if not self._all_bitmaps:
+                self._build_bitmaps()
+            codes = [code for code, bitmap in self._bitmaps.items() if bitmap & rows]
+        else:
+            codes = {self.codes[row] for row in _bits(rows)}
+            codes.discard(EMPTY)
+        return sorted(self._labels[code] for code in codes)
+
+
+class ValueIndex:
+    """
+    Значения всех колонок вкладки; колонки — по именам полей результата.
+    Строки хранятся в порядке id (ids), номер строки — номер бита в картах.
+    """
+    def __init__(self, table_name, display=None):
+        self.table_name = table_name
+        self.display = display or {}
+        self.references = reference_versions(table_name)
+        self.change_number = last_change() if table_name in LOGGED_TABLES else None
+        self.ids = array("q")
+        self.columns = {}
+        self._names = []
+        self._load()
+
+    def _load(self):
+        self._names, rows = _read(load_sql(self.table_name))
+        key = self._names.index("id")
+        self.ids = array("q", (row[key] for row in rows))
+        for i, name in enumerate(self._names):
+            if i != key:
+                self.columns[name] = ColumnValues([row[i] for row in rows], self.display.get(name))
+
+    def is_current(self):
+        """
+        Соответствует ли индекс базе. Изменения выдачи и обслуживания из
+        журнала вносятся здесь же; False — индекс нужно построить заново.
+        """
+        if self.references is None or reference_versions(self.table_name) != self.references:
+            return False
+        if self.table_name not in LOGGED_TABLES:
+            return True
+        found = changes_since(self.table_name, self.change_number)
+        if found is None:
+            return False
+        number, changes = found
+        if len(changes) > MAX_DELTA_ROWS or not self._apply(sorted(changes)):
+            return False
+        self.change_number = number
+        return True
+
+    def _apply(self, keys):
+        """Перечитывает строки с id из keys; False — их нельзя внести по месту."""
+        key = self._names.index("id")
+        fetched = {}
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            for row in _read(delta_sql(self.table_name, len(part)), part)[1]:
+                fetched[row[key]] = row
+
+        for record_id in keys:
+            row = fetched.get(record_id)
+            pos = bisect.bisect_left(self.ids, record_id)
+            if pos == len(self.ids) or self.ids[pos] != record_id:
+                if row is None:
+                    continue
+                if pos != len(self.ids):
+                    # новые id больше прежних; иначе порядок строк не сохранить
+                    return False
+                self.ids.append(record_id)
+            for i, name in enumerate(self._names):
+                if i != key:
+                    self.columns[name].set_row(pos, None if row is None else row[i])
+        return True
+
+    def values(self, field):
+        column = self.columns.get(field)
+        return column.values if column else []
+
+    def is_free_text(self, field):
+        column = self.columns.get(field)
+        return column is not None and column.free_text
+
+    def matching_rows(self, selected):
+        """
+        Битовая карта строк, где все поля из selected ({поле: значение})
+        совпадают; None — без условий. Значения, которых в колонке нет
+        (введённые вручную фрагменты), условием не считаются.
+        """
+        rows = None
+        for field, value in selected.items():
+            column = self.columns.get(field)
+            if column is None or value not in column:
+                continue
+            bitmap = column.bitmap(value)
+            rows = bitmap if rows is None else rows & bitmap
+        return rows
+
+    def values_where(self, field, selected):
+        """Значения поля среди строк, подходящих под selected."""
+        column = self.columns.get(field)
+        if column is None:
+            return []
+        return column.values_in(self.matching_rows(selected))
+
+
+def dependencies(table_name):
+    """Справочники, подписи из которых видны во вкладке (и сама вкладка, если это справочник)."""
+    if table_name in JOIN_SOURCES:
+        return [dep for dep, _ in JOIN_SOURCES[table_name]["depends"]]
+    if table_name == "СОТРУДНИК":
+        return ["СОТРУДНИК", "РАБОЧЕЕ_МЕСТО"]
+    return [table_name]
+
+
+def reference_versions(table_name):
+    """Счётчики изменений справочников вкладки; None — счётчиков нет."""
+    tables = dependencies(table_name)
+    if any(table not in REFERENCE_TABLES for table in tables):
+        return None
+    versions = tuple(table_version(table) for table in tables)
+    return None if None in versions else versions
+
+
+_indexes = {}
+
+
+def value_index(table_name, display=None):
+    """Индекс значений вкладки, обновлённый по журналу или построенный заново."""
+    index = _indexes.get(table_name)
+    if index is None or not index.is_current():
+        index = _indexes[table_name] = ValueIndex(table_name, display)
+    return index
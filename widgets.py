@@ -1,14 +1,26 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton,
-    QTableView, QLabel, QComboBox, QMessageBox, QDialog, QFormLayout, QDialogButtonBox, QStyledItemDelegate, QStyleOptionViewItem, QDateEdit, QHeaderView, QFrame
+    QTableView, QLabel, QComboBox, QMessageBox, QDialog, QFormLayout, QDialogButtonBox, QStyledItemDelegate, QStyleOptionViewItem, QDateEdit, QHeaderView, QFrame,
+    QInputDialog
 )
-from PyQt6.QtSql import QSqlTableModel, QSqlRelationalTableModel, QSqlRelation
-from PyQt6.QtSql import QSqlQuery
-from PyQt6.QtCore import Qt, QRegularExpression, QDate, QItemSelectionModel, QItemSelection
+from PyQt6.QtSql import QSqlRelationalTableModel, QSqlRelation
+from PyQt6.QtSql import QSqlDatabase
+from PyQt6.QtCore import Qt, QRegularExpression, QDate, QItemSelectionModel, QItemSelection, QTimer
 from PyQt6.QtGui import QRegularExpressionValidator, QBrush, QColor
 import re
+import time
 from PyQt6.QtCore import QSortFilterProxyModel
 from PyQt6.QtSql    import QSqlQueryModel
+from paged_model import PagedQueryModel, PagedSortProxy
+from filter_compiler import compile_filters, to_iso_date
+from search_index import match_query
+from search_worker import SearchWorker
+from column_sizing import setup_sizing
+from lookups import LookupModel, lookup_combo, lookup_index, lookup_model
+from queries import MAINTENANCE_SQL, ISSUANCE_SQL, WORKPLACE_LABELS
+from batch_edit import delete_rows, update_rows
+from value_index import value_index
+from query_builder import BoundRelationalTableModel, BoundTableModel, Conditions, execute, fetch_rows
 
 DEPARTMENTS = [
     "ИТ", "Бухгалтерия", "Отдел кадров"
@@ -21,6 +33,14 @@ POSITIONS_BY_DEPARTMENT = {
 EQUIP_TYPES = ["Компьютер", "Монитор", "Принтер", "Сканер", "Другое"]
 EQUIP_STATUS = ["В эксплуатации", "На складе", "Списано", "В ремонте"]
 WORKPLACE_STATUS = ["Активно", "Не используется", "В ремонте", "Зарезервировано"]
+# пауза после последнего нажатия, после которой запускается поиск
+SEARCH_DELAY_MS = 250
+# сколько строк прокси перебирает поиск без индекса за один шаг
+SCAN_CHUNK_ROWS = 2000
+# сколько существующих значений поля предлагает «Изменить выбранные»
+BULK_VALUE_HINTS = 200
+# сколько значений колонки показывает список в окне фильтров
+FILTER_LIST_LIMIT = 1000
 WORK_TYPES = [
     "Профилактика",
     "Ремонт",
@@ -29,13 +49,27 @@ WORK_TYPES = [
     "Настройка",
     "Другое"
 ]
-class CostModel(QSqlQueryModel):
+RETURN_STATES = [
+    "Исправно",
+    "Требует ремонта",
+    "Утеряно",
+    "Повреждено",
+    "Другое"
+]
+class CostModel(PagedQueryModel):
     """
-    QSqlQueryModel, который форматирует колонку "Стоимость" с двумя десятичными
+    PagedQueryModel, который форматирует колонку "Стоимость" с двумя десятичными
     и добавляет символ ₽. Сохраняет исходные данные в модели как числа.
+
+    Текст стоимости считается один раз на строку, когда читается её страница,
+    и хранится рядом с кэшем страниц: отрисовка, размеры колонок и поиск
+    вызывают data() много раз на ячейку. Изменённая строка (syncChanges)
+    пересчитывается одна, сдвиг строк или сброс модели убирает тексты вместе
+    со страницами.
     """
     def __init__(self, sql_query: str, parent=None):
-        super().__init__(parent)
+        super().__init__(parent=parent)
+        self._cost_pages = {}   # номер страницы -> тексты стоимости её строк
         self._sql = sql_query
         # при установке запроса сразу вычисляем индекс колонки «Стоимость»
         self.setQuery(self._sql)
@@ -54,22 +88,60 @@ class CostModel(QSqlQueryModel):
                 self.cost_col = col
                 break
 
+    def displayValue(self, column, raw):
+        if column != self.cost_col:
+            return raw
+        if raw is None or raw == "":
+            return ""
+        # пытаемся превратить в число
+        try:
+            amount = float(raw)
+        except Exception:
+            return raw
+        # форматируем: разделяем тысячи пробелами, 2 знака после точки
+        formatted = f"{amount:,.2f}".replace(",", " ")
+        return f"{formatted} ₽"
+
+    def _cost_texts(self, page):
+        """Тексты колонки «Стоимость» для строк страницы page."""
+        texts = self._cost_pages.get(page)
+        if texts is None:
+            texts = self._cost_pages[page] = [self.displayValue(self.cost_col, values[self.cost_col])
+                                              for values in self._fetch_page(page)]
+            # тексты страниц, вытесненных из кэша строк, больше не нужны
+            if len(self._cost_pages) > self.max_pages:
+                for p in [p for p in self._cost_pages if p not in self._pages]:
+                    del self._cost_pages[p]
+        return texts
+
+    def _clear_window(self):
+        super()._clear_window()
+        self._cost_pages.clear()
+
+    def _forget_from(self, page):
+        super()._forget_from(page)
+        for p in [p for p in self._cost_pages if p >= page]:
+            del self._cost_pages[p]
+
+    def _replace_row(self, row, values):
+        # строка изменилась на месте — пересчитываем только её текст
+        texts = self._cost_pages.get(row // self.page_size)
+        if texts is not None:
+            texts[row % self.page_size] = self.displayValue(self.cost_col, values[self.cost_col])
+        super()._replace_row(row, values)
+
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
-        # если это вывод в ячейку и наша колонка «Стоимость» — форматируем
-        if role == Qt.ItemDataRole.DisplayRole and index.column() == self.cost_col:
-            raw = super().data(index, role)
-            if raw is None or raw == "":
-                return ""
-            # пытаемся превратить в число
-            try:
-                amount = float(raw)
-            except Exception:
-                return raw
-            # форматируем: разделяем тысячи пробелами, 2 знака после точки
-            formatted = f"{amount:,.2f}".replace(",", " ")
-            return f"{formatted} ₽"
+        # если это вывод в ячейку и наша колонка «Стоимость» — берём готовый текст
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid() and index.column() == self.cost_col:
+            texts = self._cost_texts(index.row() // self.page_size)
+            offset = index.row() % self.page_size
+            return texts[offset] if offset < len(texts) else None
         # всё остальное возвращаем без изменений
         return super().data(index, role)
+
+    def sortKind(self, column):
+        # сортируем по числу, а не по строке "1 234.00 ₽"
+        return "number" if column == self.cost_col else super().sortKind(column)
     
 def beautify_header(header):
     header = header.replace('_', ' ').strip()
@@ -95,11 +167,13 @@ class MaintenanceFilterProxy(QSortFilterProxyModel):
         for value, col in self.filters:
             idx = model.index(src_row, col, src_parent)
             cell = str(idx.data() or "")
-            # диапазон дат — кортеж (dd.MM.yyyy, dd.MM.yyyy)
+            # диапазон дат — кортеж (dd.MM.yyyy, dd.MM.yyyy); сравниваем в
+            # виде yyyy-MM-dd, иначе строки сравниваются сначала по дню
             if isinstance(value, tuple):
-                fr, to = value
+                fr, to = (to_iso_date(v) for v in value)
                 if fr and to:
-                    if not (fr <= cell <= to):
+                    day = to_iso_date(cell)
+                    if not day or not (fr <= day <= to):
                         return False
             else:
                 if value and value.lower() not in cell.lower():
@@ -131,47 +205,73 @@ class HighlightDelegate(QStyledItemDelegate):
         else:
             super().paint(painter, option, index)
 
-class CombinedDelegate(QStyledItemDelegate):
-    def __init__(self, search_text, base_delegate, parent=None):
+class MatchSetDelegate(QStyledItemDelegate):
+    """
+    Основа делегатов подсветки найденных строк. Набор совпадений — номера
+    строк исходной модели (под всеми прокси) — строится один раз на поиск
+    и передаётся через set_matches(), так что paint() только проверяет
+    принадлежность строки набору. paint_calls / paint_seconds считают
+    вызовы и время отрисовки, reset_paint_stats() их обнуляет.
+    """
+    HIGHLIGHT_COLOR = "#ffe066"  # Ярко-жёлтый
+
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.search_text = search_text.lower()
-        self.base_delegate = base_delegate
+        self.matches = set()
+        self.paint_calls = 0
+        self.paint_seconds = 0.0
+
+    def set_matches(self, matches):
+        self.matches = matches
+
+    def reset_paint_stats(self):
+        self.paint_calls = 0
+        self.paint_seconds = 0.0
+
+    def is_match(self, index):
+        if not self.matches:
+            return False
+        while isinstance(index.model(), QSortFilterProxyModel):
+            index = index.model().mapToSource(index)
+        return index.row() in self.matches
 
     def paint(self, painter, option, index):
-        text = str(index.data()) if index.data() is not None else ""
-        if self.search_text and self.search_text in text.lower():
-            option_new = QStyleOptionViewItem(option)  # обязательно копия!
-            option_new.backgroundBrush = QBrush(QColor("#3a7bd5"))
-            self.base_delegate.paint(painter, option_new, index)
-        else:
-            self.base_delegate.paint(painter, option, index)
+        started = time.perf_counter()
+        if self.is_match(index):
+            # backgroundBrush игнорируется, когда у вида есть стиль для
+            # ::item, поэтому фон заливаем сами
+            painter.fillRect(option.rect, QColor(self.HIGHLIGHT_COLOR))
+        self.paint_cell(painter, option, index)
+        self.paint_calls += 1
+        self.paint_seconds += time.perf_counter() - started
+
+    def paint_cell(self, painter, option, index):
+        super().paint(painter, option, index)
+
+class CombinedDelegate(MatchSetDelegate):
+    """Подсветка найденных строк поверх другого делегата (например, PhoneDelegate)."""
+    def __init__(self, base_delegate, parent=None):
+        super().__init__(parent)
+        self.base_delegate = base_delegate
+
+    def paint_cell(self, painter, option, index):
+        self.base_delegate.paint(painter, option, index)
 
     def displayText(self, value, locale):
         return self.base_delegate.displayText(value, locale)
 
-class RowHighlightDelegate(QStyledItemDelegate):
-    def __init__(self, search_text="", parent=None):
-        super().__init__(parent)
-        self.search_text = search_text.lower()
+class RowHighlightDelegate(MatchSetDelegate):
+    """Подсветка всей строки, если она есть в наборе совпадений."""
 
-    def paint(self, painter, option, index):
-        if self.search_text:
-            model = index.model()
-            row = index.row()
-            found = False
-            for col in range(model.columnCount()):
-                # Используем sibling для корректной работы с прокси-моделями
-                cell = index.sibling(row, col).data()
-                cell_str = str(cell) if cell is not None else ""
-                if self.search_text in cell_str.lower():
-                    found = True
-                    break
-            if found:
-                option_new = QStyleOptionViewItem(option)
-                option_new.backgroundBrush = QBrush(QColor("#ffe066"))  # Ярко-жёлтый
-                super().paint(painter, option_new, index)
-                return
-        super().paint(painter, option, index)
+
+class ReadOnlyCellDelegate(RowHighlightDelegate):
+    """
+    Подсветка строк без правки в самой таблице: ячейка показывает подпись
+    (например, рабочего места), а записать нужно id — это делает диалог
+    «Редактировать».
+    """
+    def createEditor(self, parent, option, index):
+        return None
 
 
 
@@ -181,6 +281,13 @@ class TableWidget(QWidget):
         self.table_name = table_name
         self.editable_table = table_name
         self._sql = ""
+        self.filter_proxy = None
+        self._search_generation = 0
+        self._search_worker = None
+        self._search_map = None
+        self._scan = None
+        # строки исходной модели, найденные поиском (для делегатов подсветки)
+        self.search_matches = set()
         self.init_ui()
 
     def init_ui(self):
@@ -216,20 +323,31 @@ class TableWidget(QWidget):
         control_layout.setContentsMargins(0, 0, 0, 0)
         self.add_btn = QPushButton("Добавить")
         self.edit_btn = QPushButton("Редактировать")
+        self.bulk_btn = QPushButton("Изменить выбранные")
         self.del_btn = QPushButton("Удалить")
         self.report_btn = QPushButton("Отчет")
-        for btn in [self.add_btn, self.edit_btn, self.del_btn, self.report_btn]:
+        for btn in [self.add_btn, self.edit_btn, self.bulk_btn, self.del_btn, self.report_btn]:
             btn.setMinimumWidth(150)
             btn.setMinimumHeight(40)
         control_layout.addWidget(self.add_btn)
         control_layout.addWidget(self.edit_btn)
+        control_layout.addWidget(self.bulk_btn)
         control_layout.addWidget(self.del_btn)
         control_layout.addWidget(self.report_btn)
         main_layout.addWidget(control_panel)
 
-        self.search_field.textChanged.connect(self.apply_filter)
+        # Поиск запускается, когда пользователь перестал печатать
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.apply_filter)
+        self.search_field.textChanged.connect(lambda _: self.search_timer.start())
+        # перебор без индекса идёт порциями между событиями GUI
+        self.scan_timer = QTimer(self)
+        self.scan_timer.timeout.connect(self.scan_step)
         self.add_btn.clicked.connect(self.add_row)
         self.edit_btn.clicked.connect(self.edit_row)
+        self.bulk_btn.clicked.connect(self.bulk_edit)
         self.del_btn.clicked.connect(self.delete_row)
         self.report_btn.clicked.connect(self.generate_report)
 
@@ -275,48 +393,52 @@ class TableWidget(QWidget):
     def setup_table(self):
         # --- Используем QSqlRelationalTableModel для ВЫДАЧА_ТЕХНИКИ ---
         if self.table_name == "ОБСЛУЖИВАНИЕ":
-            self._sql = """
-                SELECT
-                m.id AS id,
-                o.название||' ('||o.производитель||', SN:'||o.серийный_номер||')' AS Оборудование,
-                m.дата        AS Дата,
-                m.тип_работы  AS "Тип работы",
-                m.описание    AS Описание,
-                s.фамилия||' '||s.имя||COALESCE(' '||s.отчество,'') AS Техник,
-                m.стоимость   AS Стоимость
-                FROM ОБСЛУЖИВАНИЕ m
-                JOIN ОБОРУДОВАНИЕ o ON m.оборудование_id = o.id
-                LEFT JOIN СОТРУДНИК s ON m.техник_id = s.id
-            """
+            self._sql = MAINTENANCE_SQL
             self.model = CostModel(self._sql, self)
-            self.proxy = MaintenanceFilterProxy(self)
+            self.proxy = PagedSortProxy(self)
             self.proxy.setSourceModel(self.model)
         elif self.table_name == "ВЫДАЧА_ТЕХНИКИ":
-            self._sql = """
-                SELECT
-                w.id AS id,
-                o.название||' ('||o.производитель||', SN:'||o.серийный_номер||')' AS Оборудование,
-                s.фамилия||' '||s.имя||COALESCE(' '||s.отчество,'') AS Сотрудник,
-                wp.корпус||' | этаж '||wp.этаж||' | каб. '||wp.кабинет||' | стол '||wp.стол AS Рабочее_место,
-                w.дата_выдачи        AS Дата_выдачи,
-                w.состояние_при_возврате AS Состояние_возврата
-                FROM ВЫДАЧА_ТЕХНИКИ w
-                JOIN ОБОРУДОВАНИЕ  o  ON w.оборудование_id   = o.id
-                JOIN СОТРУДНИК     s  ON w.сотрудник_id      = s.id
-                JOIN РАБОЧЕЕ_МЕСТО wp ON w.рабочее_место_id = wp.id
-            """
-            self.model = QSqlQueryModel(self)
-            self.model.setQuery(self._sql)
-            self.proxy = IssuanceFilterProxy(self)
+            self._sql = ISSUANCE_SQL
+            self.model = PagedQueryModel(self._sql, self)
+            self.proxy = PagedSortProxy(self)
+            self.proxy.setSourceModel(self.model)
+        elif self.table_name == "СОТРУДНИК":
+            # рабочее место подставляет SQLite (LEFT JOIN с представлением
+            # подписей), в таблицу по-прежнему пишется id
+            self.model = BoundRelationalTableModel(self)
+            self.model.setTable(self.table_name)
+            self.model.setJoinMode(QSqlRelationalTableModel.JoinMode.LeftJoin)
+            self.model.setRelation(self.model.fieldIndex("рабочее_место_id"),
+                                   QSqlRelation(WORKPLACE_LABELS, "место_id", "рабочее_место"))
+            self.model.setSort(self.model.fieldIndex("id"), Qt.SortOrder.DescendingOrder)
+            self.model.select()
+            self.proxy = PagedSortProxy(self)
             self.proxy.setSourceModel(self.model)
         else:
-            self.model = QSqlTableModel(self)
+            self.model = BoundTableModel(self)
             self.model.setTable(self.table_name)
+            # порядок вида по умолчанию (id по убыванию) — сразу в запросе
+            self.model.setSort(self.model.fieldIndex("id"), Qt.SortOrder.DescendingOrder)
             self.model.select()
-            self.proxy = QSortFilterProxyModel(self)
+            self.proxy = PagedSortProxy(self)
             self.proxy.setSourceModel(self.model)
 
+        if isinstance(self.model, PagedQueryModel):
+            # после add/edit/delete модель перечитывает только изменённые строки
+            self.model.trackChanges(self.editable_table)
+            # сортировка по колонкам — по индексам таблицы ключей (sort_keys.py)
+            self.model.setSortKeys(self.editable_table)
+            # Вид по умолчанию сортирует по id по убыванию; выставляем этот
+            # порядок в самой модели до подключения вида, чтобы не
+            # перестраивать прокси по всем строкам дважды
+            self.model.sort(self.model.record().indexOf("id"), Qt.SortOrder.DescendingOrder)
+
         self.proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        # после сброса модели номера строк идущего поиска уже неверны
+        self.proxy.modelReset.connect(self.on_model_reset)
+        self.proxy.rowsInserted.connect(self.on_model_reset)
+        self.proxy.rowsRemoved.connect(self.on_model_reset)
+        self.proxy.layoutChanged.connect(self.cancel_search)
         self.table_view.setModel(self.proxy)
         self.table_view.setSortingEnabled(True)
 
@@ -330,22 +452,30 @@ class TableWidget(QWidget):
         if self.id_column is not None:
             self.table_view.hideColumn(self.id_column)
 
+        # Подсветка найденных строк
+        self.row_delegate = RowHighlightDelegate(self)
+        self.row_delegate.set_matches(self.search_matches)
+        self.table_view.setItemDelegate(self.row_delegate)
+
         # Красивые заголовки
         for col in range(self.model.columnCount()):
             hdr = self.model.headerData(col, Qt.Orientation.Horizontal)
             self.model.setHeaderData(col, Qt.Orientation.Horizontal, beautify_header(str(hdr)))
 
-        # Авто-подгонка размеров
-        self.table_view.resizeColumnsToContents()
         self.table_view.horizontalHeader().setStretchLastSection(True)
-        self.table_view.resizeRowsToContents()
 
         # Особый делегат для телефона
         if self.table_name == "СОТРУДНИК":
             for col in range(self.model.columnCount()):
                 hdr = str(self.model.headerData(col, Qt.Orientation.Horizontal)).lower()
                 if "номер телефона" in hdr:
-                    self.table_view.setItemDelegateForColumn(col, PhoneDelegate(self))
+                    delegate = CombinedDelegate(PhoneDelegate(self), self)
+                    delegate.set_matches(self.search_matches)
+                    self.table_view.setItemDelegateForColumn(col, delegate)
+                elif hdr == "рабочее место":
+                    delegate = ReadOnlyCellDelegate(self)
+                    delegate.set_matches(self.search_matches)
+                    self.table_view.setItemDelegateForColumn(col, delegate)
 
         self.table_view.setStyleSheet("""
             QTableView::item:selected {
@@ -354,17 +484,14 @@ class TableWidget(QWidget):
             }
         """)
 
-        # Настройка ширины столбцов
-        header = self.table_view.horizontalHeader()
-        for col in range(self.model.columnCount()):
-            header_name = self.model.headerData(col, Qt.Orientation.Horizontal)
-            if header_name in ("Оборудование", "Сотрудник", "Рабочее место"):
-                header.setSectionResizeMode(col, QHeaderView.ResizeMode.ResizeToContents)
-            else:
-                header.setSectionResizeMode(col, QHeaderView.ResizeMode.Stretch)
+        # Ширина столбцов по выборке строк (запоминается), строки одной высоты
+        setup_sizing(self.table_view, self.table_name)
 
 
     def apply_filter(self):
+        self.cancel_search()
+        self.search_matches.clear()
+        self.table_view.viewport().update()
         text = self.search_field.text().strip()
         selection_model = self.table_view.selectionModel()
         selection_model.clearSelection()
@@ -373,49 +500,116 @@ class TableWidget(QWidget):
             return
 
         # Проверяем формат "Заголовок значение"
+        target_col = None
+        value = text.lower()
         if " " in text:
             header_part, value_part = text.split(" ", 1)
             header_part = header_part.strip().lower()
-            value_part = value_part.strip().lower()
             # Найдём столбец по заголовку
-            target_col = None
             for col in range(self.proxy.columnCount()):
                 header = str(self.proxy.headerData(col, Qt.Orientation.Horizontal)).lower()
                 if header_part in header:
                     target_col = col
                     break
             if target_col is not None:
-                matches = []
-                for row in range(self.proxy.rowCount()):
-                    idx = self.proxy.index(row, target_col)
-                    cell = idx.data()
-                    cell_str = str(cell) if cell is not None else ""
-                    if value_part in cell_str.lower():
-                        matches.append(row)
-                for row in matches:
-                    selection_model.select(
-                        self.proxy.index(row, 0),
-                        QItemSelectionModel.SelectionFlag.Select | QItemSelectionModel.SelectionFlag.Rows
-                    )
-                return  # Не ищем по всем столбцам, если найден шаблон
-
-        # Обычный поиск по всем столбцам
+                value = value_part.strip().lower()  # Не ищем по всем столбцам, если найден шаблон
+
+        if not self.start_search(value, target_col):
+            self.start_scan(value, target_col)
+
+    def cancel_search(self):
+        """Останавливает идущий поиск; его пачки результатов будут отброшены."""
+        self._search_generation += 1
+        if self._search_worker is not None:
+            self._search_worker.cancel()
+            self._search_worker = None
+        self.scan_timer.stop()
+        self._scan = None
+
+    def on_model_reset(self):
+        # номера строк модели поменялись — прежние совпадения недействительны
+        self.cancel_search()
+        self.search_matches.clear()
+
+    def start_search(self, value, target_col=None):
+        """
+        Запускает поиск через индекс FTS5 (search_index.py) в SearchWorker.
+        False — индекса для вкладки нет, нужен поиск перебором.
+        """
+        field = self.model.record().fieldName(target_col) if target_col is not None else None
+        query = match_query(self.table_name, value, field)
+        if query is None or self.id_column is None:
+            return False
+        keys_sql, params = query
+
+        if isinstance(self.model, PagedQueryModel):
+            # номера строк модели считает SQLite
+            sql, params = self.model.rowsForKeysQuery(keys_sql, params)
+            self._search_map = None
+        else:
+            # id -> строка модели, один раз на поиск
+            sql = keys_sql
+            self._search_map = {
+                self.model.index(r, self.id_column).data(): r
+                for r in range(self.model.rowCount())
+            }
+
+        worker = SearchWorker(self._search_generation, sql, params, self)
+        worker.chunk_found.connect(self.on_search_chunk)
+        worker.finished.connect(worker.deleteLater)
+        self._search_worker = worker
+        worker.start()
+        return True
+
+    def on_search_chunk(self, generation, values):
+        """Пачка результатов SearchWorker: подсвечиваем найденные строки сразу."""
+        if generation != self._search_generation:
+            return
+        if self._search_map is not None:
+            source_rows = [self._search_map[v] for v in values if v in self._search_map]
+        else:
+            source_rows = values
+        self.highlight_rows(source_rows)
+
+    def start_scan(self, value, target_col=None):
+        """Поиск перебором ячеек прокси — запасной путь без индекса."""
+        columns = [target_col] if target_col is not None else list(range(self.proxy.columnCount()))
+        self._scan = (value, columns, 0)
+        self.scan_timer.start(0)
+
+    def scan_step(self):
+        if self._scan is None:
+            self.scan_timer.stop()
+            return
+        value, columns, start = self._scan
+        stop = min(start + SCAN_CHUNK_ROWS, self.proxy.rowCount())
+        rows = self.scan_rows(value, columns, start, stop)
+        self.highlight_rows(self.map_to_model(self.proxy.index(r, 0)).row() for r in rows)
+        if stop >= self.proxy.rowCount():
+            self.scan_timer.stop()
+            self._scan = None
+        else:
+            self._scan = (value, columns, stop)
+
+    def scan_rows(self, value, columns, start, stop):
         matches = []
-        text = text.lower()
-        for row in range(self.proxy.rowCount()):
-            for col in range(self.proxy.columnCount()):
-                idx = self.proxy.index(row, col)
-                cell = idx.data()
+        for row in range(start, stop):
+            for col in columns:
+                cell = self.proxy.index(row, col).data()
                 cell_str = str(cell) if cell is not None else ""
-                if text in cell_str.lower():
+                if value in cell_str.lower():
                     matches.append(row)
                     break
+        return matches
 
-        for row in matches:
-            selection_model.select(
-                self.proxy.index(row, 0),
-                QItemSelectionModel.SelectionFlag.Select | QItemSelectionModel.SelectionFlag.Rows
-            )
+    def highlight_rows(self, source_rows):
+        """
+        Добавляет строки исходной модели к набору найденных. Подсвечивают их
+        делегаты (RowHighlightDelegate, CombinedDelegate), а не выделение:
+        проверка выделения в Qt линейна по числу диапазонов на каждую ячейку.
+        """
+        self.search_matches.update(source_rows)
+        self.table_view.viewport().update()
 
     def add_row(self):
         # 1) Ветка для ВЫДАЧА_ТЕХНИКИ (QSqlQueryModel)
@@ -426,19 +620,16 @@ class TableWidget(QWidget):
                 return
             vals = dialog.get_data(self.table_name)
 
-            q = QSqlQuery()
-            q.prepare("""
+            error = execute("""
                 INSERT INTO ВЫДАЧА_ТЕХНИКИ
                   (оборудование_id, сотрудник_id, рабочее_место_id, дата_выдачи, состояние_при_возврате)
                 VALUES (?, ?, ?, ?, ?)
-            """)
-            for i, v in enumerate(vals):
-                q.bindValue(i, v)
-            if not q.exec():
-                QMessageBox.critical(self, "Ошибка добавления", q.lastError().text())
+            """, vals)
+            if error.isValid():
+                QMessageBox.critical(self, "Ошибка добавления", error.text())
             else:
-                # пересоздаём результат запроса
-                self.model.setQuery(self._sql)
+                # в модель добавляется только новая строка (журнал изменений)
+                self.model.syncChanges()
             return
 
         # 2) Ветка для ОБСЛУЖИВАНИЕ (CostModel → QSqlQueryModel)
@@ -449,19 +640,16 @@ class TableWidget(QWidget):
                 return
             vals = dialog.get_data(self.table_name)
 
-            q = QSqlQuery()
-            q.prepare("""
+            error = execute("""
                 INSERT INTO ОБСЛУЖИВАНИЕ
                   (оборудование_id, дата, тип_работы, описание, техник_id, стоимость)
                 VALUES (?, ?, ?, ?, ?, ?)
-            """)
-            for i, v in enumerate(vals):
-                q.bindValue(i, v)
-            if not q.exec():
-                QMessageBox.critical(self, "Ошибка добавления", q.lastError().text())
+            """, vals)
+            if error.isValid():
+                QMessageBox.critical(self, "Ошибка добавления", error.text())
             else:
-                # заново прогоняем SQL и CostModel найдёт колонку «Стоимость»
-                self.model.setQuery(self._sql)
+                # в модель добавляется только новая строка (журнал изменений)
+                self.model.syncChanges()
             return
 
         # 3) Всё остальное — QSqlTableModel
@@ -479,130 +667,105 @@ class TableWidget(QWidget):
             return
 
         values = dialog.get_data(self.table_name)
-        edit_model = QSqlTableModel(self)
-        edit_model.setTable(self.editable_table)
-        edit_model.select()
-        row = edit_model.rowCount()
-        edit_model.insertRow(row)
+        # строка вставляется в открытую модель: insertRecord() выполняет
+        # подготовленный INSERT и перечитывает только эту строку по id
+        # (стратегия OnRowChange), таблица целиком не перечитывается.
+        # У СОТРУДНИК в колонку рабочего места пишется id — подпись
+        # подставит JOIN модели.
+        record = self.model.record()
+        if self.id_column is not None:
+            record.setGenerated(self.id_column, False)
         for i, col in enumerate(columns):
-            edit_model.setData(edit_model.index(row, col), values[i])
-        edit_model.submitAll()
-
-        # обновляем представление
-        self.model.select()
-
-        # если это СОТРУДНИК — заполним человеко-читаемое рабочее место
-        if self.table_name == "СОТРУДНИК":
-            query = QSqlQuery("SELECT id, корпус, этаж, кабинет, стол FROM РАБОЧЕЕ_МЕСТО")
-            wp = {}
-            while query.next():
-                wid = query.value(0)
-                label = f"{query.value(1)} | этаж {query.value(2)} | каб. {query.value(3)} | стол {query.value(4)}"
-                wp[wid] = label
-            for r in range(self.model.rowCount()):
-                idx = self.model.index(r, self.model.fieldIndex("рабочее_место_id"))
-                wid = self.model.data(idx)
-                if wid in wp:
-                    self.model.setData(idx, wp[wid])
-        elif self.table_name == "ОБСЛУЖИВАНИЕ":
-            headers = ["Оборудование", "Дата", "Тип работы", "Описание", "Техник", "Стоимость"]
-            dialog = AddRowDialog(headers, self.editable_table, self)
-            if not dialog.exec():
-                return
-
-            vals = dialog.get_data(self.table_name)
-            q = QSqlQuery()
-            q.prepare("""
-                INSERT INTO ОБСЛУЖИВАНИЕ
-                (оборудование_id, дата, тип_работы, описание, техник_id, стоимость)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """)
-            for i, v in enumerate(vals):
-                q.bindValue(i, v)
-            if not q.exec():
-                QMessageBox.critical(self, "Ошибка добавления", q.lastError().text())
-            else:
-                self.model.setQuery(self._sql)
+            record.setValue(col, values[i])
+        # новая строка встаёт туда, где её покажет ORDER BY: при сортировке
+        # по id по убыванию (порядок вкладки по умолчанию) — первой
+        column, order = self.model.sortOrder()
+        by_id = column == self.id_column and self.id_column is not None
+        if by_id and order == Qt.SortOrder.DescendingOrder:
+            row = 0
+        elif by_id and not self.model.canFetchMore():
+            row = self.model.rowCount()
+        else:
+            row = None
+        if not self.model.insertRecord(0 if row is None else row, record):
+            QMessageBox.critical(self, "Ошибка добавления", self.model.lastError().text())
+            return
+        if row is None:
+            # место строки в другом порядке знает только SQLite
+            self.model.select()
             return
 
+        view_index = self.map_from_model(self.model.index(row, 0))
+        if view_index.isValid():
+            self.table_view.selectRow(view_index.row())
+            self.table_view.scrollTo(view_index)
+
     def edit_row(self):
         proxy_index = self.table_view.currentIndex()
         if not proxy_index.isValid():
             QMessageBox.warning(self, "Редактирование", "Выберите строку для редактирования.")
             return
 
-        source_index = self.proxy.mapToSource(proxy_index)
+        source_index = self.map_to_model(proxy_index)
         row = source_index.row()
 
         # --- ВЫДАЧА_ТЕХНИКИ ---
         if self.table_name == "ВЫДАЧА_ТЕХНИКИ":
             rec = self.model.record(row)
             rec_id = rec.value("id")
-            q0 = QSqlQuery()
-            q0.prepare("""
+            found = fetch_rows("""
                 SELECT оборудование_id, сотрудник_id, рабочее_место_id,
                     дата_выдачи, состояние_при_возврате
                 FROM ВЫДАЧА_ТЕХНИКИ WHERE id = ?
-            """)
-            q0.bindValue(0, rec_id)
-            if not q0.exec() or not q0.next():
+            """, [rec_id])
+            if not found:
                 QMessageBox.critical(self, "Ошибка", "Не удалось загрузить данные.")
                 return
-            orig = [q0.value(i) for i in range(5)]
+            orig = list(found[0])
             headers = ["Оборудование", "Сотрудник", "Рабочее место", "Дата выдачи", "Состояние возврата"]
             dialog = EditRowDialog(headers, orig, self.editable_table, self)
             if not dialog.exec():
                 return
             new_vals = dialog.get_data(self.table_name)
-            q = QSqlQuery()
-            q.prepare("""
+            error = execute("""
                 UPDATE ВЫДАЧА_ТЕХНИКИ
                 SET оборудование_id = ?, сотрудник_id = ?, рабочее_место_id = ?,
                     дата_выдачи = ?, состояние_при_возврате = ?
                 WHERE id = ?
-            """)
-            for i, v in enumerate(new_vals):
-                q.bindValue(i, v)
-            q.bindValue(len(new_vals), rec_id)
-            if not q.exec():
-                QMessageBox.critical(self, "Ошибка редактирования", q.lastError().text())
+            """, list(new_vals) + [rec_id])
+            if error.isValid():
+                QMessageBox.critical(self, "Ошибка редактирования", error.text())
             else:
-                self.model.setQuery(self._sql)
+                self.model.syncChanges()
             return
 
         # --- ОБСЛУЖИВАНИЕ ---
         if self.table_name == "ОБСЛУЖИВАНИЕ":
             rec = self.model.record(row)
             rec_id = rec.value("id")
-            q0 = QSqlQuery()
-            q0.prepare("""
+            found = fetch_rows("""
                 SELECT оборудование_id, дата, тип_работы, описание, техник_id, стоимость
                 FROM ОБСЛУЖИВАНИЕ WHERE id = ?
-            """)
-            q0.bindValue(0, rec_id)
-            if not q0.exec() or not q0.next():
+            """, [rec_id])
+            if not found:
                 QMessageBox.critical(self, "Ошибка", "Не удалось загрузить данные.")
                 return
-            orig = [q0.value(i) for i in range(6)]
+            orig = list(found[0])
             headers = ["Оборудование", "Дата", "Тип работы", "Описание", "Техник", "Стоимость"]
             dialog = EditRowDialog(headers, orig, self.editable_table, self)
             if not dialog.exec():
                 return
             new_vals = dialog.get_data(self.table_name)
-            q = QSqlQuery()
-            q.prepare("""
+            error = execute("""
                 UPDATE ОБСЛУЖИВАНИЕ
                 SET оборудование_id = ?, дата = ?, тип_работы = ?,
                     описание = ?, техник_id = ?, стоимость = ?
                 WHERE id = ?
-            """)
-            for i, v in enumerate(new_vals):
-                q.bindValue(i, v)
-            q.bindValue(len(new_vals), rec_id)
-            if not q.exec():
-                QMessageBox.critical(self, "Ошибка редактирования", q.lastError().text())
+            """, list(new_vals) + [rec_id])
+            if error.isValid():
+                QMessageBox.critical(self, "Ошибка редактирования", error.text())
             else:
-                self.model.setQuery(self._sql)
+                self.model.syncChanges()
             return
 
         # --- Все остальные таблицы ---
@@ -621,72 +784,110 @@ class TableWidget(QWidget):
             new_values = dialog.get_data(self.table_name)
             for i, col in enumerate(columns):
                 self.model.setData(self.model.index(row, col), new_values[i])
-            self.model.submitAll()
-            self.model.select()
+            # при OnRowChange submitAll() сам перечитывает изменённую строку
+            # (selectRow) — остальные строки и прокрутка вида не трогаются
+            if not self.model.submitAll():
+                QMessageBox.critical(self, "Ошибка редактирования", self.model.lastError().text())
+                self.model.revertAll()
 
-            if self.table_name == "СОТРУДНИК":
-                query = QSqlQuery("SELECT id, корпус, этаж, кабинет, стол FROM РАБОЧЕЕ_МЕСТО")
-                workplace_map = {}
-                while query.next():
-                    wid = query.value(0)
-                    label = f"{query.value(1)} | этаж {query.value(2)} | каб. {query.value(3)} | стол {query.value(4)}"
-                    workplace_map[wid] = label
-                for r in range(self.model.rowCount()):
-                    idx2 = self.model.index(r, self.model.fieldIndex("рабочее_место_id"))
-                    wid = self.model.data(idx2)
-                    if wid in workplace_map:
-                        self.model.setData(idx2, workplace_map[wid])
+    def selected_ids(self):
+        """
+        id выделенных строк (в порядке вида); без выделения — id текущей
+        строки. Выделение читается диапазонами, а не по ячейкам.
+        """
+        rows = []
+        for rng in self.table_view.selectionModel().selection():
+            rows.extend(range(rng.top(), rng.bottom() + 1))
+        if not rows and self.table_view.currentIndex().isValid():
+            rows = [self.table_view.currentIndex().row()]
+        ids = []
+        seen = set()
+        for row in rows:
+            if row in seen:
+                continue
+            seen.add(row)
+            source_index = self.map_to_model(self.proxy.index(row, 0))
+            record_id = self.model.index(source_index.row(), self.id_column).data()
+            if record_id is not None:
+                ids.append(record_id)
+        return ids
+
+    def refresh_after_batch(self):
+        """Одно обновление модели после пачки изменений."""
+        if isinstance(self.model, PagedQueryModel):
+            self.model.syncChanges()
+        else:
+            self.model.select()
 
     def delete_row(self):
-        from PyQt6.QtSql import QSqlQuery
+        ids = self.selected_ids() if self.id_column is not None else []
+        if not ids:
+            QMessageBox.warning(self, "Удаление", "Выберите строки для удаления.")
+            return
 
-        idx = self.table_view.currentIndex()
-        proxy_index = self.table_view.currentIndex()
-        if not proxy_index.isValid():
-            QMessageBox.warning(self, "Редактирование", "Выберите строку для редактирования.")
+        question = "Удалить выбранную запись?" if len(ids) == 1 else f"Удалить выбранные записи ({len(ids)})?"
+        ans = QMessageBox.question(
+            self, "Удаление", question,
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if ans != QMessageBox.StandardButton.Yes:
             return
 
-        source_index = self.proxy.mapToSource(proxy_index)
-        row = source_index.row()
+        result = delete_rows(self.editable_table, ids)
+        if result.error:
+            QMessageBox.critical(self, "Ошибка удаления", result.error)
+            return result
+        self.refresh_after_batch()
+        if len(ids) > 1:
+            QMessageBox.information(self, "Удаление", result.summary("Удалено записей"))
+        return result
 
-        if self.table_name == "ВЫДАЧА_ТЕХНИКИ":
-            rec = self.model.record(source_index.row())
-            rec_id = rec.value("id")
-            ans = QMessageBox.question(
-                self, "Удаление", "Удалить выбранную запись?",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-            if ans == QMessageBox.StandardButton.Yes:
-                q = QSqlQuery()
-                if not q.exec(f"DELETE FROM ВЫДАЧА_ТЕХНИКИ WHERE id = {rec_id}"):
-                    QMessageBox.critical(self, "Ошибка удаления", q.lastError().text())
-                else:
-                    self.model.setQuery(self._sql)
-            return
+    def bulk_fields(self):
+        """{заголовок: поле} полей таблицы, которые можно менять пачкой (кроме id и ссылок)."""
+        record = QSqlDatabase.database().record(self.editable_table)
+        fields = {}
+        for i in range(record.count()):
+            name = record.fieldName(i)
+            if name == "id" or name.endswith("_id"):
+                continue
+            fields[beautify_header(name)] = name
+        return fields
 
-        if self.table_name == "ОБСЛУЖИВАНИЕ":
-            rec = self.model.record(source_index.row())
-            rec_id = rec.value("id")
-            ans = QMessageBox.question(
-                self, "Удаление", "Удалить выбранную запись?",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-            if ans == QMessageBox.StandardButton.Yes:
-                q = QSqlQuery()
-                if not q.exec(f"DELETE FROM ОБСЛУЖИВАНИЕ WHERE id = {rec_id}"):
-                    QMessageBox.critical(self, "Ошибка удаления", q.lastError().text())
-                else:
-                    self.model.setQuery(self._sql)
+    def bulk_edit(self):
+        ids = self.selected_ids() if self.id_column is not None else []
+        if not ids:
+            QMessageBox.warning(self, "Изменение", "Выберите строки для изменения.")
+            return
+        fields = self.bulk_fields()
+        header, ok = QInputDialog.getItem(self, "Изменение выбранных",
+                                          f"Поле (записей: {len(ids)}):", list(fields), 0, False)
+        if not ok:
+            return
+        field = fields[header]
+
+        # существующие значения поля — как подсказки, можно ввести и своё
+        rows = fetch_rows(f"SELECT DISTINCT [{field}] FROM [{self.editable_table}] ORDER BY 1 LIMIT ?",
+                          [BULK_VALUE_HINTS])
+        values = [str(value) for value, in rows if value not in (None, "")]
+        value, ok = QInputDialog.getItem(self, "Изменение выбранных", f"{header}:", values, 0, True)
+        if not ok:
+            return
+        if "дата" in field.lower() and not QDate.fromString(value, "dd.MM.yyyy").isValid():
+            QMessageBox.warning(self, "Изменение", "Дата должна быть в формате ДД.ММ.ГГГГ.")
             return
-        
-        ans = QMessageBox.question(
-            self, "Удаление", "Удалить выбранную запись?",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-        )
-        if ans == QMessageBox.StandardButton.Yes:
-            self.model.removeRow(idx.row())
-            self.model.submitAll()
-            self.model.select()
+
+        result = self.update_selected(ids, field, value)
+        if result.error:
+            QMessageBox.critical(self, "Ошибка изменения", result.error)
+        elif len(ids) > 1:
+            QMessageBox.information(self, "Изменение", result.summary("Изменено записей"))
+
+    def update_selected(self, ids, field, value):
+        """field = value у записей ids одной транзакцией и одно обновление модели."""
+        result = update_rows(self.editable_table, ids, field, value)
+        if not result.error:
+            self.refresh_after_batch()
+        return result
 
     def open_filter_dialog(self):
         headers = []
@@ -703,86 +904,92 @@ class TableWidget(QWidget):
         dialog = FilterDialog(headers, self.table_name, real_headers, self)
         if dialog.exec():
             filters = dialog.get_filters()
-            self.apply_filters(filters, columns, real_headers)
-
-    def apply_filters(self, filters, columns, real_headers):
-        # 1) Спец-ветка для JOIN-модели ВЫДАЧА_ТЕХНИКИ — фильтруем через прокси
-        if self.table_name in ["ВЫДАЧА_ТЕХНИКИ", "ОБСЛУЖИВАНИЕ"]:
-            flts = []
-            # собираем только непустые фильтры
-            for value, col in zip(filters, columns):
-                # tuple → диапазон дат
-                if isinstance(value, tuple):
-                    # (from_str, to_str), даже если один из них пустой
-                    flts.append((value, col))
-                # простая строка или число
-                elif value.strip():
-                    flts.append((value, col))
-            # передаём в прокси
+            self.apply_filters(filters, columns, real_headers, dialog.exact_filters())
+
+    def map_to_model(self, proxy_index):
+        """Индекс вида -> индекс исходной модели через всю цепочку прокси."""
+        index = proxy_index
+        while isinstance(index.model(), QSortFilterProxyModel):
+            index = index.model().mapToSource(index)
+        return index
+
+    def map_from_model(self, source_index):
+        """Индекс исходной модели -> индекс вида."""
+        if self.filter_proxy is not None:
+            source_index = self.filter_proxy.mapFromSource(source_index)
+        return self.proxy.mapFromSource(source_index)
+
+    def set_fallback_filters(self, flts):
+        """
+        Фильтры, которые не удалось перевести в SQL, применяются в Python-прокси.
+        Прокси ставится между моделью и видом только пока такие фильтры есть,
+        иначе фильтр не вызывался бы на каждой строке впустую.
+        """
+        if flts and self.filter_proxy is None:
             if self.table_name == "ВЫДАЧА_ТЕХНИКИ":
-                self.proxy.set_issuance_filters(flts)
+                self.filter_proxy = IssuanceFilterProxy(self)
             else:
-                self.proxy.set_maintenance_filters(flts)
+                self.filter_proxy = MaintenanceFilterProxy(self)
+            self.filter_proxy.setSourceModel(self.model)
+            self.proxy.setSourceModel(self.filter_proxy)
+        elif not flts and self.filter_proxy is not None:
+            self.proxy.setSourceModel(self.model)
+            self.filter_proxy.deleteLater()
+            self.filter_proxy = None
+            return
+
+        if self.filter_proxy is None:
+            return
+        if self.table_name == "ВЫДАЧА_ТЕХНИКИ":
+            self.filter_proxy.set_issuance_filters(flts)
+        else:
+            self.filter_proxy.set_maintenance_filters(flts)
+
+    def apply_filters(self, filters, columns, real_headers, exact=()):
+        # exact — номера фильтров со значением из списка: они сравниваются на
+        # равенство, введённый вручную текст ищется как подстрока
+        # 1) Спец-ветка для JOIN-моделей — фильтры уходят в WHERE запроса,
+        #    в Python-прокси остаётся только то, что не удалось скомпилировать
+        if self.table_name in ["ВЫДАЧА_ТЕХНИКИ", "ОБСЛУЖИВАНИЕ"]:
+            kinds = {f: "date" for f in real_headers if "дата" in str(f).lower()}
+            if isinstance(self.model, CostModel) and self.model.cost_col is not None:
+                kinds[self.model.record().fieldName(self.model.cost_col)] = "money"
+            where, params, rest = compile_filters(filters, real_headers, kinds, exact)
+            self.model.setFilter(where, params)
+            self.set_fallback_filters([(value, columns[i]) for value, i in rest])
             return
 
 
-        # 2) Базовая сборка SQL-фильтра для QSqlTableModel
-        filter_strings = []
-        for value, col, real_header in zip(filters, columns, real_headers):
-            # диапазон дат
+        # 2) Условие с параметрами для QSqlTableModel (query_builder.py):
+        #    select() их не привязывает, модель подставит значения литералами,
+        #    так что каждый новый фильтр SQLite готовит заново
+        conditions = Conditions()
+        for i, (value, real_header) in enumerate(zip(filters, real_headers)):
+            # диапазон дат — то же выражение, что и в индексах из migrations.py
             if isinstance(value, tuple):
-                date_from, date_to = value
-                sql_from = self._to_sql_date(date_from) if date_from else ""
-                sql_to   = self._to_sql_date(date_to)   if date_to   else ""
-                if sql_from and sql_to:
-                    filter_strings.append(
-                        "(substr([{0}],7,4)||'-'||substr([{0}],4,2)||'-'||substr([{0}],1,2) >= '{1}' "
-                        "AND substr([{0}],7,4)||'-'||substr([{0}],4,2)||'-'||substr([{0}],1,2) <= '{2}')"
-                        .format(real_header, sql_from, sql_to)
-                    )
-                elif sql_from:
-                    filter_strings.append(
-                        "substr([{0}],7,4)||'-'||substr([{0}],4,2)||'-'||substr([{0}],1,2) >= '{1}'"
-                        .format(real_header, sql_from)
-                    )
-                elif sql_to:
-                    filter_strings.append(
-                        "substr([{0}],7,4)||'-'||substr([{0}],4,2)||'-'||substr([{0}],1,2) <= '{1}'"
-                        .format(real_header, sql_to)
-                    )
-
-            # простой текст или число
+                conditions.date_range(real_header, *value)
+
+            # значение из списка или введённый фрагмент
             elif value.strip():
-                if value.isdigit():
-                    filter_strings.append(f"[{real_header}] = '{value}'")
+                if i in exact:
+                    conditions.equals(real_header, value)
                 else:
-                    filter_strings.append(f"[{real_header}] LIKE '%{value}%'")
-
-        filter_query = " AND ".join(filter_strings)
+                    conditions.contains(real_header, value)
 
         # 3) Применяем к QSqlTableModel
-        self.model.setFilter(filter_query)
+        self.model.setFilter(conditions.sql(), conditions.params)
         self.model.select()
 
-    def _to_sql_date(self, date_str):
-        # Преобразует dd.MM.yyyy в yyyy-MM-dd для SQLite
-        d, m, y = date_str.split('.')
-        return f"{y}-{m}-{d}"
-    
     def reset_filters(self):
         """
-        - для QSqlQueryModel (CostModel и QSqlQueryModel) — перезапускаем SQL и очищаем прокси-фильтры
+        - для PagedQueryModel (CostModel и ВЫДАЧА_ТЕХНИКИ) — снимаем WHERE и очищаем прокси-фильтры
         - для QSqlTableModel — очищаем setFilter и делаем select()
         """
-        # 1) CostModel и QSqlQueryModel
-        if isinstance(self.model, QSqlQueryModel) and self._sql:
-            # возвращаем исходный JOIN-запрос
-            self.model.setQuery(self._sql)
-            # а потом сбрасываем фильтры прокси
-            if self.table_name == "ОБСЛУЖИВАНИЕ":
-                self.proxy.set_maintenance_filters([])
-            else:
-                self.proxy.set_issuance_filters([])
+        # 1) CostModel и PagedQueryModel
+        if isinstance(self.model, PagedQueryModel):
+            # убираем WHERE из JOIN-запроса и фильтры прокси
+            self.model.setFilter("")
+            self.set_fallback_filters([])
             return
 
         # 2) Обычные таблицы (QSqlTableModel)
@@ -801,11 +1008,13 @@ class IssuanceFilterProxy(QSortFilterProxyModel):
         for value, col in self.filters:
             idx = model.index(src_row, col, src_parent)
             cell = str(idx.data() or "")
-            # диапазон дат — кортеж (dd.MM.yyyy, dd.MM.yyyy)
+            # диапазон дат — кортеж (dd.MM.yyyy, dd.MM.yyyy); сравниваем в
+            # виде yyyy-MM-dd, иначе строки сравниваются сначала по дню
             if isinstance(value, tuple):
-                fr, to = value
+                fr, to = (to_iso_date(v) for v in value)
                 if fr and to:
-                    if not (fr <= cell <= to):
+                    day = to_iso_date(cell)
+                    if not day or not (fr <= day <= to):
                         return False
             else:
                 if value and value.lower() not in cell.lower():
@@ -852,15 +1061,8 @@ class AddRowDialog(QDialog):
                 header_str = str(header).lower()
                 # Оборудование
                 if "оборудование" in header_str:
-                    combo = QComboBox(self)
-                    from PyQt6.QtSql import QSqlQuery
-                    query = QSqlQuery("SELECT id, название, производитель, серийный_номер FROM ОБОРУДОВАНИЕ")
-                    self.equip_ids = []
-                    while query.next():
-                        eqid = query.value(0)
-                        label = f"{query.value(1)} ({query.value(2)}, {query.value(3)})"
-                        self.equip_ids.append(eqid)
-                        combo.addItem(label)
+                    combo = lookup_combo("equipment", self)
+                    self.equip_ids = combo.model().ids
                     layout.addRow(header, combo)
                     self.inputs.append(combo)
                 # Дата
@@ -879,16 +1081,8 @@ class AddRowDialog(QDialog):
                     self.inputs.append(combo)
                 # Техник - используем тот же список, что и для сотрудников
                 elif "техник" in header_str:
-                    combo = QComboBox(self)
-                    from PyQt6.QtSql import QSqlQuery
-                    query = QSqlQuery("SELECT id, фамилия, имя FROM СОТРУДНИК")
-                    self.tech_ids = [None]  # Первое значение - None (не указано)
-                    combo.addItem("Не указано")
-                    while query.next():
-                        tid = query.value(0)
-                        label = f"{query.value(1)} {query.value(2)}"
-                        self.tech_ids.append(tid)
-                        combo.addItem(label)
+                    combo = lookup_combo("technician", self)
+                    self.tech_ids = combo.model().ids  # первое значение - None (не указано)
                     layout.addRow(header, combo)
                     self.inputs.append(combo)
                 # Стоимость
@@ -923,44 +1117,20 @@ class AddRowDialog(QDialog):
                 header_str = str(header).lower()
                 # Сотрудник
                 if "сотрудник" in header_str:
-                    combo = QComboBox(self)
-                    from PyQt6.QtSql import QSqlQuery
-                    query = QSqlQuery("SELECT id, фамилия, имя, отчество FROM СОТРУДНИК")
-                    self.employee_ids = []
-                    while query.next():
-                        eid = query.value(0)
-                        patr = query.value(3)
-                        label = f"{query.value(1)} {query.value(2)}"
-                        if patr and patr.strip() != "-":
-                            label += f" {patr}"
-                        self.employee_ids.append(eid)
-                        combo.addItem(label)
+                    combo = lookup_combo("employee", self)
+                    self.employee_ids = combo.model().ids
                     layout.addRow(header, combo)
                     self.inputs.append(combo)
                 # Оборудование
                 elif "оборудование" in header_str:
-                    combo = QComboBox(self)
-                    from PyQt6.QtSql import QSqlQuery
-                    query = QSqlQuery("SELECT id, название, производитель, серийный_номер FROM ОБОРУДОВАНИЕ")
-                    self.equip_ids = []
-                    while query.next():
-                        eqid = query.value(0)
-                        label = f"{query.value(1)} ({query.value(2)}, {query.value(3)})"
-                        self.equip_ids.append(eqid)
-                        combo.addItem(label)
+                    combo = lookup_combo("equipment", self)
+                    self.equip_ids = combo.model().ids
                     layout.addRow(header, combo)
                     self.inputs.append(combo)
                 # Рабочее место (улучшено)
                 elif "рабочее" in header_str and "место" in header_str:
-                    combo = QComboBox(self)
-                    from PyQt6.QtSql import QSqlQuery
-                    query = QSqlQuery("SELECT id, корпус, этаж, кабинет, стол FROM РАБОЧЕЕ_МЕСТО")
-                    self.workplace_ids = []
-                    while query.next():
-                        wid = query.value(0)
-                        label = f"{query.value(1)} | этаж {query.value(2)} | каб. {query.value(3)} | стол {query.value(4)}"
-                        self.workplace_ids.append(wid)
-                        combo.addItem(label)
+                    combo = lookup_combo("workplace", self)
+                    self.workplace_ids = combo.model().ids
                     layout.addRow(header, combo)
                     self.inputs.append(combo)
                 # Даты
@@ -975,13 +1145,7 @@ class AddRowDialog(QDialog):
                 # Состояние при возврате (улучшено)
                 elif "состояние" in header_str and "возврат" in header_str:
                     combo = QComboBox(self)
-                    combo.addItems([
-                        "Исправно",
-                        "Требует ремонта",
-                        "Утеряно",
-                        "Повреждено",
-                        "Другое"
-                    ])
+                    combo.addItems(RETURN_STATES)
                     layout.addRow(header, combo)
                     self.inputs.append(combo)
                 else:
@@ -1001,18 +1165,13 @@ class AddRowDialog(QDialog):
                     layout.addRow(header, self.position_combo)
                     self.inputs.append(self.position_combo)
                 elif header.lower() == "рабочее место":
-                    combo = QComboBox(self)
-                    from PyQt6.QtSql import QSqlQuery
-                    query = QSqlQuery("SELECT id, корпус, этаж, кабинет, стол FROM РАБОЧЕЕ_МЕСТО")
-                    self.workplace_ids = []
-                    while query.next():
-                        wid = query.value(0)
-                        label = f"{query.value(1)} | этаж {query.value(2)} | каб. {query.value(3)} | стол {query.value(4)}"
-                        self.workplace_ids.append(wid)
-                        combo.addItem(label)
-                    if not self.workplace_ids:
+                    if lookup_model("workplace").rowCount():
+                        combo = lookup_combo("workplace", self)
+                        self.workplace_ids = combo.model().ids
+                    else:
+                        combo = QComboBox(self)
                         combo.addItem("Нет")
-                        self.workplace_ids.append(None)
+                        self.workplace_ids = [None]
                     layout.addRow(header, combo)
                     self.inputs.append(combo)
                 elif header.lower() == "дата рождения":
@@ -1056,11 +1215,11 @@ class AddRowDialog(QDialog):
             for idx, inp in enumerate(self.inputs):
                 header_str = str(self.headers[idx]).lower()
                 if "сотрудник" in header_str:
-                    value = self.employee_ids[inp.currentIndex()]
+                    value = self.employee_ids[lookup_index(inp)]
                 elif "оборудование" in header_str:
-                    value = self.equip_ids[inp.currentIndex()]
+                    value = self.equip_ids[lookup_index(inp)]
                 elif "рабочее" in header_str and "место" in header_str:
-                    value = self.workplace_ids[inp.currentIndex()]
+                    value = self.workplace_ids[lookup_index(inp)]
                 elif isinstance(inp, QDateEdit):
                     value = inp.date().toString("dd.MM.yyyy")
                 elif isinstance(inp, QComboBox):
@@ -1074,9 +1233,9 @@ class AddRowDialog(QDialog):
             for idx, inp in enumerate(self.inputs):
                 header_str = str(self.headers[idx]).lower()
                 if "оборудование" in header_str:
-                    value = self.equip_ids[inp.currentIndex()]
+                    value = self.equip_ids[lookup_index(inp)]
                 elif "техник" in header_str:
-                    value = self.tech_ids[inp.currentIndex()]
+                    value = self.tech_ids[lookup_index(inp)]
                 elif isinstance(inp, QDateEdit):
                     value = inp.date().toString("dd.MM.yyyy")
                 elif isinstance(inp, QComboBox):
@@ -1103,11 +1262,17 @@ class AddRowDialog(QDialog):
                         value = "+" + value
                 elif "рабочее" in header_str and "место" in header_str:
                     if hasattr(self, "workplace_ids"):
-                        value = self.workplace_ids[inp.currentIndex()]
+                        value = self.workplace_ids[lookup_index(inp)]
             result.append(value)
         return result
 
     def validate(self):
+        # Списки справочников: набранный текст должен совпадать с элементом
+        for header, inp in zip(self.headers, self.inputs):
+            if isinstance(inp, QComboBox) and isinstance(inp.model(), LookupModel) and lookup_index(inp) == -1:
+                QMessageBox.warning(self, "Ошибка", f"{header}: выберите значение из списка.")
+                inp.setFocus()
+                return False
         # Для сотрудников
         if hasattr(self, "department_combo"):
             surname = get_input_value(self.inputs[0])
@@ -1200,30 +1365,36 @@ class EditRowDialog(AddRowDialog):
                 header = headers[idx].lower()
                 if table_name == "ВЫДАЧА_ТЕХНИКИ":
                     if "сотрудник" in header and hasattr(self, "employee_ids"):
-                        if val in self.employee_ids:
-                            inp.setCurrentIndex(self.employee_ids.index(val))
+                        row = lookup_row(inp, val)
+                        if row >= 0:
+                            inp.setCurrentIndex(row)
                     elif "оборудование" in header and hasattr(self, "equip_ids"):
-                        if val in self.equip_ids:
-                            inp.setCurrentIndex(self.equip_ids.index(val))
+                        row = lookup_row(inp, val)
+                        if row >= 0:
+                            inp.setCurrentIndex(row)
                     elif "рабочее_место" in header and hasattr(self, "workplace_ids"):
-                        if val in self.workplace_ids:
-                            inp.setCurrentIndex(self.workplace_ids.index(val))
+                        row = lookup_row(inp, val)
+                        if row >= 0:
+                            inp.setCurrentIndex(row)
                     else:
                         idx_combo = inp.findText(str(val))
                         if idx_combo >= 0:
                             inp.setCurrentIndex(idx_combo)
                 elif table_name == "СОТРУДНИК" and "рабочее_место" in header and hasattr(self, "workplace_ids"):
-                    if val in self.workplace_ids:
-                        inp.setCurrentIndex(self.workplace_ids.index(val))
+                    row = lookup_row(inp, val)
+                    if row >= 0:
+                        inp.setCurrentIndex(row)
                     else:
                         inp.setCurrentIndex(0)
                 elif table_name == "ОБСЛУЖИВАНИЕ":
                     if "оборудование" in header and hasattr(self, "equip_ids"):
-                        if val in self.equip_ids:
-                            inp.setCurrentIndex(self.equip_ids.index(val))
+                        row = lookup_row(inp, val)
+                        if row >= 0:
+                            inp.setCurrentIndex(row)
                     elif "техник" in header and hasattr(self, "tech_ids"):
-                        if val in self.tech_ids:
-                            inp.setCurrentIndex(self.tech_ids.index(val))
+                        row = lookup_row(inp, val)
+                        if row >= 0:
+                            inp.setCurrentIndex(row)
                         else:
                             inp.setCurrentIndex(0)
                     else:
@@ -1253,35 +1424,19 @@ class FilterDialog(QDialog):
 
         layout = QFormLayout(self)
 
-        # Собираем уникальные значения для выпадающих списков
+        # Уникальные значения для выпадающих списков — из индекса значений
+        # вкладки (value_index.py): он строится один раз, пока таблицы не
+        # изменятся, и сам считает каскады
         self.values_by_header = {}
-        from PyQt6.QtSql import QSqlQuery, QSqlQueryModel
-
-        # Если это окно фильтрации для JOIN-модели ВЫДАЧА_ТЕХНИКИ — берём данные из модели
-        if self.table_name in ("ВЫДАЧА_ТЕХНИКИ", "ОБСЛУЖИВАНИЕ") \
-           and isinstance(parent.model, QSqlQueryModel):
-            model = parent.model
-            rec  = model.record()  # по нему найдём поле
-            for idx, header in enumerate(headers):
-                field = real_headers[idx]             # имя поля из SELECT
-                col   = rec.indexOf(field)           # его реальный индекс
-                vals  = set()
-                for row in range(model.rowCount()):
-                    cell = model.index(row, col).data()
-                    if cell not in (None, ""):
-                        vals.add(str(cell))
-                self.values_by_header[header] = sorted(vals)
-
-        else:
-            # Всё остальное — как у вас было, через SELECT DISTINCT
-            for header, real_header in zip(headers, real_headers):
-                query = QSqlQuery(f"SELECT DISTINCT [{real_header}] FROM {table_name}")
-                vals = []
-                while query.next():
-                    v = query.value(0)
-                    if v not in (None, ""):
-                        vals.append(str(v))
-                self.values_by_header[header] = sorted(vals)
+        display = {}
+        model = getattr(parent, "model", None)
+        if isinstance(model, CostModel) and model.cost_col is not None:
+            # стоимость в списке — как в таблице: "1 234.00 ₽"
+            cost_col = model.cost_col
+            display[model.record().fieldName(cost_col)] = lambda v: model.displayValue(cost_col, v)
+        self.index = value_index(table_name, display)
+        for header, real_header in zip(headers, real_headers):
+            self.values_by_header[header] = self.index.values(real_header)
 
         # Строим поля фильтрации
         for i, header in enumerate(headers):
@@ -1303,8 +1458,13 @@ class FilterDialog(QDialog):
                 self.inputs.append((date_from, date_to))
             else:
                 combo = QComboBox(self)
+                values = self.values_by_header.get(header, [])
+                # длинный список не показываем целиком, а у свободного текста
+                # (описание) списка нет — значение можно ввести
+                combo.setEditable(len(values) > FILTER_LIST_LIMIT
+                                  or self.index.is_free_text(real_headers[i]))
                 combo.addItem("Любое значение")
-                combo.addItems(self.values_by_header.get(header, []))
+                combo.addItems(values[:FILTER_LIST_LIMIT])
                 combo.currentIndexChanged.connect(self.update_cascades)
                 layout.addRow(header, combo)
                 self.inputs.append(combo)
@@ -1321,51 +1481,32 @@ class FilterDialog(QDialog):
         self.setLayout(layout)
 
     def update_cascades(self):
-        # для JOIN-моделей (QueryModel) — ни в коем случае не чистим комбо
-        if (self.table_name in ("ВЫДАЧА_ТЕХНИКИ", "ОБСЛУЖИВАНИЕ")
-                and isinstance(self.parent().model, QSqlQueryModel)):
-            return
-
-        # остальной ваш код каскадов для остальных таблиц
+        # список каждой колонки — значения среди строк, подходящих под
+        # выбор в списках выше; считается по индексу значений в памяти
         selected = {}
-        for i, inp in enumerate(self.inputs):
-            if isinstance(inp, tuple):
-                continue
-            txt = inp.currentText()
-            if txt != "Любое значение":
-                selected[self.headers[i]] = txt
-
-        from PyQt6.QtSql import QSqlQuery
-        for i, (header, real_header) in enumerate(zip(self.headers, self.real_headers)):
-            if isinstance(self.inputs[i], tuple):
+        for i, real_header in enumerate(self.real_headers):
+            combo = self.inputs[i]
+            if isinstance(combo, tuple):
                 continue
+            vals = self.index.values_where(real_header, selected)
 
-            where_clauses = []
-            for j in range(i):
-                if isinstance(self.inputs[j], tuple):
-                    continue
-                sel = self.inputs[j].currentText()
-                if sel != "Любое значение":
-                    where_clauses.append(f"[{self.real_headers[j]}]='{sel}'")
-            where_sql = " AND ".join(where_clauses)
-            sql = f"SELECT DISTINCT [{real_header}] FROM {self.table_name}"
-            if where_sql:
-                sql += " WHERE " + where_sql
-
-            qry = QSqlQuery(sql)
-            vals = [str(qry.value(0)) for _ in iter(lambda: qry.next(), False) if qry.value(0) not in (None, "")]
-            
-            combo = self.inputs[i]
-            cur   = combo.currentText()
+            cur = combo.currentText()
             combo.blockSignals(True)
             combo.clear()
             combo.addItem("Любое значение")
-            combo.addItems(sorted(vals))
-            idx = combo.findText(cur)
-            if idx >= 0:
-                combo.setCurrentIndex(idx)
+            combo.addItems(vals[:FILTER_LIST_LIMIT])
+            if combo.isEditable():
+                combo.setCurrentText(cur)
+            else:
+                idx = combo.findText(cur)
+                if idx >= 0:
+                    combo.setCurrentIndex(idx)
             combo.blockSignals(False)
 
+            txt = combo.currentText()
+            if txt != "Любое значение":
+                selected[real_header] = txt
+
     def get_filters(self):
         result = []
         for inp in self.inputs:
@@ -1378,7 +1519,33 @@ class FilterDialog(QDialog):
                 # Если ничего не выбрано, используем пустую строку
                 result.append("" if val == "Любое значение" else val)
         return result
+
+    def exact_filters(self):
+        """
+        Номера фильтров, значение которых есть в списке колонки: для них
+        фильтр — равенство. Текст, введённый в редактируемый список (длинные
+        списки, свободный текст вроде описания), — фрагмент для поиска.
+        """
+        exact = set()
+        for i, (inp, real_header) in enumerate(zip(self.inputs, self.real_headers)):
+            if isinstance(inp, tuple) or self.index.is_free_text(real_header):
+                continue
+            column = self.index.columns.get(real_header)
+            if column is not None and inp.currentText() in column:
+                exact.add(i)
+        return exact
     
+def lookup_row(combo, record_id):
+    """Строка списка с этим id (для списков справочников) или -1."""
+    model = combo.model()
+    if isinstance(model, LookupModel):
+        return model.row_of(record_id)
+    for row in range(combo.count()):
+        if combo.itemData(row) == record_id:
+            return row
+    return -1
+
+
 def get_input_value(inp):
     if isinstance(inp, QComboBox):
         return inp.currentText()
@@ -2,20 +2,20 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QListWidget,
     QListWidgetItem, QDateEdit, QPushButton, QFileDialog, QMessageBox
 )
-from PyQt6.QtGui import (
-    QTextDocument, QTextCursor, QTextTableFormat, QTextCharFormat,
-    QFont, QTextTableCellFormat, QTextLength, QColor
-)
-from PyQt6.QtCore import Qt, QMarginsF, QDate
-from PyQt6.QtPrintSupport import QPrinter
+from PyQt6.QtCore import Qt, QDate
 import os
 
+from report_data import ReportData
+from report_worker import ReportWorker, run_report
+
 class WorkplaceReportGenerator(QDialog):
     def __init__(self, model, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Отчёт по рабочим местам")
         self.setMinimumSize(600, 500)
         self.model = model
+        self.data = ReportData(model)
+        self.find_columns()
 
         self.init_ui()
 
@@ -68,36 +68,26 @@ class WorkplaceReportGenerator(QDialog):
         self.cancel_btn.clicked.connect(self.reject)
 
     def load_filters(self):
-        building_col = floor_col = room_col = desk_col = status_col = None
-
-        for col in range(self.model.columnCount()):
-            header = str(self.model.headerData(col, Qt.Orientation.Horizontal)).strip().lower()
+        data = self.data
+        self.building_filter.addItems(data.unique(self.building_col))
+        self.floor_filter.addItems(data.unique(self.floor_col))
+        self.room_filter.addItems(data.unique(self.room_col))
+        self.desk_filter.addItems(data.unique(self.desk_col))
+        self.status_filter.addItems(data.unique(self.status_col))
+
+    def find_columns(self):
+        self.building_col = self.floor_col = self.room_col = self.desk_col = self.status_col = None
+        for col, header in enumerate(self.data.headers):
             if "корпус" in header:
-                building_col = col
+                self.building_col = col
             elif "этаж" in header:
-                floor_col = col
+                self.floor_col = col
             elif "кабинет" in header:
-                room_col = col
+                self.room_col = col
             elif "стол" in header:
-                desk_col = col
+                self.desk_col = col
             elif "статус" in header:
-                status_col = col
-
-        def fill_unique(col_index, widget):
-            if col_index is None:
-                return
-            seen = set()
-            for row in range(self.model.rowCount()):
-                val = self.model.data(self.model.index(row, col_index))
-                if val and val not in seen:
-                    widget.addItem(str(val))
-                    seen.add(val)
-
-        fill_unique(building_col, self.building_filter)
-        fill_unique(floor_col, self.floor_filter)
-        fill_unique(room_col, self.room_filter)
-        fill_unique(desk_col, self.desk_filter)
-        fill_unique(status_col, self.status_filter)
+                self.status_col = col
 
     def load_fields(self):
         self.fields_list.clear()
@@ -127,119 +117,23 @@ class WorkplaceReportGenerator(QDialog):
             QMessageBox.warning(self, "Ошибка", "Выберите хотя бы одно поле для отчёта.")
             return
 
-        doc = QTextDocument()
-        cursor = QTextCursor(doc)
-
-        title_format = QTextCharFormat()
-        title_font = QFont("Arial", 16)
-        title_font.setBold(True)
-        title_format.setFont(title_font)
-        cursor.insertText("ООО «Разработчики Программ»\n", title_format)
-        cursor.insertText("Отчёт по рабочим местам\n\n")
-
-        table_format = QTextTableFormat()
-        table_format.setCellPadding(4)
-        table_format.setBorder(1)
-        table_format.setBorderBrush(QColor("black"))
-        table_format.setWidth(QTextLength(QTextLength.Type.PercentageLength, 100))
-        table_format.setColumnWidthConstraints([
-            QTextLength(QTextLength.Type.PercentageLength, 100 / (len(selected_fields) + 1))
-            for _ in range(len(selected_fields) + 1)
-        ])
-        table = cursor.insertTable(1, len(selected_fields) + 1, table_format)
-
-        header_format = QTextCharFormat()
-        header_font = QFont("Arial", 10)
-        header_font.setBold(True)
-        header_format.setFont(header_font)
-
-        cell_format = QTextTableCellFormat()
-        cell_format.setBorder(0.5)
-        cell_format.setBorderBrush(QColor("black"))
-
-        cell_text_format = QTextCharFormat()
-        small_font = QFont("Arial", 8)
-        cell_text_format.setFont(small_font)
-
-        # Заголовки
-        table.cellAt(0, 0).setFormat(cell_format)
-        table.cellAt(0, 0).firstCursorPosition().setCharFormat(header_format)
-        table.cellAt(0, 0).firstCursorPosition().insertText("#")
-
-        for i, (_, hdr) in enumerate(selected_fields, 1):
-            table.cellAt(0, i).setFormat(cell_format)
-            table.cellAt(0, i).firstCursorPosition().setCharFormat(header_format)
-            table.cellAt(0, i).firstCursorPosition().insertText(hdr)
-
-        # Фильтры
-        buildings = [item.text() for item in self.building_filter.selectedItems()]
-        floors = [item.text() for item in self.floor_filter.selectedItems()]
-        rooms = [item.text() for item in self.room_filter.selectedItems()]
-        desks = [item.text() for item in self.desk_filter.selectedItems()]
-        statuses = [item.text() for item in self.status_filter.selectedItems()]
-
-        # Определим индексы
-        col_indices = {}
-        for col in range(self.model.columnCount()):
-            header = str(self.model.headerData(col, Qt.Orientation.Horizontal)).strip().lower()
-            col_indices[header] = col
-
-        for row in range(self.model.rowCount()):
-            vals = {}
-            for key in ["корпус", "этаж", "кабинет", "стол"]:
-                col = col_indices.get(key)
-                val = self.model.data(self.model.index(row, col)) if col is not None else ""
-                vals[key] = str(val)
-                status_val = self.model.data(self.model.index(row, col_indices.get("статус"))) or ""
-
-            if buildings and vals["корпус"] not in buildings:
-                continue
-            if floors and vals["этаж"] not in floors:
-                continue
-            if rooms and vals["кабинет"] not in rooms:
-                continue
-            if desks and vals["стол"] not in desks:
-                continue
-            if statuses and status_val not in statuses:
-                continue
-
-            # Строка проходит фильтры — добавляем
-            table.appendRows(1)
-            r_idx = table.rows() - 1
-
-            table.cellAt(r_idx, 0).setFormat(cell_format)
-            cursor0 = table.cellAt(r_idx, 0).firstCursorPosition()
-            cursor0.setCharFormat(cell_text_format)
-            cursor0.insertText(str(r_idx))
-
-            for i, (col, _) in enumerate(selected_fields, 1):
-                val = self.model.data(self.model.index(row, col))
-                table.cellAt(r_idx, i).setFormat(cell_format)
-                cursor_i = table.cellAt(r_idx, i).firstCursorPosition()
-                cursor_i.setCharFormat(cell_text_format)
-                cursor_i.insertText(str(val) if val else "")
-
-        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-        printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
         file_path, _ = QFileDialog.getSaveFileName(
             self, "Сохранить отчёт", os.path.expanduser("~/Отчет_РабочиеМеста.pdf"), "PDF Files (*.pdf)"
         )
         if not file_path:
             return
 
-        printer.setOutputFileName(file_path)
-        printer.setPageMargins(QMarginsF(10, 10, 10, 10))
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        cursor.insertBlock()
-
-        footer_format = QTextCharFormat()
-        footer_font = QFont("Arial", 10)
-        footer_font.setItalic(True)
-        footer_format.setFont(footer_font)
-
-        cursor.setCharFormat(footer_format)
-        cursor.insertText("\nРуководитель отдела информационных технологий: ____________ /Фамилия И.О./")
-        doc.print(printer)
+        rows = self.data.select(allowed=[
+            (self.building_col, [item.text() for item in self.building_filter.selectedItems()]),
+            (self.floor_col, [item.text() for item in self.floor_filter.selectedItems()]),
+            (self.room_col, [item.text() for item in self.room_filter.selectedItems()]),
+            (self.desk_col, [item.text() for item in self.desk_filter.selectedItems()]),
+            (self.status_col, [item.text() for item in self.status_filter.selectedItems()]),
+        ])
 
-        QMessageBox.information(self, "Успешно", f"Отчёт сохранён:\n{file_path}")
+        # Документ строится и печатается в фоне
+        run_report(self.parentWidget() or self, ReportWorker(
+            file_path, "Отчёт по рабочим местам", [hdr for _, hdr in selected_fields],
+            self.data.table(rows, [col for col, _ in selected_fields])
+        ))
         self.accept()